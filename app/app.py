@@ -4,7 +4,15 @@ from app.states.dashboard_state import DashboardState
 from app.states.query_state import QueryState
 from app.states.credentials_state import CredentialsState, Env
 from app.states.viz_state import VizState
-from app.components.visualizations import faults_chart, jobs_chart, bots_chart
+from app.components.visualizations import (
+    aggregate_chart,
+    breakdown_chart,
+    records_chart,
+)
+from app.components.data_table import data_table
+from app.components.stats_panel import stats_panel
+from app.db.export import EXPORT_FORMATS
+from app.db.filters import SAMPLE_OPTIONS, TIME_RANGES
 
 
 def sidebar() -> rx.Component:
@@ -44,18 +52,58 @@ def sidebar() -> rx.Component:
     )
 
 
+def sample_toggle() -> rx.Component:
+    """Choose between the exact table and a cheap TABLESAMPLE of it."""
+    return rx.cond(
+        (DashboardState.selected_table != "") & ~QueryState.is_uploaded_data,
+        rx.el.div(
+            rx.el.select(
+                *[
+                    rx.el.option(label, value=option)
+                    for option, label in SAMPLE_OPTIONS.items()
+                ],
+                value=DashboardState.sample,
+                on_change=DashboardState.set_sample,
+                class_name="p-1 border rounded-md text-sm",
+            ),
+            rx.cond(
+                QueryState.sample_note != "",
+                rx.el.div(
+                    rx.el.span(
+                        QueryState.sample_note,
+                        class_name="px-2 py-0.5 rounded-full text-xs bg-amber-100 text-amber-800",
+                    ),
+                    rx.el.button(
+                        "Run exact query",
+                        on_click=DashboardState.set_sample("exact"),
+                        class_name="text-xs text-blue-600 hover:underline",
+                    ),
+                    class_name="flex items-center gap-2",
+                ),
+                None,
+            ),
+            class_name="flex items-center gap-2",
+        ),
+        None,
+    )
+
+
 def main_content() -> rx.Component:
     """The main content area for displaying charts and stats."""
     return rx.el.main(
         rx.el.header(
             rx.el.div(
-                rx.el.h1(
-                    rx.cond(
-                        DashboardState.selected_table,
-                        f"Dashboard: {DashboardState.selected_table}",
-                        "Select a table to get started",
+                rx.el.div(
+                    rx.el.h1(
+                        rx.cond(
+                            DashboardState.selected_table,
+                            f"Dashboard: {DashboardState.selected_table}",
+                            "Select a table to get started",
+                        ),
+                        class_name="text-2xl font-bold",
                     ),
-                    class_name="text-2xl font-bold",
+                    sample_toggle(),
+                    class_name="flex items-center gap-4",
                 ),
                 rx.el.div(
                     rx.cond(
@@ -68,6 +116,35 @@ def main_content() -> rx.Component:
                         ),
                         None,
                     ),
+                    rx.cond(
+                        QueryState.export_status != "",
+                        rx.el.div(
+                            rx.el.progress(
+                                value=QueryState.export_done,
+                                max=QueryState.export_total,
+                                class_name="w-24 h-2",
+                            ),
+                            rx.el.span(
+                                QueryState.export_status,
+                                class_name="text-xs text-gray-500 truncate max-w-48",
+                            ),
+                            class_name="flex items-center gap-2",
+                        ),
+                        None,
+                    ),
+                    rx.el.select(
+                        *[rx.el.option(fmt.upper(), value=fmt) for fmt in EXPORT_FORMATS],
+                        value=QueryState.export_format,
+                        on_change=QueryState.set_export_format,
+                        class_name="p-1.5 border rounded-md text-sm",
+                    ),
+                    rx.checkbox(
+                        "gzip",
+                        checked=QueryState.export_gzip,
+                        on_change=QueryState.set_export_gzip,
+                        size="1",
+                        class_name="text-sm text-gray-600",
+                    ),
                     rx.cond(
                         DashboardState.selected_table != "",
                         rx.el.button(
@@ -99,12 +176,14 @@ def main_content() -> rx.Component:
             rx.cond(
                 DashboardState.selected_table != "",
                 rx.el.div(
-                    rx.match(
-                        DashboardState.selected_table,
-                        ("faults", faults_chart()),
-                        ("jobs", jobs_chart()),
-                        ("bots", bots_chart()),
-                        rx.el.div(),
+                    time_range_controls(),
+                    rx.cond(
+                        VizState.chart_mode == "raw", records_chart(), aggregate_chart()
+                    ),
+                    rx.cond(
+                        DatabaseState.is_connected & ~QueryState.is_uploaded_data,
+                        rx.el.div(breakdown_chart(), stats_panel(), class_name="space-y-4"),
+                        None,
                     ),
                     rx.cond(
                         DatabaseState.is_connected | QueryState.is_uploaded_data,
@@ -123,6 +202,12 @@ def main_content() -> rx.Component:
                                 rx.el.div(
                                     class_name="h-8 w-full bg-gray-200 rounded animate-pulse mt-2"
                                 ),
+                                rx.el.button(
+                                    rx.icon("circle-stop", class_name="h-4 w-4 mr-2"),
+                                    "Cancel query",
+                                    on_click=QueryState.cancel_query,
+                                    class_name="mt-4 flex items-center px-3 py-1.5 border rounded-md text-sm bg-white hover:bg-gray-50",
+                                ),
                                 class_name="p-4",
                             ),
                             data_table(),
@@ -142,44 +227,50 @@ def main_content() -> rx.Component:
     )
 
 
-def data_table() -> rx.Component:
-    """The data table component."""
-    return rx.el.div(
-        rx.cond(
-            QueryState.query_results.length() > 0,
-            rx.el.table(
-                rx.el.thead(
-                    rx.el.tr(
-                        rx.foreach(
-                            QueryState.columns,
-                            lambda col: rx.el.th(
-                                col, class_name="p-2 text-left border-b"
-                            ),
+def time_range_controls() -> rx.Component:
+    """Time window selector for tables with a timestamp column."""
+    return rx.cond(
+        (DashboardState.time_columns.length() > 0)
+        & (DashboardState.data_source == "database"),
+        rx.el.div(
+            rx.el.div(
+                *[
+                    rx.el.button(
+                        key,
+                        on_click=DashboardState.set_time_range(key),
+                        class_name=rx.cond(
+                            DashboardState.time_range == key,
+                            "px-3 py-1 text-sm rounded-md bg-blue-500 text-white",
+                            "px-3 py-1 text-sm rounded-md bg-white border hover:bg-gray-50",
                         ),
-                        class_name="bg-gray-100",
                     )
-                ),
-                rx.el.tbody(
-                    rx.foreach(
-                        QueryState.query_results,
-                        lambda row: rx.el.tr(
-                            rx.foreach(
-                                row.values(),
-                                lambda val: rx.el.td(
-                                    rx.el.span(val), class_name="p-2 border-b"
-                                ),
-                            ),
-                            class_name="hover:bg-gray-50",
+                    for key in TIME_RANGES
+                ],
+                rx.cond(
+                    DashboardState.time_columns.length() > 1,
+                    rx.el.select(
+                        rx.foreach(
+                            DashboardState.time_columns,
+                            lambda col: rx.el.option(col, value=col),
                         ),
-                    )
+                        value=DashboardState.active_time_column,
+                        on_change=DashboardState.set_time_column,
+                        class_name="p-1 border rounded-md text-sm",
+                    ),
+                    None,
                 ),
-                class_name="w-full text-sm",
+                class_name="flex items-center gap-2",
             ),
-            rx.el.div(
-                rx.el.p("No data found for this table."), class_name="p-4 text-gray-500"
+            rx.cond(
+                DashboardState.time_filter_warning != "",
+                rx.el.p(
+                    DashboardState.time_filter_warning,
+                    class_name="mt-2 rounded-md border border-amber-200 bg-amber-50 p-2 text-xs text-amber-800",
+                ),
+                None,
             ),
         ),
-        class_name="p-4",
+        None,
     )
 
 
@@ -210,7 +301,6 @@ def index() -> rx.Component:
         on_mount=[
             CredentialsState.load_credentials,
             DatabaseState.fetch_schema,
-            VizState.generate_sample_data,
         ],
         class_name="flex min-h-screen w-screen font-['Inter']",
     )
@@ -258,11 +348,11 @@ def upload_data_section() -> rx.Component:
         rx.upload.root(
             rx.el.div(
                 rx.icon("cloud_upload", class_name="w-6 h-6 text-gray-500"),
-                rx.el.p("Drop JSON or click", class_name="text-xs text-gray-500"),
+                rx.el.p("Drop JSON (or .json.gz) or click", class_name="text-xs text-gray-500"),
                 class_name="flex flex-col items-center justify-center p-4 border-2 border-dashed rounded-md cursor-pointer",
             ),
             id="upload_data",
-            accept={"application/json": [".json"]},
+            accept={"application/json": [".json"], "application/gzip": [".gz"]},
             multiple=False,
             max_files=1,
             class_name="w-full",
@@ -291,6 +381,56 @@ def upload_data_section() -> rx.Component:
             ),
             None,
         ),
+        rx.cond(
+            QueryState.upload_status != "",
+            rx.el.div(
+                rx.el.progress(
+                    value=QueryState.upload_progress,
+                    max=100,
+                    class_name="w-full h-2",
+                ),
+                rx.el.p(QueryState.upload_status, class_name="text-xs text-gray-500"),
+                class_name="mt-2",
+            ),
+            None,
+        ),
+        rx.cond(
+            QueryState.upload_tables.length() > 1,
+            rx.el.div(
+                rx.el.label("Table", class_name="text-xs text-gray-600"),
+                rx.el.select(
+                    rx.foreach(
+                        QueryState.upload_tables,
+                        lambda name: rx.el.option(name, value=name),
+                    ),
+                    value=QueryState.upload_table,
+                    on_change=QueryState.select_upload_table,
+                    disabled=QueryState.is_loading,
+                    class_name="w-full p-1 border rounded-md text-sm",
+                ),
+                class_name="mt-2",
+            ),
+            None,
+        ),
+        rx.cond(
+            QueryState.is_uploaded_data,
+            rx.el.div(
+                rx.el.label("Deduplicate on", class_name="text-xs text-gray-600"),
+                rx.el.select(
+                    rx.el.option("Whole record", value=""),
+                    rx.foreach(
+                        QueryState.columns,
+                        lambda col: rx.el.option(col, value=col),
+                    ),
+                    value=QueryState.upload_dedup_column,
+                    on_change=QueryState.set_upload_dedup_column,
+                    disabled=QueryState.is_loading,
+                    class_name="w-full p-1 border rounded-md text-sm",
+                ),
+                class_name="mt-2",
+            ),
+            None,
+        ),
         class_name="w-full",
     )
 
@@ -344,6 +484,17 @@ def credentials_modal() -> rx.Component:
                             type="password",
                             default_value=CredentialsState.current_env.password,
                         ),
+                        rx.el.label(
+                            "Statement timeout (seconds, 0 = none)",
+                            class_name="text-sm text-gray-600",
+                        ),
+                        rx.el.input(
+                            name="statement_timeout",
+                            placeholder="Statement timeout (s)",
+                            type="number",
+                            min=0,
+                            default_value=CredentialsState.current_env.statement_timeout.to_string(),
+                        ),
                         rx.el.h4(
                             "SSH Tunnel (Optional)",
                             class_name="mt-4 text-sm font-medium text-gray-600",
@@ -0,0 +1,227 @@
+import reflex as rx
+from app.states.dashboard_state import DashboardState
+from app.states.query_state import (
+    QueryState,
+    ROW_HEIGHT_PX,
+    SCROLL_CONTAINER_ID,
+    VIEWPORT_ROWS,
+)
+from app.db.paging import PAGE_SIZES
+
+
+def data_table() -> rx.Component:
+    """A windowed data table; only rows around the scroll position are rendered."""
+    return rx.el.div(
+        rx.cond(
+            QueryState.row_count > 0,
+            rx.el.div(
+                rx.el.div(
+                    rx.el.table(
+                        rx.el.thead(
+                            rx.el.tr(
+                                rx.foreach(
+                                    QueryState.columns,
+                                    lambda col: rx.el.th(
+                                        col,
+                                        class_name="p-2 text-left border-b whitespace-nowrap",
+                                    ),
+                                ),
+                                class_name="bg-gray-100 sticky top-0",
+                            )
+                        ),
+                        rx.el.tbody(
+                            rx.el.tr(
+                                rx.el.td(
+                                    col_span=QueryState.columns.length(),
+                                    style={"height": QueryState.top_spacer_height},
+                                )
+                            ),
+                            rx.foreach(
+                                QueryState.visible_rows,
+                                lambda row, r: rx.el.tr(
+                                    rx.foreach(
+                                        row,
+                                        lambda val, c: rx.el.td(
+                                            rx.el.span(val),
+                                            on_click=QueryState.expand_cell(r, c),
+                                            class_name="px-2 border-b whitespace-nowrap max-w-xs truncate cursor-pointer",
+                                        ),
+                                    ),
+                                    style={"height": f"{ROW_HEIGHT_PX}px"},
+                                    class_name="hover:bg-gray-50",
+                                ),
+                            ),
+                            rx.el.tr(
+                                rx.el.td(
+                                    col_span=QueryState.columns.length(),
+                                    style={"height": QueryState.bottom_spacer_height},
+                                )
+                            ),
+                        ),
+                        class_name="w-full text-sm",
+                    ),
+                    id=SCROLL_CONTAINER_ID,
+                    on_scroll=rx.call_script(
+                        f"document.getElementById('{SCROLL_CONTAINER_ID}').scrollTop",
+                        callback=QueryState.scroll_table,
+                    ).throttle(50),
+                    style={"max_height": f"{ROW_HEIGHT_PX * VIEWPORT_ROWS}px"},
+                    class_name="overflow-auto rounded-md border bg-white",
+                ),
+                rx.el.div(
+                    rx.el.p(QueryState.window_label),
+                    rx.cond(
+                        QueryState.is_streaming,
+                        rx.el.div(
+                            rx.icon("loader-circle", class_name="h-3 w-3 animate-spin"),
+                            rx.el.span("Loading more rows..."),
+                            rx.el.button(
+                                "Cancel",
+                                on_click=QueryState.cancel_query,
+                                class_name="text-blue-600 hover:underline",
+                            ),
+                            class_name="flex items-center gap-1",
+                        ),
+                        None,
+                    ),
+                    class_name="flex items-center gap-3 pt-2 text-xs text-gray-500",
+                ),
+                expanded_cell(),
+            ),
+            rx.el.div(
+                rx.el.p("No data found for this table."), class_name="p-4 text-gray-500"
+            ),
+        ),
+        rx.cond(QueryState.is_uploaded_data, None, pagination_controls()),
+        rx.cond(QueryState.is_uploaded_data, None, cache_stats()),
+        class_name="p-4",
+    )
+
+
+def expanded_cell() -> rx.Component:
+    """The full value of the last clicked cell."""
+    return rx.cond(
+        QueryState.expanded_cell != "",
+        rx.el.div(
+            rx.el.div(
+                rx.el.span(QueryState.expanded_label, class_name="text-sm font-medium"),
+                rx.el.button(
+                    rx.icon("x", class_name="h-4 w-4"),
+                    on_click=QueryState.close_expanded_cell,
+                    class_name="p-1 rounded-md hover:bg-gray-100",
+                ),
+                class_name="flex items-center justify-between pb-2",
+            ),
+            rx.el.pre(
+                QueryState.expanded_cell,
+                class_name="max-h-64 overflow-auto whitespace-pre-wrap break-all text-xs",
+            ),
+            class_name="mt-2 p-3 rounded-md border bg-gray-50",
+        ),
+        None,
+    )
+
+
+def column_picker() -> rx.Component:
+    """Choose the columns the table view fetches."""
+    return rx.popover.root(
+        rx.popover.trigger(
+            rx.el.button(
+                rx.icon("columns-3", class_name="h-4 w-4 mr-1"),
+                "Columns",
+                class_name="flex items-center px-2 py-1 border rounded-md text-sm bg-white hover:bg-gray-50",
+            )
+        ),
+        rx.popover.content(
+            rx.el.div(
+                rx.foreach(
+                    DashboardState.table_columns,
+                    lambda col: rx.checkbox(
+                        col,
+                        checked=~QueryState.hidden_columns.contains(col),
+                        on_change=lambda _: QueryState.toggle_column(col),
+                        size="1",
+                    ),
+                ),
+                rx.el.button(
+                    "Show all",
+                    on_click=QueryState.show_all_columns,
+                    class_name="text-xs text-blue-600 hover:underline self-start",
+                ),
+                class_name="flex flex-col gap-1 max-h-72 overflow-auto",
+            ),
+        ),
+    )
+
+
+def cache_stats() -> rx.Component:
+    """Hit/miss counters of the shared query cache, with a button to clear it."""
+    return rx.el.div(
+        rx.icon("database-zap", class_name="h-3 w-3"),
+        rx.el.span(
+            f"Query cache: {QueryState.cache_hits} hits, "
+            f"{QueryState.cache_misses} misses ({QueryState.cache_size})"
+        ),
+        rx.el.button(
+            "Clear",
+            on_click=QueryState.clear_query_cache,
+            class_name="text-blue-600 hover:underline",
+        ),
+        class_name="flex items-center gap-2 pt-2 text-xs text-gray-500",
+    )
+
+
+def pagination_controls() -> rx.Component:
+    """Page navigation, page size and ordering controls for the data table."""
+    return rx.el.div(
+        rx.el.div(
+            rx.el.button(
+                rx.icon("chevron-left", class_name="h-4 w-4"),
+                on_click=QueryState.prev_page,
+                disabled=QueryState.page == 0,
+                class_name="p-1.5 border rounded-md bg-white hover:bg-gray-50 disabled:opacity-50",
+            ),
+            rx.el.span(QueryState.page_label, class_name="text-sm text-gray-600"),
+            rx.el.button(
+                rx.icon("chevron-right", class_name="h-4 w-4"),
+                on_click=QueryState.next_page,
+                disabled=~QueryState.has_next_page,
+                class_name="p-1.5 border rounded-md bg-white hover:bg-gray-50 disabled:opacity-50",
+            ),
+            rx.el.form(
+                rx.el.input(
+                    name="page",
+                    type="number",
+                    min=1,
+                    placeholder="Go to",
+                    class_name="w-20 p-1 border rounded-md text-sm",
+                ),
+                on_submit=QueryState.jump_to_page,
+                reset_on_submit=True,
+            ),
+            class_name="flex items-center gap-2",
+        ),
+        rx.el.div(
+            column_picker(),
+            rx.el.label("Order by", class_name="text-sm text-gray-600"),
+            rx.el.select(
+                rx.el.option("Primary key", value=""),
+                rx.foreach(
+                    DashboardState.table_columns,
+                    lambda col: rx.el.option(col, value=col),
+                ),
+                value=QueryState.order_column,
+                on_change=QueryState.set_order_column,
+                class_name="p-1 border rounded-md text-sm",
+            ),
+            rx.el.label("Rows", class_name="text-sm text-gray-600"),
+            rx.el.select(
+                *[rx.el.option(str(size), value=str(size)) for size in PAGE_SIZES],
+                value=QueryState.page_size.to_string(),
+                on_change=QueryState.set_page_size,
+                class_name="p-1 border rounded-md text-sm",
+            ),
+            class_name="flex items-center gap-2",
+        ),
+        class_name="flex items-center justify-between pt-4",
+    )
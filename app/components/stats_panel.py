@@ -0,0 +1,88 @@
+import reflex as rx
+from app.states.stats_state import NUMERIC_STATS, StatsState
+
+
+def _stats_table(headers: list[str], rows) -> rx.Component:
+    return rx.el.table(
+        rx.el.thead(
+            rx.el.tr(
+                *[
+                    rx.el.th(h, class_name="p-2 text-left border-b whitespace-nowrap")
+                    for h in headers
+                ],
+                class_name="bg-gray-100",
+            )
+        ),
+        rx.el.tbody(
+            rx.foreach(
+                rows,
+                lambda row: rx.el.tr(
+                    rx.foreach(
+                        row,
+                        lambda val: rx.el.td(
+                            val, class_name="px-2 py-1 border-b whitespace-nowrap"
+                        ),
+                    ),
+                ),
+            )
+        ),
+        class_name="w-full text-sm",
+    )
+
+
+def stats_panel() -> rx.Component:
+    """KPI panel with per-column statistics computed on the database."""
+    return rx.el.div(
+        rx.el.div(
+            rx.el.div(
+                rx.el.span("Rows", class_name="text-xs text-gray-500"),
+                rx.el.span(
+                    StatsState.stats_rows_label, class_name="text-2xl font-bold"
+                ),
+                class_name="flex flex-col",
+            ),
+            rx.el.div(
+                rx.cond(
+                    StatsState.is_loading_stats,
+                    rx.icon("loader-circle", class_name="h-4 w-4 animate-spin"),
+                    None,
+                ),
+                rx.el.span(StatsState.stats_note, class_name="text-xs text-gray-500"),
+                rx.checkbox(
+                    "Use pg_stats estimates",
+                    checked=StatsState.use_estimates,
+                    on_change=StatsState.set_use_estimates,
+                    size="1",
+                    class_name="text-sm text-gray-600",
+                ),
+                class_name="flex items-center gap-3",
+            ),
+            class_name="flex items-center justify-between pb-3",
+        ),
+        rx.cond(
+            StatsState.stats_error != "",
+            rx.el.p(StatsState.stats_error, class_name="text-sm text-red-600"),
+            None,
+        ),
+        rx.cond(
+            StatsState.numeric_table.length() > 0,
+            rx.el.div(
+                _stats_table(
+                    ["Column", "Nulls", *NUMERIC_STATS], StatsState.numeric_table
+                ),
+                class_name="overflow-auto",
+            ),
+            None,
+        ),
+        rx.cond(
+            StatsState.category_table.length() > 0,
+            rx.el.div(
+                _stats_table(
+                    ["Column", "Nulls", "Top values"], StatsState.category_table
+                ),
+                class_name="overflow-auto pt-3",
+            ),
+            None,
+        ),
+        class_name="rounded-lg border bg-white p-4",
+    )
@@ -1,5 +1,9 @@
 import reflex as rx
-from app.states.viz_state import VizState
+from app.states.dashboard_state import DashboardState
+from app.states.viz_state import BY_TIME, LIVE_INTERVALS, VizState
+from app.db.aggregation import AGG_FUNCTIONS
+from app.data.charts import SERIES_STYLES
+from app.data.downsample import DOWNSAMPLE_METHODS
 
 TOOLTIP_PROPS = {
     "content_style": {
@@ -26,34 +30,46 @@ def create_gradient(color: str, id_name: str) -> rx.Component:
     )
 
 
-def time_series_chart(data, lines: list[dict], y_axis_label: str) -> rx.Component:
+CHART_PROPS = {
+    "height": 300,
+    "width": "100%",
+    "margin": {"left": 20, "right": 20, "top": 20, "bottom": 20},
+    "class_name": "[&_.recharts-tooltip-wrapper]:z-50",
+}
+
+
+def chart_axes(x_key, y_axis_label) -> list[rx.Component]:
+    return [
+        rx.recharts.cartesian_grid(horizontal=True, vertical=False, opacity=0.3),
+        rx.recharts.tooltip(**TOOLTIP_PROPS),
+        rx.recharts.x_axis(
+            data_key=x_key,
+            axis_line=False,
+            tick_line=False,
+            tick_size=10,
+            custom_attrs={"fontSize": "12px"},
+        ),
+        rx.recharts.y_axis(
+            rx.recharts.label(
+                value=y_axis_label,
+                position="left",
+                custom_attrs={"angle": -90, "fontSize": "12px"},
+            ),
+            axis_line=False,
+            tick_line=False,
+            tick_size=10,
+            custom_attrs={"fontSize": "12px"},
+        ),
+    ]
+
+
+def time_series_chart(
+    data, lines: list[dict], y_axis_label: str, x_key="timestamp"
+) -> rx.Component:
     return rx.el.div(
         rx.recharts.area_chart(
-            rx.recharts.cartesian_grid(horizontal=True, vertical=False, opacity=0.3),
-            rx.recharts.tooltip(**TOOLTIP_PROPS),
-            create_gradient("#22c55e", "jobs_completed_grad"),
-            create_gradient("#f97316", "jobs_failed_grad"),
-            create_gradient("#3b82f6", "bots_online_grad"),
-            create_gradient("#6b7280", "bots_offline_grad"),
-            create_gradient("#ef4444", "faults_grad"),
-            rx.recharts.x_axis(
-                data_key="timestamp",
-                axis_line=False,
-                tick_line=False,
-                tick_size=10,
-                custom_attrs={"fontSize": "12px"},
-            ),
-            rx.recharts.y_axis(
-                rx.recharts.label(
-                    value=y_axis_label,
-                    position="left",
-                    custom_attrs={"angle": -90, "fontSize": "12px"},
-                ),
-                axis_line=False,
-                tick_line=False,
-                tick_size=10,
-                custom_attrs={"fontSize": "12px"},
-            ),
+            *[create_gradient(color, grad_id) for color, grad_id in SERIES_STYLES],
+            *chart_axes(x_key, y_axis_label),
             rx.foreach(
                 lines,
                 lambda line: rx.recharts.area(
@@ -65,41 +81,284 @@ def time_series_chart(data, lines: list[dict], y_axis_label: str) -> rx.Componen
                 ),
             ),
             data=data,
-            height=300,
-            width="100%",
-            margin={"left": 20, "right": 20, "top": 20, "bottom": 20},
-            class_name="[&_.recharts-tooltip-wrapper]:z-50",
+            **CHART_PROPS,
         ),
         class_name="rounded-lg border bg-white p-4",
     )
 
 
-def faults_chart() -> rx.Component:
-    lines = [{"key": "count", "color": "#ef4444", "grad_id": "faults_grad"}]
-    return time_series_chart(VizState.faults_data, lines, "Faults Count")
+def spec_chart(
+    data, lines: list[dict], y_axis_label: str, x_key="timestamp"
+) -> rx.Component:
+    """An area, line or bar chart, as the resolved chart spec's type says."""
+    return rx.match(
+        VizState.chart_type,
+        (
+            "line",
+            rx.el.div(
+                rx.recharts.line_chart(
+                    *chart_axes(x_key, y_axis_label),
+                    rx.foreach(
+                        lines,
+                        lambda line: rx.recharts.line(
+                            type="monotone",
+                            data_key=line["key"],
+                            stroke=line["color"],
+                            dot=False,
+                            stroke_width=2,
+                        ),
+                    ),
+                    data=data,
+                    **CHART_PROPS,
+                ),
+                class_name="rounded-lg border bg-white p-4",
+            ),
+        ),
+        (
+            "bar",
+            rx.el.div(
+                rx.recharts.bar_chart(
+                    *chart_axes(x_key, y_axis_label),
+                    rx.foreach(
+                        lines,
+                        lambda line: rx.recharts.bar(
+                            data_key=line["key"], fill=line["color"]
+                        ),
+                    ),
+                    data=data,
+                    **CHART_PROPS,
+                ),
+                class_name="rounded-lg border bg-white p-4",
+            ),
+        ),
+        time_series_chart(data, lines, y_axis_label, x_key),
+    )
 
 
-def jobs_chart() -> rx.Component:
-    lines = [
-        {"key": "completed", "color": "#22c55e", "grad_id": "jobs_completed_grad"},
-        {"key": "failed", "color": "#f97316", "grad_id": "jobs_failed_grad"},
-    ]
-    return time_series_chart(VizState.jobs_data, lines, "Jobs Count")
+def zoom_button(icon: str, direction: str) -> rx.Component:
+    return rx.el.button(
+        rx.icon(icon, class_name="h-4 w-4"),
+        on_click=VizState.zoom_chart(direction),
+        class_name="p-1 border rounded-md text-gray-600 hover:bg-gray-100",
+    )
+
 
+def downsampled_chart(chart: rx.Component) -> rx.Component:
+    """A record-based chart with downsampling and zoom controls.
 
-def bots_chart() -> rx.Component:
+    The chart's width is measured on mount so the server sends about one
+    point per pixel.
+    """
     return rx.el.div(
-        rx.recharts.scatter_chart(
-            rx.recharts.cartesian_grid(horizontal=True, vertical=False, opacity=0.3),
-            rx.recharts.x_axis(data_key="position_x", type_="number", name="X"),
-            rx.recharts.y_axis(data_key="position_y", type_="number", name="Y"),
-            rx.recharts.z_axis(data_key="name", type_="category", name="Bot Name"),
-            rx.recharts.tooltip(**TOOLTIP_PROPS, cursor={"stroke_dasharray": "3 3"}),
-            rx.recharts.scatter(name="Bots", data=VizState.bots_data, fill="#3b82f6"),
-            height=300,
-            width="100%",
-            margin={"left": 20, "right": 20, "top": 20, "bottom": 20},
-            class_name="[&_.recharts-tooltip-wrapper]:z-50",
+        rx.el.div(
+            rx.el.span(VizState.chart_points_label, class_name="text-xs text-gray-500"),
+            rx.el.div(
+                rx.el.select(
+                    *[rx.el.option(m.upper(), value=m) for m in DOWNSAMPLE_METHODS],
+                    value=VizState.downsample_method,
+                    on_change=VizState.set_downsample_method,
+                    class_name="p-1 border rounded-md text-sm",
+                ),
+                zoom_button("chevron-left", "left"),
+                zoom_button("zoom-in", "in"),
+                zoom_button("zoom-out", "out"),
+                zoom_button("chevron-right", "right"),
+                zoom_button("rotate-ccw", "reset"),
+                class_name="flex items-center gap-2",
+            ),
+            class_name="flex items-center justify-between pb-2",
         ),
-        class_name="rounded-lg border bg-white p-4",
-    )
\ No newline at end of file
+        chart,
+        id="viz-chart",
+        on_mount=rx.call_script(
+            "document.getElementById('viz-chart')?.clientWidth",
+            callback=VizState.set_chart_width,
+        ),
+    )
+
+
+def records_chart() -> rx.Component:
+    """The chart of raw result rows described by the table's chart spec."""
+    chart = rx.cond(
+        VizState.chart_type == "scatter",
+        rx.el.div(
+            rx.recharts.scatter_chart(
+                rx.recharts.cartesian_grid(horizontal=True, vertical=False, opacity=0.3),
+                rx.recharts.x_axis(
+                    data_key=VizState.chart_x, type_="number", name=VizState.chart_x
+                ),
+                rx.recharts.y_axis(
+                    data_key=VizState.chart_y[0], type_="number", name=VizState.chart_y[0]
+                ),
+                rx.recharts.tooltip(**TOOLTIP_PROPS, cursor={"stroke_dasharray": "3 3"}),
+                rx.recharts.scatter(
+                    name=VizState.chart_title, data=VizState.chart_data, fill="#3b82f6"
+                ),
+                **CHART_PROPS,
+            ),
+            class_name="rounded-lg border bg-white p-4",
+        ),
+        spec_chart(
+            VizState.chart_data,
+            VizState.chart_lines,
+            VizState.chart_title,
+            VizState.chart_x,
+        ),
+    )
+    return downsampled_chart(chart)
+
+
+def live_controls() -> rx.Component:
+    """Live-mode toggle, poll interval and status, plus the polling timer."""
+    return rx.el.div(
+        rx.el.span(VizState.live_status, class_name="text-xs text-gray-500"),
+        rx.el.select(
+            *[rx.el.option(f"{s}s", value=str(s)) for s in LIVE_INTERVALS],
+            value=VizState.live_interval.to_string(),
+            on_change=VizState.set_live_interval,
+            class_name="p-1 border rounded-md text-sm",
+        ),
+        rx.el.button(
+            rx.icon("radio", class_name="h-4 w-4 mr-1"),
+            rx.cond(VizState.live_mode, "Stop live", "Live"),
+            on_click=VizState.toggle_live,
+            class_name=rx.cond(
+                VizState.live_mode,
+                "flex items-center px-2 py-1 border rounded-md text-sm bg-red-50 text-red-700 border-red-300",
+                "flex items-center px-2 py-1 border rounded-md text-sm text-gray-700 hover:bg-gray-100",
+            ),
+        ),
+        rx.moment(
+            interval=rx.cond(VizState.live_mode, VizState.live_delay * 1000, 0),
+            on_change=lambda _: VizState.poll_live,
+            display="none",
+        ),
+        class_name="flex items-center gap-2",
+    )
+
+
+def aggregate_chart() -> rx.Component:
+    """Server-side aggregated time series for any table with a timestamp column."""
+    return rx.cond(
+        VizState.series_data.length() > 0,
+        rx.el.div(
+            rx.el.div(
+                rx.el.span(VizState.series_label, class_name="text-sm font-medium"),
+                rx.el.div(
+                    rx.el.select(
+                        rx.el.option("Row count", value=""),
+                        rx.foreach(
+                            VizState.series_columns,
+                            lambda col: rx.el.option(col, value=col),
+                        ),
+                        value=VizState.agg_column,
+                        on_change=VizState.set_agg_column,
+                        class_name="p-1 border rounded-md text-sm",
+                    ),
+                    rx.el.select(
+                        *[rx.el.option(func, value=func) for func in AGG_FUNCTIONS],
+                        value=VizState.agg_func,
+                        on_change=VizState.set_agg_func,
+                        disabled=VizState.agg_column == "",
+                        class_name="p-1 border rounded-md text-sm",
+                    ),
+                    live_controls(),
+                    class_name="flex items-center gap-2",
+                ),
+                class_name="flex items-center justify-between px-4 pt-4",
+            ),
+            spec_chart(
+                VizState.series_data, VizState.series_lines, VizState.series_label
+            ),
+        ),
+        rx.cond(
+            VizState.viz_error != "",
+            rx.el.p(VizState.viz_error, class_name="text-sm text-red-600"),
+            rx.el.div(),
+        ),
+    )
+
+
+def breakdown_chart() -> rx.Component:
+    """Row counts per category, optionally stacked by a second category or time."""
+    axis_props = {
+        "axis_line": False,
+        "tick_line": False,
+        "custom_attrs": {"fontSize": "12px"},
+    }
+    return rx.cond(
+        VizState.breakdown_column != "",
+        rx.el.div(
+            rx.el.div(
+                rx.el.span(VizState.breakdown_label, class_name="text-sm font-medium"),
+                rx.el.div(
+                    rx.el.select(
+                        rx.foreach(
+                            DashboardState.categorical_columns,
+                            lambda col: rx.el.option(col, value=col),
+                        ),
+                        value=VizState.breakdown_column,
+                        on_change=VizState.set_breakdown_column,
+                        class_name="p-1 border rounded-md text-sm",
+                    ),
+                    rx.el.label("by", class_name="text-sm text-gray-600"),
+                    rx.el.select(
+                        rx.el.option("Nothing", value=""),
+                        rx.cond(
+                            DashboardState.active_time_column != "",
+                            rx.el.option("Time", value=BY_TIME),
+                            None,
+                        ),
+                        rx.foreach(
+                            DashboardState.categorical_columns,
+                            lambda col: rx.el.option(col, value=col),
+                        ),
+                        value=VizState.breakdown_by,
+                        on_change=VizState.set_breakdown_by,
+                        class_name="p-1 border rounded-md text-sm",
+                    ),
+                    class_name="flex items-center gap-2",
+                ),
+                class_name="flex items-center justify-between pb-2",
+            ),
+            rx.cond(
+                VizState.breakdown_by == "",
+                rx.recharts.bar_chart(
+                    rx.recharts.cartesian_grid(horizontal=True, vertical=False, opacity=0.3),
+                    rx.recharts.tooltip(**TOOLTIP_PROPS),
+                    rx.recharts.x_axis(data_key="category", **axis_props),
+                    rx.recharts.y_axis(**axis_props),
+                    rx.recharts.bar(data_key="count", fill="#3b82f6"),
+                    data=VizState.breakdown_totals,
+                    height=300,
+                    width="100%",
+                ),
+                rx.recharts.bar_chart(
+                    rx.recharts.cartesian_grid(horizontal=True, vertical=False, opacity=0.3),
+                    rx.recharts.tooltip(**TOOLTIP_PROPS),
+                    rx.recharts.legend(),
+                    rx.recharts.x_axis(data_key="group", **axis_props),
+                    rx.recharts.y_axis(**axis_props),
+                    rx.foreach(
+                        VizState.breakdown_bars,
+                        lambda bar: rx.recharts.bar(
+                            data_key=bar["key"],
+                            name=bar["name"],
+                            stack_id="breakdown",
+                            fill=bar["color"],
+                        ),
+                    ),
+                    data=VizState.breakdown_data,
+                    height=300,
+                    width="100%",
+                ),
+            ),
+            rx.cond(
+                VizState.breakdown_error != "",
+                rx.el.p(VizState.breakdown_error, class_name="text-sm text-red-600"),
+                None,
+            ),
+            class_name="rounded-lg border bg-white p-4",
+        ),
+        None,
+    )
@@ -0,0 +1,213 @@
+import datetime
+import fnmatch
+import json
+import logging
+import os
+import random
+from pathlib import Path
+from typing import Any, TypedDict
+from .downsample import downsample
+from .results import ResultSet
+
+CHART_SPECS_PATH = os.environ.get("CHART_SPECS", "chart_specs.json")
+CHART_TYPES = ["area", "line", "bar", "scatter"]
+# Aggregations: RAW draws the rows themselves, COUNT counts rows per time
+# bucket, anything else is applied per bucket (see aggregation.AGG_FUNCTIONS).
+RAW = "none"
+COUNT = "count"
+# Line colours, each with the gradient id the area chart defines for it.
+SERIES_STYLES = [
+    ("#3b82f6", "bots_online_grad"),
+    ("#ef4444", "faults_grad"),
+    ("#22c55e", "jobs_completed_grad"),
+    ("#f97316", "jobs_failed_grad"),
+    ("#6b7280", "bots_offline_grad"),
+]
+SAMPLE_ROWS = 30
+
+
+class ChartSpec(TypedDict):
+    """A declarative chart: which columns of which tables, drawn how.
+
+    ``table`` is a glob pattern matched against table names. An empty ``x``
+    means the table's time column; an empty ``y`` with COUNT means row
+    counts. Aggregated specs need a time column for ``x`` and are computed
+    on the database; RAW specs draw (downsampled) rows of the result.
+    A non-zero ``rollup`` (bucket seconds) lets aggregated specs be read
+    from a rollup table when rollups are enabled.
+    """
+
+    table: str
+    type: str
+    x: str
+    y: list[str]
+    agg: str
+    title: str
+    rollup: int
+
+
+def _spec(entry: dict[str, Any]) -> ChartSpec:
+    """Validate a spec from the config file, filling in defaults."""
+    spec: ChartSpec = {
+        "table": str(entry["table"]),
+        "type": str(entry.get("type", "area")),
+        "x": str(entry.get("x") or ""),
+        "y": [str(c) for c in entry.get("y") or []],
+        "agg": str(entry.get("agg", COUNT)),
+        "title": str(entry.get("title") or ""),
+        "rollup": int(entry.get("rollup") or 0),
+    }
+    if spec["type"] not in CHART_TYPES:
+        raise ValueError(f"unknown chart type {spec['type']!r}")
+    if spec["agg"] == RAW and not (spec["x"] and spec["y"]):
+        raise ValueError("charts of raw rows need x and y columns")
+    if spec["agg"] == RAW and spec["rollup"]:
+        raise ValueError("only aggregated charts can be rolled up")
+    return spec
+
+
+def load_chart_specs(path: str = CHART_SPECS_PATH) -> list[ChartSpec]:
+    """Chart specs from a JSON list; invalid entries are logged and skipped."""
+    file = Path(path)
+    if not file.exists():
+        return []
+    try:
+        entries = json.loads(file.read_text())
+    except (OSError, ValueError) as e:
+        logging.exception(f"Could not read chart specs from {path}: {e}")
+        return []
+    specs = []
+    for entry in entries:
+        try:
+            specs.append(_spec(entry))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning(f"Skipping chart spec {entry!r}: {e}")
+    return specs
+
+
+CHART_SPECS = load_chart_specs()
+
+
+def auto_spec(
+    table: str,
+    time_columns: list[str],
+    numeric_columns: list[str],
+    can_aggregate: bool = True,
+) -> ChartSpec | None:
+    """A chart for a table no configured spec covers, from its column kinds.
+
+    Tables with a time column get row counts over time, or without
+    ``can_aggregate`` their first numeric column drawn over time; tables
+    with two numeric columns a scatter of one against the other.
+    """
+    spec: ChartSpec = {
+        "table": table,
+        "type": "area",
+        "x": "",
+        "y": [],
+        "agg": COUNT,
+        "title": "",
+        "rollup": 0,
+    }
+    if time_columns and can_aggregate:
+        return spec
+    if time_columns and numeric_columns:
+        x, y = time_columns[0], numeric_columns[0]
+        return {**spec, "type": "line", "x": x, "y": [y], "agg": RAW}
+    if len(numeric_columns) >= 2:
+        x, y = numeric_columns[:2]
+        return {**spec, "type": "scatter", "x": x, "y": [y], "agg": RAW}
+    return None
+
+
+def resolve_spec(
+    table: str,
+    columns: list[str],
+    time_columns: list[str],
+    numeric_columns: list[str],
+    can_aggregate: bool = True,
+    specs: list[ChartSpec] | None = None,
+) -> ChartSpec | None:
+    """The chart for a table, with ``x`` filled in.
+
+    The first configured spec whose pattern matches the table and whose
+    columns all exist wins; otherwise one is derived from the column kinds.
+    Without ``can_aggregate`` (uploaded data, which has no database behind
+    it) aggregated specs are skipped.
+    """
+    candidates = [
+        spec
+        for spec in (CHART_SPECS if specs is None else specs)
+        if fnmatch.fnmatchcase(table, spec["table"])
+    ]
+    candidates.append(auto_spec(table, time_columns, numeric_columns, can_aggregate))
+    for spec in candidates:
+        if spec is None:
+            continue
+        if spec["agg"] != RAW:
+            x = spec["x"] or (time_columns[0] if time_columns else "")
+            if not can_aggregate or x not in time_columns:
+                continue
+        else:
+            x = spec["x"]
+        if all(c in columns for c in [x, *spec["y"]]):
+            return {**spec, "x": x}
+    return None
+
+
+def column_kinds(result: ResultSet) -> tuple[list[str], list[str]]:
+    """Time and numeric columns of a result, for data with no table schema."""
+    time_columns, numeric_columns = [], []
+    for name in result.columns:
+        kind = result.column(name).kind
+        if kind in ("datetime", "date"):
+            time_columns.append(name)
+        elif kind in ("int", "float"):
+            numeric_columns.append(name)
+    return (time_columns, numeric_columns)
+
+
+def spec_columns(spec: ChartSpec | None) -> list[str]:
+    """Columns a chart of raw rows needs from the result; none for aggregates."""
+    if spec is None or spec["agg"] != RAW:
+        return []
+    return [spec["x"], *spec["y"]]
+
+
+def series_styles(keys: list[str]) -> list[dict[str, str]]:
+    """Chart lines for series keys, with colours and gradients assigned in order."""
+    lines = []
+    for i, key in enumerate(keys):
+        color, grad_id = SERIES_STYLES[i % len(SERIES_STYLES)]
+        lines.append({"key": key, "color": color, "grad_id": grad_id})
+    return lines
+
+
+def chart_rows(
+    result: ResultSet,
+    spec: ChartSpec,
+    max_points: int,
+    method: str = "lttb",
+    x_range: tuple[float, float] | None = None,
+) -> tuple[list[dict[str, Any]], int]:
+    """Rows for a chart of raw rows, downsampled to ``max_points``.
+
+    Returns the rows and the number of rows in the visible range.
+    """
+    shown, total = downsample(result, spec["x"], spec["y"], max_points, method, x_range)
+    return (shown.records(), total)
+
+
+def sample_rows(spec: ChartSpec) -> list[dict[str, Any]]:
+    """Made-up rows in the shape of a chart, shown when there is no data yet."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = []
+    for i in range(SAMPLE_ROWS, 0, -1):
+        if spec["type"] == "scatter":
+            x: Any = round(random.uniform(-10, 10), 2)
+        else:
+            x = (now - datetime.timedelta(days=i)).strftime("%Y-%m-%dT%H:%M:%S")
+        row = {spec["x"]: x}
+        row.update({y: random.randint(0, 100) for y in spec["y"]})
+        rows.append(row)
+    return rows
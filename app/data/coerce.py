@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from .results import Column, ResultSet
+
+# Text that stands for a missing value in JSON exports (Python's str(None) included).
+NULL_TOKENS = ["", "None", "none", "null", "NULL", "NaN", "nan"]
+BOOL_TOKENS = {"true": True, "false": False}
+# Integers beyond this lose precision as float64, so such columns stay floats.
+MAX_EXACT_INT = 2**53
+INT_PATTERN = r"[+-]?\d+"
+TZ_SUFFIX = r"(?:Z|[+-]\d\d:?\d\d)$"
+# Each kind is tried on this many values before parsing the whole column.
+SNIFF_ROWS = 100
+
+
+def _numbers(text: pd.Series) -> np.ndarray | None:
+    numbers = pd.to_numeric(text, errors="coerce").to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    return None if np.isnan(numbers).any() else numbers
+
+
+def _timestamps(text: pd.Series) -> tuple[np.ndarray, bool, bool] | None:
+    """Parsed ISO 8601 values as naive UTC, whether any had an offset, and
+    whether all were plain dates; None unless every value parses."""
+    parsed = pd.to_datetime(text, errors="coerce", utc=True, format="ISO8601")
+    if parsed.isna().any():
+        return None
+    values = parsed.dt.tz_convert(None).to_numpy(dtype="datetime64[us]")
+    tz_aware = bool(text.str.contains(TZ_SUFFIX).any())
+    dates_only = bool((text.str.len() == 10).all())
+    return (values, tz_aware, dates_only)
+
+
+def coerce_column(column: Column) -> Column:
+    """Type a text column as numbers, booleans or timestamps if every value is one.
+
+    Null tokens become nulls first. Parsing is vectorized over the whole
+    column, and only for kinds its first SNIFF_ROWS values allow; columns
+    that are not all text, or mix kinds, stay as objects.
+    """
+    if column.kind != "object" or column.mask.all():
+        return column
+    if pd.api.types.infer_dtype(column.values[~column.mask], skipna=True) != "string":
+        return column
+    text = pd.Series(column.values, dtype="string").str.strip()
+    mask = column.mask | text.isin(NULL_TOKENS).fillna(False).to_numpy(dtype=bool)
+    present = text[~mask]
+    n = len(column)
+    if present.empty:
+        return Column(np.full(n, None, dtype=object), mask, "object")
+    head = present.head(SNIFF_ROWS)
+    numbers = _numbers(present) if _numbers(head) is not None else None
+    if numbers is not None:
+        values = np.full(n, np.nan)
+        values[~mask] = numbers
+        integers = present.str.fullmatch(INT_PATTERN).all()
+        if integers and np.abs(numbers).max() < MAX_EXACT_INT:
+            return Column(np.where(mask, 0, values).astype(np.int64), mask, "int")
+        return Column(values, mask, "float")
+    if head.str.lower().isin(list(BOOL_TOKENS)).all():
+        flags = present.str.lower().map(BOOL_TOKENS)
+        if flags.notna().all():
+            values = np.zeros(n, dtype=bool)
+            values[~mask] = flags.to_numpy(dtype=bool)
+            return Column(values, mask, "bool")
+    parsed = _timestamps(present) if _timestamps(head) is not None else None
+    if parsed is not None:
+        stamps, tz_aware, dates_only = parsed
+        values = np.full(n, np.datetime64("NaT"), dtype="datetime64[us]")
+        values[~mask] = stamps
+        if dates_only:
+            return Column(values.astype("datetime64[D]"), mask, "date")
+        return Column(values, mask, "datetime", tz_aware)
+    values = column.values.copy()
+    values[mask] = None
+    return Column(values, mask, "object")
+
+
+def coerce_result(result: ResultSet) -> ResultSet:
+    """The result with every text column typed as far as its values allow."""
+    return ResultSet(result.columns, [coerce_column(col) for col in result.data])
@@ -0,0 +1,58 @@
+import hashlib
+import json
+from typing import Any, Iterable, Iterator
+
+
+# One shared encoder: json.dumps with options builds a new one per call.
+_CANONICAL = json.JSONEncoder(
+    sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+)
+
+
+def canonical_json(value: Any) -> str:
+    """Canonical text of a JSON-like value: sorted keys, no whitespace.
+
+    Nested dicts and lists are handled recursively, so records holding them
+    can be compared; values JSON cannot represent fall back to ``str``.
+    """
+    return _CANONICAL.encode(value)
+
+
+class Deduplicator:
+    """Order-preserving duplicate filter for dict records.
+
+    Each record is reduced to an 8-byte blake2b digest of its canonical
+    JSON (of the whole record, or of just the ``key_columns`` values), so
+    memory is one small int per distinct record and the first occurrence
+    of each record keeps its position. Canonical JSON keeps values such as
+    1, 1.0 and true apart, and the digest is of the content rather than
+    Python's ``hash()``, which collides on ordinary values.
+    """
+
+    def __init__(self, key_columns: list[str] | None = None):
+        self.key_columns = key_columns or []
+        self.duplicates = 0
+        self._seen: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def digest(self, record: dict[str, Any]) -> int:
+        if self.key_columns:
+            text = canonical_json([record.get(c) for c in self.key_columns])
+        else:
+            text = canonical_json(record)
+        digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def is_new(self, record: dict[str, Any]) -> bool:
+        """Remember the record and report whether it was seen before."""
+        digest = self.digest(record)
+        if digest in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(digest)
+        return True
+
+    def filter(self, records: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        return (record for record in records if self.is_new(record))
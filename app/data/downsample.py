@@ -0,0 +1,130 @@
+import numpy as np
+from .results import Column, ResultSet
+
+DOWNSAMPLE_METHODS = ["lttb", "minmax"]
+DEFAULT_CHART_WIDTH = 800
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of n_out points that keep the shape.
+
+    ``x`` must be sorted. The first and last points are always kept; every
+    bucket in between contributes the point forming the largest triangle
+    with the previously chosen point and the mean of the next bucket. The
+    loop is over buckets only; the work within a bucket is vectorized.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket, used as the third triangle vertex for the bucket before it.
+    sums_x = np.add.reduceat(x[1 : n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1 : n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs(
+            (x[prev] - mean_x[i + 1]) * (by - y[prev])
+            - (x[prev] - bx) * (mean_y[i + 1] - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        out[i + 1] = prev
+    return out
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Indices of the minimum and maximum point in each of n_buckets equal x ranges.
+
+    One bucket per pixel column keeps every spike visible; the result is
+    fully vectorized (a lexsort by bucket, then y).
+    """
+    n = len(x)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+    span = x[-1] - x[0]
+    if span <= 0:
+        return np.array([int(np.argmin(y)), int(np.argmax(y))])
+    bucket = np.minimum(((x - x[0]) / span * n_buckets).astype(np.int64), n_buckets - 1)
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    firsts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    lasts = np.r_[firsts[1:] - 1, n - 1]
+    return np.unique(np.concatenate([order[firsts], order[lasts], [0, n - 1]]))
+
+
+def _evenly(n: int, n_out: int) -> np.ndarray:
+    """Indices of n_out rows spread evenly over n, first and last included."""
+    if n <= n_out:
+        return np.arange(n)
+    return np.linspace(0, n - 1, n_out).astype(np.int64)
+
+
+def _as_float(column: Column) -> np.ndarray | None:
+    """Column values as float64 (timestamps as epoch microseconds), or None."""
+    if column.kind in ("int", "float", "bool"):
+        values = column.values.astype(np.float64)
+    elif column.kind in ("datetime", "date"):
+        values = column.values.astype("datetime64[us]").view(np.int64).astype(np.float64)
+    else:
+        return None
+    values[column.mask] = np.nan
+    return values
+
+
+def downsample(
+    result: ResultSet,
+    x_column: str,
+    y_columns: list[str],
+    max_points: int,
+    method: str = "lttb",
+    x_range: tuple[float, float] | None = None,
+) -> tuple[ResultSet, int]:
+    """Reduce a result to about ``max_points`` rows for charting, keeping peaks.
+
+    Rows are ordered by ``x_column`` and limited to ``x_range`` (fractions
+    of the full x extent, for zooming) first; each numeric y column is then
+    downsampled with LTTB or with ``max_points`` min/max buckets (up to two
+    rows each), and the union of the chosen rows is returned together with
+    the number of rows in range. Results whose x column is not numeric or
+    temporal are thinned evenly instead.
+    """
+    if x_column not in result.columns:
+        return (result.take(np.arange(min(len(result), max_points))), len(result))
+    x = _as_float(result.column(x_column))
+    if x is None:
+        return (result.take(_evenly(len(result), max_points)), len(result))
+    keep = ~np.isnan(x)
+    order = np.flatnonzero(keep)[np.argsort(x[keep], kind="stable")]
+    xs = x[order]
+    if x_range is not None and len(xs):
+        lo, hi = xs[0], xs[-1]
+        start = np.searchsorted(xs, lo + (hi - lo) * x_range[0], side="left")
+        stop = np.searchsorted(xs, lo + (hi - lo) * x_range[1], side="right")
+        order, xs = order[start:stop], xs[start:stop]
+    in_range = len(order)
+    series = [
+        y for name in y_columns if name in result.columns
+        if (y := _as_float(result.column(name))) is not None
+    ]
+    if in_range <= max_points:
+        return (result.take(order), in_range)
+    if not series:
+        return (result.take(order[_evenly(in_range, max_points)]), in_range)
+    picked = []
+    for y in series:
+        ys = y[order]
+        # Missing values would poison the triangle areas; treat them as the
+        # series mean so they are never chosen as peaks.
+        ys = np.where(np.isnan(ys), np.nanmean(ys) if (~np.isnan(ys)).any() else 0, ys)
+        if method == "minmax":
+            picked.append(minmax(xs, ys, max_points))
+        else:
+            picked.append(lttb(xs, ys, max_points))
+    return (result.take(order[np.unique(np.concatenate(picked))]), in_range)
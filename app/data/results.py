@@ -0,0 +1,247 @@
+import datetime
+import itertools
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Iterator, Sequence
+import numpy as np
+
+MAX_SESSIONS = 64
+JSON_SCALARS = (str, int, float, bool, list, dict)
+
+JsonValue = str | int | float | bool | None
+
+
+class Column:
+    """One typed result column: a NumPy array plus a null mask."""
+
+    __slots__ = ("values", "mask", "kind", "tz_aware")
+
+    def __init__(self, values: np.ndarray, mask: np.ndarray, kind: str, tz_aware: bool = False):
+        self.values = values
+        self.mask = mask
+        self.kind = kind
+        self.tz_aware = tz_aware
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        size = self.values.nbytes + self.mask.nbytes
+        if self.kind == "object":
+            size += sum(len(v) if isinstance(v, str) else 32 for v in self.values)
+        return size
+
+    def to_json(self, start: int = 0, stop: int | None = None) -> list[Any]:
+        """JSON-friendly values for rows [start, stop)."""
+        values = self.values[start:stop]
+        mask = self.mask[start:stop]
+        if self.kind == "datetime":
+            suffix = "+00:00" if self.tz_aware else ""
+            whole_seconds = not (values[~mask].view(np.int64) % 1_000_000).any()
+            unit = "s" if whole_seconds else "us"
+            out = [s + suffix for s in np.datetime_as_string(values, unit=unit)]
+        elif self.kind == "date":
+            out = np.datetime_as_string(values, unit="D").tolist()
+        elif self.kind == "object":
+            out = [v if isinstance(v, JSON_SCALARS) else str(v) for v in values]
+        else:
+            out = values.tolist()
+        if mask.any():
+            for i in np.flatnonzero(mask).tolist():
+                out[i] = None
+        return out
+
+    def value(self, index: int) -> Any:
+        """The value of one row as the database returned it, for query parameters."""
+        if self.mask[index]:
+            return None
+        value = self.values[index]
+        if self.kind in ("datetime", "date"):
+            value = value.item()
+            if self.tz_aware:
+                value = value.replace(tzinfo=datetime.timezone.utc)
+            return value
+        return value.item() if isinstance(value, np.generic) else value
+
+
+def build_column(values: Sequence[Any]) -> Column:
+    """Convert Python values into a typed column, falling back to objects."""
+    n = len(values)
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=n)
+    sample = next((v for v in values if v is not None), None)
+    try:
+        if isinstance(sample, bool):
+            arr = np.fromiter((bool(v) for v in values), dtype=bool, count=n)
+            return Column(arr, mask, "bool")
+        if isinstance(sample, int):
+            arr = np.array([0 if v is None else v for v in values])
+            if arr.dtype.kind == "f":
+                # JSON numbers may mix ints and floats within one column.
+                arr[mask] = np.nan
+                return Column(arr, mask, "float")
+            return Column(arr.astype(np.int64), mask, "int")
+        if isinstance(sample, Decimal) and not all(map(_exact_float, values)):
+            # Keep numerics that floats would round as Decimals.
+            raise ValueError("inexact numeric")
+        if isinstance(sample, (float, Decimal)):
+            arr = np.array(
+                [np.nan if v is None else float(v) for v in values], dtype=np.float64
+            )
+            return Column(arr, mask, "float")
+        if isinstance(sample, datetime.datetime):
+            tz_aware = sample.tzinfo is not None
+            arr = np.array(
+                [
+                    None if v is None else _naive_utc(v) if tz_aware else v
+                    for v in values
+                ],
+                dtype="datetime64[us]",
+            )
+            return Column(arr, mask, "datetime", tz_aware)
+        if isinstance(sample, datetime.date):
+            arr = np.array(values, dtype="datetime64[D]")
+            return Column(arr, mask, "date")
+    except (TypeError, ValueError, OverflowError):
+        pass
+    arr = np.empty(n, dtype=object)
+    arr[:] = list(values)
+    return Column(arr, mask, "object")
+
+
+def _exact_float(value: Any) -> bool:
+    return value is None or Decimal(repr(float(value))) == value
+
+
+def _naive_utc(value: datetime.datetime) -> datetime.datetime:
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class ResultSet:
+    """A typed, columnar query result held on the backend.
+
+    Values stay in NumPy arrays; only the rows actually sent to the browser
+    are converted to JSON-friendly Python values.
+    """
+
+    def __init__(self, columns: list[str], data: list[Column]):
+        self.columns = columns
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, columns: list[str], rows: Sequence[tuple]) -> "ResultSet":
+        transposed = list(zip(*rows)) if rows else [() for _ in columns]
+        return cls(columns, [build_column(values) for values in transposed])
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "ResultSet":
+        """Build a result from dict records, taking columns in first-seen order."""
+        columns: dict[str, None] = {}
+        for record in records:
+            for key in record:
+                columns.setdefault(key, None)
+        names = list(columns)
+        return cls(names, [build_column([r.get(c) for r in records]) for c in names])
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.nbytes for col in self.data)
+
+    def column(self, name: str) -> Column:
+        return self.data[self.columns.index(name)]
+
+    def take(self, indices: np.ndarray) -> "ResultSet":
+        """The rows at the given positions, as a new result."""
+        return ResultSet(
+            self.columns,
+            [
+                Column(col.values[indices], col.mask[indices], col.kind, col.tz_aware)
+                for col in self.data
+            ],
+        )
+
+    def window(self, start: int, stop: int) -> list[list[JsonValue]]:
+        """Rows [start, stop) as JSON-friendly lists, for the data table."""
+        return [list(row) for row in zip(*(col.to_json(start, stop) for col in self.data))]
+
+    def records(self, start: int = 0, stop: int | None = None) -> list[dict[str, Any]]:
+        """Rows as JSON-friendly dicts, the shape used by charts and JSON export."""
+        values = [col.to_json(start, stop) for col in self.data]
+        return [dict(zip(self.columns, row)) for row in zip(*values)]
+
+
+class ResultBuilder:
+    """Accumulates dict records column by column, for results built incrementally.
+
+    Unlike ``ResultSet.from_records`` the records themselves are not kept;
+    each value is appended to its column list as it arrives.
+    """
+
+    def __init__(self):
+        self._columns: dict[str, list[Any]] = {}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, record: dict[str, Any]):
+        for key, value in record.items():
+            values = self._columns.get(key)
+            if values is None:
+                values = self._columns[key] = [None] * self._rows
+            values.append(value)
+        self._rows += 1
+        if len(record) < len(self._columns):
+            for values in self._columns.values():
+                if len(values) < self._rows:
+                    values.append(None)
+
+    def extend(self, records: Iterator[dict[str, Any]], limit: int) -> int:
+        """Append up to ``limit`` records from an iterator; returns how many were taken."""
+        taken = 0
+        for record in itertools.islice(records, limit):
+            self.append(record)
+            taken += 1
+        return taken
+
+    def build(self) -> ResultSet:
+        names = list(self._columns)
+        return ResultSet(names, [build_column(self._columns.pop(c)) for c in names])
+
+
+class ResultStore:
+    """Process-wide store of the current result per browser session.
+
+    Bounded to the most recently used ``max_sessions`` sessions so abandoned
+    tabs do not pin their results in memory forever.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._results: OrderedDict[str, ResultSet] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, token: str, result: ResultSet):
+        with self._lock:
+            self._results[token] = result
+            self._results.move_to_end(token)
+            while len(self._results) > self.max_sessions:
+                self._results.popitem(last=False)
+
+    def get(self, token: str) -> ResultSet | None:
+        with self._lock:
+            result = self._results.get(token)
+            if result is not None:
+                self._results.move_to_end(token)
+            return result
+
+    def drop(self, token: str):
+        with self._lock:
+            self._results.pop(token, None)
+
+
+result_store = ResultStore()
@@ -0,0 +1,23 @@
+import logging
+import time
+import uuid
+from pathlib import Path
+import reflex as rx
+
+
+def scratch_path(subdir: str, suffix: str, max_age: float) -> Path:
+    """A fresh, unguessable file under the upload directory.
+
+    Files in the same subdirectory older than ``max_age`` seconds are
+    removed on the way, so abandoned exports and uploads do not pile up.
+    """
+    directory = rx.get_upload_dir() / subdir
+    directory.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - max_age
+    for old in directory.iterdir():
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError as e:
+            logging.warning(f"Could not remove old file {old}: {e}")
+    return directory / f"{uuid.uuid4().hex}{suffix}"
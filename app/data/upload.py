@@ -0,0 +1,128 @@
+import gzip
+import shutil
+from pathlib import Path
+from typing import IO, Any, BinaryIO, Iterator
+import ijson
+from .dedup import Deduplicator
+from .scratch import scratch_path
+
+UPLOAD_SUBDIR = "data_uploads"
+UPLOAD_MAX_AGE = 24 * 3600
+COPY_CHUNK_BYTES = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def save_upload(source: BinaryIO) -> Path:
+    """Copy an uploaded file to disk in chunks, so it can be re-read later.
+
+    Keeping the file lets the user switch between the tables of a
+    multi-table export without uploading it again.
+    """
+    path = scratch_path(UPLOAD_SUBDIR, ".json", UPLOAD_MAX_AGE)
+    source.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(source, out, COPY_CHUNK_BYTES)
+    return path
+
+
+class _CountingReader:
+    """File wrapper that counts the bytes read through it."""
+
+    def __init__(self, raw: IO[bytes]):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._raw.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+class UploadReader:
+    """Streams unique records out of an uploaded JSON file.
+
+    Accepts a plain array of records or a multi-table export in the
+    ``{"table": {"schema": [...], "data": [...]}}`` layout written by the
+    export functions, optionally gzip compressed. Only one record is
+    materialized at a time; duplicates (by whole record, or by
+    ``key_columns``) are dropped, keeping the first occurrence in file order.
+
+    For a multi-table file the records of ``table`` (default: the first
+    table) are yielded, and ``tables`` lists every table once the file has
+    been read to the end.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        table: str | None = None,
+        key_columns: list[str] | None = None,
+    ):
+        self.path = path
+        self.table = table
+        self.key_columns = key_columns or []
+        self.size = path.stat().st_size
+        self.tables: list[str] = []
+        self.records = 0
+        self._dedup = Deduplicator(self.key_columns)
+        self._reader: _CountingReader | None = None
+
+    @property
+    def duplicates(self) -> int:
+        return self._dedup.duplicates
+
+    @property
+    def bytes_read(self) -> int:
+        return self._reader.bytes_read if self._reader else 0
+
+    @property
+    def fraction_read(self) -> float:
+        return min(self.bytes_read / self.size, 1.0) if self.size else 1.0
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        self._dedup = Deduplicator(self.key_columns)
+        with open(self.path, "rb") as raw:
+            self._reader = _CountingReader(raw)
+            compressed = raw.read(2) == GZIP_MAGIC
+            raw.seek(0)
+            source = gzip.GzipFile(fileobj=self._reader) if compressed else self._reader
+            for record in self._iter_records(source):
+                if not isinstance(record, dict):
+                    raise ValueError("JSON must be an array of objects.")
+                if not self._dedup.is_new(record):
+                    continue
+                self.records += 1
+                yield record
+
+    def _iter_records(self, source: IO[bytes]) -> Iterator[Any]:
+        """Build records from the ijson event stream of either layout."""
+        events = ijson.parse(source, use_float=True)
+        _, event, _ = next(events, ("", None, None))
+        if event == "start_array":
+            item_prefix = "item"
+        elif event == "start_map":
+            item_prefix = None
+        else:
+            raise ValueError("JSON must be an array of objects or a table export.")
+        builder = None
+        for prefix, event, value in events:
+            if prefix == "" and event == "map_key":
+                # Table names may contain dots, which ijson does not escape
+                # in prefixes, so compare against the exact expected prefix.
+                self.tables.append(value)
+                if self.table is None:
+                    self.table = value
+                item_prefix = f"{value}.data.item" if value == self.table else None
+                continue
+            if item_prefix is None or not prefix.startswith(item_prefix):
+                continue
+            if builder is None:
+                if prefix != item_prefix:
+                    continue
+                builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            if prefix == item_prefix and event not in ("start_map", "start_array", "map_key"):
+                yield builder.value
+                builder = None
+        if self.table is not None and self.table not in self.tables:
+            raise ValueError(f"Table {self.table} not found in the uploaded file.")
@@ -0,0 +1,404 @@
+import datetime
+from decimal import Decimal
+from typing import Any, Hashable, TypedDict
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from .cache import query_cache
+
+TARGET_POINTS = 300
+SAMPLE_SEED = 0
+TOP_CATEGORIES = 10
+CROSSTAB_BUCKETS = 40
+OTHER_CATEGORY = "Other"
+NULL_CATEGORY = "NULL"
+MAX_SERIES_COLUMNS = 12
+AGG_FUNCTIONS = ["avg", "sum", "min", "max", "p50", "p95", "p99"]
+BUCKET_SECONDS = [
+    1,
+    5,
+    15,
+    30,
+    60,
+    5 * 60,
+    15 * 60,
+    30 * 60,
+    3600,
+    3 * 3600,
+    6 * 3600,
+    12 * 3600,
+    86400,
+    7 * 86400,
+    30 * 86400,
+]
+
+
+def choose_bucket_seconds(
+    start: datetime.datetime | None,
+    end: datetime.datetime | None,
+    target_points: int = TARGET_POINTS,
+) -> int:
+    """Pick the smallest standard bucket that keeps the range under target_points."""
+    if start is None or end is None or end <= start:
+        return 3600
+    span = (end - start).total_seconds()
+    for seconds in BUCKET_SECONDS:
+        if span / seconds <= target_points:
+            return seconds
+    return BUCKET_SECONDS[-1]
+
+
+def bucket_label(seconds: int) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def sampled_table(
+    table: sql.Identifier, sample_percent: float | None = None
+) -> sql.Composable:
+    """FROM target, optionally reading only a block sample of the table.
+
+    The sample is REPEATABLE, so paging through it and re-running an
+    aggregate see the same rows (and can be answered from the query cache).
+    """
+    if sample_percent is None:
+        return table
+    return sql.SQL("{} TABLESAMPLE SYSTEM ({}) REPEATABLE ({})").format(
+        table, sql.Literal(sample_percent), sql.Literal(SAMPLE_SEED)
+    )
+
+
+def time_bounds(
+    conn: connection,
+    table: sql.Identifier,
+    time_column: str,
+    where: sql.Composable | None = None,
+    params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    cache_scope: Hashable | None = None,
+) -> tuple[Any, Any]:
+    """min/max of the time column; both are index-only lookups when it is indexed."""
+    query = sql.SQL("SELECT min({col}), max({col}) FROM {table}").format(
+        col=sql.Identifier(time_column), table=sampled_table(table, sample_percent)
+    )
+    if where is not None:
+        query += sql.SQL(" WHERE ") + where
+    _, rows = query_cache.fetch(conn, cache_scope, query, params)
+    return rows[0]
+
+
+def bucket_expr(time_column: str, seconds: int, server_version: int) -> sql.Composable:
+    """Start of the ``seconds`` wide bucket each row falls in.
+
+    Buckets are aligned to UTC instants, whatever the session's TimeZone:
+    date_bin gets an origin with an explicit offset, and older servers
+    floor epoch seconds (date_trunc would cut in the session's zone).
+    """
+    col = sql.SQL("{}::timestamptz").format(sql.Identifier(time_column))
+    if server_version >= 140000:
+        return sql.SQL("date_bin({}, {}, TIMESTAMPTZ {})").format(
+            sql.Literal(f"{seconds} seconds"),
+            col,
+            sql.Literal(_bucket_origin(server_version).isoformat()),
+        )
+    return sql.SQL("to_timestamp(floor(extract(epoch FROM {c}) / {s}) * {s})").format(
+        c=col, s=sql.Literal(seconds)
+    )
+
+
+def _bucket_origin(server_version: int) -> datetime.datetime:
+    year = 2000 if server_version >= 140000 else 1970
+    return datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def bucket_floor(
+    value: datetime.datetime, seconds: int, server_version: int
+) -> datetime.datetime:
+    """The start of the bucket ``bucket_expr`` puts an aware timestamp in."""
+    origin = _bucket_origin(server_version)
+    offset = (value - origin) // datetime.timedelta(seconds=seconds)
+    return origin + offset * datetime.timedelta(seconds=seconds)
+
+
+def _agg_expr(func: str, column: str) -> sql.Composable:
+    col = sql.Identifier(column)
+    if func.startswith("p") and func[1:].isdigit():
+        fraction = sql.Literal(int(func[1:]) / 100)
+        return sql.SQL("percentile_cont({}) WITHIN GROUP (ORDER BY {})").format(
+            fraction, col
+        )
+    return sql.SQL("{}({})").format(sql.SQL(func), col)
+
+
+def _scaled(
+    expr: sql.Composable, sample_percent: float | None, alias: str
+) -> sql.Composable:
+    if sample_percent is not None:
+        expr = sql.SQL("round({} * {})").format(expr, sql.Literal(100 / sample_percent))
+    return sql.SQL("{} AS {}").format(expr, sql.Identifier(alias))
+
+
+def series_key(func: str, column: str) -> str:
+    return f"{func}_{column}"
+
+
+def json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def aggregate_series(
+    conn: connection,
+    table: sql.Identifier,
+    time_column: str,
+    bucket_seconds: int,
+    func: str = "avg",
+    numeric_columns: list[str] | None = None,
+    where: sql.Composable | None = None,
+    params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    cache_scope: Hashable | None = None,
+) -> list[dict[str, Any]]:
+    """Aggregate a table into time buckets on the server.
+
+    Every bucket carries ``count`` plus ``func`` applied to each numeric
+    column under the key ``{func}_{column}``, so the chart receives one row
+    per bucket rather than one per table row. With ``sample_percent`` the
+    table is read through TABLESAMPLE and counts and sums are scaled back up.
+    Results are shared through the query cache under ``cache_scope``.
+    """
+    if func not in AGG_FUNCTIONS:
+        raise ValueError(f"Unsupported aggregate: {func}")
+    numeric_columns = (numeric_columns or [])[:MAX_SERIES_COLUMNS]
+    selects = [
+        sql.SQL("{} AS timestamp").format(
+            bucket_expr(time_column, bucket_seconds, conn.server_version)
+        ),
+        _scaled(sql.SQL("count(*)"), sample_percent, "count"),
+    ]
+    selects += [
+        _scaled(
+            _agg_expr(func, column),
+            sample_percent if func == "sum" else None,
+            series_key(func, column),
+        )
+        for column in numeric_columns
+    ]
+    condition = sql.SQL("{} IS NOT NULL").format(sql.Identifier(time_column))
+    if where is not None:
+        condition = sql.SQL("{} AND ({})").format(condition, where)
+    query = sql.SQL(
+        "SELECT {selects} FROM {table} WHERE {condition} GROUP BY 1 ORDER BY 1"
+    ).format(
+        selects=sql.SQL(", ").join(selects),
+        table=sampled_table(table, sample_percent),
+        condition=condition,
+    )
+    names, rows = query_cache.fetch(conn, cache_scope, query, params)
+    return [{name: json_value(value) for name, value in zip(names, row)} for row in rows]
+
+
+def bucketed_series(
+    conn: connection,
+    table: sql.Identifier,
+    time_column: str,
+    func: str = "avg",
+    numeric_columns: list[str] | None = None,
+    where: sql.Composable | None = None,
+    params: list[Any] | None = None,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    sample_percent: float | None = None,
+    target_points: int = TARGET_POINTS,
+    cache_scope: Hashable | None = None,
+) -> tuple[int, list[dict[str, Any]]]:
+    """Choose a bucket size for the time range, then aggregate into it.
+
+    Without an explicit ``since`` the range comes from the column's min/max.
+    Returns the bucket size in seconds and the aggregated rows.
+    """
+    start, end = since, until
+    if since is None:
+        start, end = time_bounds(
+            conn, table, time_column, where, params, sample_percent, cache_scope
+        )
+    seconds = choose_bucket_seconds(start, end, target_points)
+    rows = aggregate_series(
+        conn,
+        table,
+        time_column,
+        seconds,
+        func=func,
+        numeric_columns=numeric_columns,
+        where=where,
+        params=params,
+        sample_percent=sample_percent,
+        cache_scope=cache_scope,
+    )
+    return (seconds, rows)
+
+
+def tail_series(
+    conn: connection,
+    table: sql.Identifier,
+    time_column: str,
+    bucket_seconds: int,
+    seen: Any,
+    bucket_start: Any,
+    func: str = "avg",
+    numeric_columns: list[str] | None = None,
+    where: sql.Composable | None = None,
+    params: list[Any] | None = None,
+    sample_percent: float | None = None,
+) -> tuple[Any, list[dict[str, Any]]]:
+    """Incremental update of a bucketed series since the high-water mark.
+
+    First looks for rows newer than ``seen`` (an index probe when the time
+    column is indexed). Only if there are any does it re-aggregate from
+    ``bucket_start``, the start of the last bucket already drawn, so that
+    bucket is replaced and newer ones appended without rescanning the
+    table. Returns the new high-water mark (None if nothing changed) and
+    the buckets from ``bucket_start`` on. A series drawn from a sample is
+    continued from the same ``sample_percent``, scaled the same way, so
+    its buckets stay comparable. Never cached.
+    """
+    col = sql.Identifier(time_column)
+    params = list(params or [])
+    query = sql.SQL("SELECT max({col}) FROM {table} WHERE {col} > %s").format(
+        col=col, table=sampled_table(table, sample_percent)
+    )
+    if where is not None:
+        query += sql.SQL(" AND ({})").format(where)
+    with conn.cursor() as cur:
+        cur.execute(query, [seen if seen is not None else bucket_start] + params)
+        newest = cur.fetchone()[0]
+    if newest is None:
+        return (None, [])
+    condition = sql.SQL("{} >= %s").format(col)
+    if where is not None:
+        condition = sql.SQL("{} AND ({})").format(condition, where)
+    rows = aggregate_series(
+        conn,
+        table,
+        time_column,
+        bucket_seconds,
+        func=func,
+        numeric_columns=numeric_columns,
+        where=condition,
+        params=[bucket_start] + params,
+        sample_percent=sample_percent,
+    )
+    return (newest, rows)
+
+
+class BreakdownCategory(TypedDict):
+    """One bar of a breakdown: ``key`` holds its count in each row."""
+
+    key: str
+    label: str
+    other: bool
+
+
+def _category_label(value: Any, other: bool) -> Any:
+    if other:
+        return OTHER_CATEGORY
+    return NULL_CATEGORY if value is None else json_value(value)
+
+
+def category_breakdown(
+    conn: connection,
+    table: sql.Identifier,
+    column: str,
+    by: str | None = None,
+    time_column: str | None = None,
+    bucket_seconds: int | None = None,
+    where: sql.Composable | None = None,
+    params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    limit: int = TOP_CATEGORIES,
+    cache_scope: Hashable | None = None,
+) -> tuple[list[BreakdownCategory], list[dict[str, Any]]]:
+    """Row counts per value of a categorical column, grouped on the server.
+
+    The ``limit`` most frequent values keep their own bucket and the rest
+    are summed into OTHER_CATEGORY, so only a handful of rows come back
+    however many distinct values there are. The counts can be cross-tabbed
+    by a second categorical column ``by`` (itself limited the same way) or
+    by time buckets of ``time_column``. The table is read in one grouped
+    pass; the top values are picked from its per-group counts. Returns the
+    categories, most frequent first, and one row per group,
+    ``{"group": label, key: count}``; without a cross-tab there is a single
+    group. The other and NULL buckets are flagged in the query rather than
+    named, so real values spelled like their labels stay separate.
+    """
+    params = list(params or [])
+    category = sql.SQL("{}::text").format(sql.Identifier(column))
+    if by:
+        group = sql.SQL("{}::text").format(sql.Identifier(by))
+    elif time_column and bucket_seconds:
+        group = bucket_expr(time_column, bucket_seconds, conn.server_version)
+    else:
+        group = sql.SQL("NULL::text")
+    condition = sql.SQL("") if where is None else sql.SQL(" WHERE ") + where
+    top_groups = sql.SQL("")
+    in_top_group = sql.SQL("true")
+    if by:
+        top_groups = sql.SQL(
+            ", top_groups AS (SELECT grp FROM counts GROUP BY 1 "
+            "ORDER BY sum(n) DESC, 1 LIMIT {})"
+        ).format(sql.Literal(limit))
+        in_top_group = sql.SQL(
+            "EXISTS (SELECT 1 FROM top_groups g WHERE g.grp IS NOT DISTINCT FROM c.grp)"
+        )
+    query = sql.SQL(
+        "WITH counts AS (SELECT {category} AS category, {group} AS grp, "
+        "count(*) AS n FROM {table}{cond} GROUP BY 1, 2), "
+        "top AS (SELECT category FROM counts GROUP BY 1 "
+        "ORDER BY sum(n) DESC, 1 LIMIT {limit}){top_groups}, "
+        "ranked AS (SELECT c.*, {in_top_group} AS in_top_group, EXISTS "
+        "(SELECT 1 FROM top k WHERE k.category IS NOT DISTINCT FROM c.category) "
+        "AS in_top FROM counts c) "
+        "SELECT CASE WHEN in_top_group THEN grp END, NOT in_top_group, "
+        "CASE WHEN in_top THEN category END, NOT in_top, {count} "
+        "FROM ranked GROUP BY 1, 2, 3, 4 ORDER BY 2, 1"
+    ).format(
+        category=category,
+        group=group,
+        table=sampled_table(table, sample_percent),
+        cond=condition,
+        limit=sql.Literal(limit),
+        top_groups=top_groups,
+        in_top_group=in_top_group,
+        count=_scaled(sql.SQL("sum(n)::bigint"), sample_percent, "n"),
+    )
+    _, rows = query_cache.fetch(conn, cache_scope, query, params)
+    totals: dict[tuple[Any, bool], float] = {}
+    for _, _, name, other, count in rows:
+        totals[(name, other)] = totals.get((name, other), 0) + json_value(count)
+    ranked = sorted(totals, key=lambda c: (c[1], -totals[c]))
+    keys = {c: f"c{i}" for i, c in enumerate(ranked)}
+    categories: list[BreakdownCategory] = [
+        {"key": keys[c], "label": _category_label(*c), "other": c[1]}
+        for c in ranked
+    ]
+    groups: dict[tuple[Any, bool], dict[str, Any]] = {}
+    for grp, grp_other, name, other, count in rows:
+        row = groups.setdefault(
+            (grp, grp_other), {"group": _category_label(grp, grp_other)}
+        )
+        row[keys[(name, other)]] = json_value(count)
+    items = list(groups.items())
+    if by:
+        # Most rows first, with the other bucket last.
+        items.sort(
+            key=lambda item: (
+                item[0][1],
+                -sum(v for k, v in item[1].items() if k != "group"),
+            )
+        )
+    ordered = [row for _, row in items]
+    return (categories, ordered)
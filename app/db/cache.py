@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, TypedDict
+from psycopg2 import sql
+from psycopg2.extensions import connection
+
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "60"))
+QUERY_CACHE_MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_MB", "256")) * 1024 * 1024
+SIZE_SAMPLE_ROWS = 50
+FIRST_BATCH_ROWS = 200
+BATCH_ROWS = 2000
+
+# (column names, rows)
+QueryResult = tuple[list[str], list[tuple]]
+
+
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+    entries: int
+    bytes: int
+    evictions: int
+
+
+def estimate_nbytes(result: QueryResult) -> int:
+    """Rough in-memory size of a result, extrapolated from a sample of rows."""
+    columns, rows = result
+    size = sys.getsizeof(rows) + sum(sys.getsizeof(c) for c in columns)
+    if not rows:
+        return size
+    sample = rows[:SIZE_SAMPLE_ROWS]
+    sampled = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row) for row in sample
+    )
+    return size + sampled * len(rows) // len(sample)
+
+
+class QueryCache:
+    """Process-wide cache of query results with a TTL and an LRU memory budget.
+
+    Entries are keyed by a scope (the environment's pool key, so browser
+    sessions on the same database share results), the SQL text and its
+    parameters. Expired entries are dropped on access; the least recently
+    used entries are evicted once the total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[float, int, QueryResult]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> QueryResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, result: QueryResult):
+        nbytes = estimate_nbytes(result)
+        if self.ttl <= 0 or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, nbytes, result)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def clear(self, scope: Hashable | None = None):
+        """Drop every entry, or only those of one scope."""
+        with self._lock:
+            for key in list(self._entries):
+                if scope is None or key[0] == scope:
+                    self._remove(key)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self._evictions,
+            }
+
+    def fetch(
+        self,
+        conn: connection,
+        scope: Hashable | None,
+        query: sql.Composable,
+        params: list[Any] | None = None,
+    ) -> QueryResult:
+        """Run a query, answering from the cache when the same query ran recently.
+
+        Without a scope, or with unhashable parameters, the query always runs.
+        """
+        params = list(params or [])
+        key = self._key(conn, scope, query, params)
+        if key is not None:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            result = ([desc[0] for desc in cur.description], cur.fetchall())
+        if key is not None:
+            self.put(key, result)
+        return result
+
+    def stream(
+        self,
+        conn: connection,
+        scope: Hashable | None,
+        query: sql.Composable,
+        params: list[Any] | None = None,
+        first_batch: int = FIRST_BATCH_ROWS,
+        batch_size: int = BATCH_ROWS,
+    ) -> Iterator[QueryResult]:
+        """Like fetch, but yield rows in batches off a server-side cursor.
+
+        A cached result is yielded in one piece. A result read to the end is
+        cached; one abandoned midway is not.
+        """
+        params = list(params or [])
+        key = self._key(conn, scope, query, params)
+        if key is not None:
+            cached = self.get(key)
+            if cached is not None:
+                yield cached
+                return
+        rows: list[tuple] = []
+        with conn.cursor(name=f"page_{uuid.uuid4().hex}") as cur:
+            cur.execute(query, params)
+            size = first_batch
+            batch = cur.fetchmany(size)
+            columns = [desc[0] for desc in cur.description]
+            while True:
+                rows.extend(batch)
+                yield (columns, batch)
+                if len(batch) < size:
+                    break
+                size = batch_size
+                batch = cur.fetchmany(size)
+        if key is not None:
+            self.put(key, (columns, rows))
+
+    def _key(
+        self,
+        conn: connection,
+        scope: Hashable | None,
+        query: sql.Composable,
+        params: list[Any],
+    ) -> Hashable | None:
+        """Cache key for a query, or None when it should not be cached."""
+        if scope is None:
+            return None
+        try:
+            key = (scope, query.as_string(conn), tuple(params))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+
+query_cache = QueryCache()
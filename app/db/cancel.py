@@ -0,0 +1,52 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+import psycopg2
+from psycopg2.extensions import connection
+
+
+def is_timeout(error: psycopg2.errors.QueryCanceled) -> bool:
+    """Whether a cancelled query hit statement_timeout rather than a cancel request."""
+    return "statement timeout" in str(error)
+
+
+class InflightQueries:
+    """Connections currently running a query, per browser session.
+
+    Lets a session cancel its own queries. The lock is held while cancel
+    requests are sent, so a connection cannot be released and handed to
+    another session in the middle of being cancelled.
+    """
+
+    def __init__(self):
+        self._running: dict[str, set[connection]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, user: str, conn: connection) -> Iterator[connection]:
+        with self._lock:
+            self._running.setdefault(user, set()).add(conn)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                conns = self._running.get(user)
+                if conns is not None:
+                    conns.discard(conn)
+                    if not conns:
+                        del self._running[user]
+
+    def cancel(self, user: str) -> int:
+        """Ask the server to cancel every query the user is running; returns the count."""
+        with self._lock:
+            conns = list(self._running.get(user, ()))
+            for conn in conns:
+                try:
+                    conn.cancel()
+                except psycopg2.Error as e:
+                    logging.warning(f"Could not cancel query: {e}")
+        return len(conns)
+
+
+inflight_queries = InflightQueries()
@@ -0,0 +1,56 @@
+import asyncio
+import atexit
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+DB_WORKERS = int(os.environ.get("DB_WORKERS", "8"))
+DB_USER_MAX_CONCURRENT = int(os.environ.get("DB_USER_MAX_CONCURRENT", "2"))
+
+T = TypeVar("T")
+
+
+class DatabaseExecutor:
+    """Runs blocking database work on a bounded thread pool.
+
+    psycopg2, SSH tunnels and result building all block, and Reflex event
+    handlers share a single event loop, so calling them inline stalls every
+    connected session. Work submitted here runs on at most ``workers``
+    threads, and each user (browser session) may hold at most
+    ``per_user`` of them at once so one user's slow queries cannot take
+    over the pool.
+
+    The per-user bookkeeping is only touched from the event loop thread.
+    """
+
+    def __init__(self, workers: int = DB_WORKERS, per_user: int = DB_USER_MAX_CONCURRENT):
+        self.per_user = per_user
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._users: dict[str, int] = {}
+
+    async def run(self, user: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Await ``func(*args, **kwargs)`` on the pool within the user's limit."""
+        slot = self._slots.get(user)
+        if slot is None:
+            slot = self._slots[user] = asyncio.Semaphore(self.per_user)
+        self._users[user] = self._users.get(user, 0) + 1
+        try:
+            async with slot:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._pool, functools.partial(func, *args, **kwargs)
+                )
+        finally:
+            self._users[user] -= 1
+            if not self._users[user]:
+                del self._users[user]
+                del self._slots[user]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+db_executor = DatabaseExecutor()
+atexit.register(db_executor.shutdown)
@@ -0,0 +1,256 @@
+import gzip
+import json
+import logging
+import uuid
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator
+import reflex as rx
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from ..data.results import ResultSet
+from ..data.scratch import scratch_path
+from .introspection import TableInfo, table_identifier
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_SUBDIR = "exports"
+EXPORT_ITERSIZE = 5000
+EXPORT_MAX_AGE = 3600
+EXPORT_FORMATS = ["json", "csv", "parquet"]
+NUMERIC_OID = 1700
+
+# (table name, progress detail, table finished)
+ExportProgress = tuple[str, str, bool]
+
+
+def new_export_path(suffix: str) -> Path:
+    """A fresh export file in the served upload directory."""
+    return scratch_path(EXPORT_SUBDIR, suffix, EXPORT_MAX_AGE)
+
+
+def export_url(path: Path) -> str:
+    return rx.get_upload_url(f"{EXPORT_SUBDIR}/{path.name}")
+
+
+def export_suffix(fmt: str, compress: bool, as_archive: bool) -> str:
+    """File extension for an export of one table or a whole environment."""
+    if fmt == "json":
+        return ".json.gz" if compress else ".json"
+    if as_archive:
+        return ".zip"
+    if fmt == "csv":
+        return ".csv.gz" if compress else ".csv"
+    return ".parquet"
+
+
+def _select_all(table: TableInfo) -> sql.Composed:
+    return sql.SQL("SELECT * FROM {}").format(table_identifier(table))
+
+
+def _lift_statement_timeout(conn: connection):
+    """Disable statement_timeout for the current transaction; exports run long.
+
+    The pool rolls the transaction back on release, restoring the timeout.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL statement_timeout = 0")
+
+
+def _stream_raw(
+    conn: connection, table: TableInfo, itersize: int = EXPORT_ITERSIZE
+) -> Iterator[tuple[Any, list[tuple]]]:
+    """Yield (cursor description, rows) batches through a server-side cursor."""
+    cursor_name = f"export_{uuid.uuid4().hex}"
+    _lift_statement_timeout(conn)
+    with conn.cursor(name=cursor_name) as cur:
+        cur.itersize = itersize
+        cur.execute(_select_all(table))
+        while True:
+            rows = cur.fetchmany(itersize)
+            if not rows:
+                break
+            yield (cur.description, rows)
+
+
+def stream_table_rows(
+    conn: connection, table: TableInfo, itersize: int = EXPORT_ITERSIZE
+) -> Iterator[ResultSet]:
+    """Yield a table in batches through a server-side (named) cursor."""
+    for description, rows in _stream_raw(conn, table, itersize):
+        yield ResultSet.from_rows([desc[0] for desc in description], rows)
+
+
+def write_json_export(
+    conn: connection,
+    tables: list[TableInfo],
+    path: Path,
+    compress: bool = False,
+    as_array: bool = False,
+) -> Iterator[ExportProgress]:
+    """Write tables to a JSON file incrementally.
+
+    The default layout matches the upload format:
+    ``{"table": {"schema": [...], "data": [...]}}``. With ``as_array`` a
+    single table is written as a bare array of records. Memory use is one
+    batch regardless of table size. A table that fails midway is closed off
+    with an ``"error"`` key so the file stays valid JSON.
+    """
+    opener = gzip.open if compress else open
+    with opener(path, "wt", encoding="utf-8") as out:
+        out.write("[" if as_array else "{")
+        for i, table in enumerate(tables):
+            if not as_array:
+                if i:
+                    out.write(",")
+                out.write(
+                    f'{json.dumps(table["name"])}: '
+                    f'{{"schema": {json.dumps(table["columns"])}, "data": ['
+                )
+            written = 0
+            error = None
+            try:
+                for batch in stream_table_rows(conn, table):
+                    for record in batch.records():
+                        out.write("," if written else "")
+                        out.write(json.dumps(record, separators=(",", ":")))
+                        written += 1
+                    yield (table["name"], f"{written:,} rows", False)
+            except Exception as e:
+                logging.exception(f"Export of {table['name']} failed: {e}")
+                conn.rollback()
+                error = str(e).split("\n")[0]
+            if not as_array:
+                out.write("]")
+                if error:
+                    out.write(f', "error": {json.dumps(error)}')
+                out.write("}")
+            yield (table["name"], error or f"{written:,} rows", True)
+        out.write("]" if as_array else "}")
+
+
+def _copy_csv(conn: connection, table: TableInfo, out: IO[bytes]):
+    """Stream a table as CSV with COPY ... TO STDOUT; PostgreSQL does the formatting."""
+    query = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)").format(
+        _select_all(table)
+    )
+    _lift_statement_timeout(conn)
+    with conn.cursor() as cur:
+        cur.copy_expert(query, out)
+
+
+def _write_parquet(conn: connection, table: TableInfo, out: IO[bytes]):
+    """Write a table as zstd-compressed Parquet, one row group per cursor batch."""
+    writer = None
+    try:
+        for description, rows in _stream_raw(conn, table):
+            if writer is None:
+                schema = pa.schema(
+                    [(d.name, _arrow_type(d)) for d in description]
+                )
+                converters = [_arrow_converter(field.type) for field in schema]
+                writer = pq.ParquetWriter(out, schema, compression="zstd")
+            arrays = [
+                pa.array(
+                    [None if v is None else convert(v) for v in values], type=field.type
+                )
+                for values, field, convert in zip(zip(*rows), schema, converters)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        if writer is None:
+            names = [col["name"] for col in table["columns"]]
+            empty = pa.schema([(name, pa.string()) for name in names])
+            writer = pq.ParquetWriter(out, empty, compression="zstd")
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _arrow_type(column: Any):
+    """Arrow type for a cursor description column; anything unusual is a string.
+
+    numeric keeps its exact value: a decimal of the declared precision and scale,
+    or a string when the column is unconstrained or too wide for Arrow.
+    """
+    if column.type_code == NUMERIC_OID:
+        precision, scale = column.precision, column.scale
+        if precision and scale is not None and 0 <= scale <= precision <= 76:
+            if precision <= 38:
+                return pa.decimal128(precision, scale)
+            return pa.decimal256(precision, scale)
+        return pa.string()
+    return {
+        16: pa.bool_(),
+        20: pa.int64(),
+        21: pa.int16(),
+        23: pa.int32(),
+        700: pa.float32(),
+        701: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+        1184: pa.timestamp("us", tz="UTC"),
+    }.get(column.type_code, pa.string())
+
+
+def _arrow_converter(arrow_type) -> Callable[[Any], Any]:
+    if arrow_type == pa.string():
+        return lambda v: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+    if pa.types.is_decimal(arrow_type):
+        # NaN is a legal numeric value but has no Arrow decimal form.
+        return lambda v: None if v.is_nan() else v
+    if pa.types.is_floating(arrow_type):
+        return lambda v: float(v) if isinstance(v, Decimal) else v
+    return lambda v: v
+
+
+def write_file_export(
+    conn: connection,
+    tables: list[TableInfo],
+    path: Path,
+    fmt: str,
+    compress: bool = False,
+    as_archive: bool = True,
+) -> Iterator[ExportProgress]:
+    """Export tables as CSV or Parquet.
+
+    Tables go into a zip archive with one file per table; without
+    ``as_archive`` the first table is written as a plain file (CSV
+    optionally gzip compressed).
+    """
+    writer = _copy_csv if fmt == "csv" else _write_parquet
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("Parquet export requires the pyarrow package.")
+    if not as_archive:
+        opener = gzip.open if compress and fmt == "csv" else open
+        yield (tables[0]["name"], "exporting", False)
+        with opener(path, "wb") as out:
+            writer(conn, tables[0], out)
+        yield (tables[0]["name"], size_label(path.stat().st_size), True)
+        return
+    mode = zipfile.ZIP_DEFLATED if compress and fmt == "csv" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(path, "w", compression=mode) as archive:
+        for table in tables:
+            yield (table["name"], "exporting", False)
+            name = f"{table['name']}.{fmt}"
+            try:
+                with archive.open(name, "w", force_zip64=True) as out:
+                    writer(conn, table, out)
+                size = archive.getinfo(name).file_size
+                yield (table["name"], size_label(size), True)
+            except Exception as e:
+                logging.exception(f"Export of {table['name']} failed: {e}")
+                conn.rollback()
+                yield (table["name"], str(e).split("\n")[0], True)
+
+
+def size_label(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:,.0f} {unit}"
+        size /= 1024
+    return f"{size:,.1f} GB"
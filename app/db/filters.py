@@ -0,0 +1,109 @@
+import datetime
+from typing import Any, NamedTuple
+from psycopg2 import sql
+from .introspection import IndexInfo, TableInfo
+
+TIME_RANGES: dict[str, datetime.timedelta | None] = {
+    "24h": datetime.timedelta(hours=24),
+    "7d": datetime.timedelta(days=7),
+    "30d": datetime.timedelta(days=30),
+    "all": None,
+}
+LARGE_TABLE_ROWS = 1_000_000
+SAMPLE_TARGET_ROWS = 200_000
+# Exploration sample choices: "rows:N" reads about N rows, "percent:P" about P%.
+SAMPLE_OPTIONS: dict[str, str] = {
+    "exact": "Exact",
+    "rows:1000": "Sample ~1k rows",
+    "rows:10000": "Sample ~10k rows",
+    "rows:100000": "Sample ~100k rows",
+    "percent:0.1": "Sample 0.1%",
+    "percent:1": "Sample 1%",
+    "percent:10": "Sample 10%",
+}
+
+
+class TimeFilterPlan(NamedTuple):
+    """How a time-range filter will be applied to a table."""
+
+    where: sql.Composable | None
+    params: list[Any]
+    since: datetime.datetime | None
+    until: datetime.datetime | None
+    sample_percent: float | None
+    warning: str
+
+
+NO_TIME_FILTER = TimeFilterPlan(None, [], None, None, None, "")
+
+
+def sample_percent_for(row_estimate: int) -> float:
+    """TABLESAMPLE percentage that reads roughly SAMPLE_TARGET_ROWS rows."""
+    return round(max(min(SAMPLE_TARGET_ROWS / row_estimate * 100, 100.0), 0.01), 2)
+
+
+def explore_sample_percent(option: str, row_estimate: int) -> float | None:
+    """TABLESAMPLE percentage for an exploration sample option; None reads exactly.
+
+    Row-count options are converted with the planner's row estimate, so
+    tables no bigger than the requested sample (or never analyzed) are read
+    in full.
+    """
+    kind, _, amount = option.partition(":")
+    if kind == "percent":
+        return float(amount)
+    if kind == "rows" and row_estimate > int(amount):
+        return max(round(int(amount) / row_estimate * 100, 4), 0.0001)
+    return None
+
+
+def sample_label(sample_percent: float | None) -> str:
+    return "" if sample_percent is None else f"{sample_percent:g}% sample"
+
+
+def range_index(table: TableInfo, column: str) -> IndexInfo | None:
+    """An index usable for range predicates on column, if one exists.
+
+    B-tree indexes help only when the column leads the index; a BRIN index
+    helps wherever the column appears.
+    """
+    for index in table["indexes"]:
+        if index["method"] == "btree" and index["columns"][:1] == [column]:
+            return index
+        if index["method"] == "brin" and column in index["columns"]:
+            return index
+    return None
+
+
+def plan_time_filter(
+    table: TableInfo, column: str, range_key: str
+) -> TimeFilterPlan:
+    """Build the WHERE clause for a time range and decide whether to sample.
+
+    Filtering an unindexed timestamp on a large table is a full scan, so
+    aggregates over it fall back to a TABLESAMPLE sized to roughly
+    SAMPLE_TARGET_ROWS and the caller is told how to index the column.
+    The "all" range has nothing to filter and reads the table exactly.
+    """
+    span = TIME_RANGES.get(range_key)
+    if not column or span is None:
+        return NO_TIME_FILTER
+    # Whole minutes keep the query text and parameters stable between
+    # reloads, so repeated views can be answered from the query cache.
+    until = datetime.datetime.now(datetime.timezone.utc).replace(
+        second=0, microsecond=0
+    )
+    since = until - span
+    where = sql.SQL("{} >= %s").format(sql.Identifier(column))
+    params: list[Any] = [since]
+    if range_index(table, column) or table["row_estimate"] < LARGE_TABLE_ROWS:
+        return TimeFilterPlan(where, params, since, until, None, "")
+    sample_percent = sample_percent_for(table["row_estimate"])
+    warning = (
+        f"{column} is not indexed, so filtering on it scans all "
+        f"~{table['row_estimate']:,} rows of {table['name']}; charts use a "
+        f"{sample_percent}% sample. "
+        f"Consider: CREATE INDEX ON {table['schema']}.{table['relname']} "
+        f"USING brin ({column});"
+    )
+    return TimeFilterPlan(where, params, since, until, sample_percent, warning)
@@ -0,0 +1,170 @@
+import threading
+from typing import Hashable, TypedDict
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from .rollups import ROLLUP_SCHEMA
+
+
+class ColumnInfo(TypedDict):
+    name: str
+    type: str
+    not_null: bool
+
+
+class IndexInfo(TypedDict):
+    name: str
+    method: str
+    columns: list[str]
+    unique: bool
+    primary: bool
+
+
+class TableInfo(TypedDict):
+    name: str
+    schema: str
+    relname: str
+    columns: list[ColumnInfo]
+    primary_key: list[str]
+    indexes: list[IndexInfo]
+    row_estimate: int
+
+
+# Substrings of format_type() names that classify a column for charts and stats.
+NUMERIC_TYPES = ["integer", "bigint", "numeric", "double precision", "real"]
+TIME_TYPES = ["timestamp", "date"]
+CATEGORICAL_TYPES = ["character varying", "text", "char"]
+
+
+def columns_of_kind(table: TableInfo, types: list[str]) -> list[str]:
+    """Names of the table's columns whose type contains one of ``types``."""
+    return [
+        col["name"]
+        for col in table["columns"]
+        if any(t in col["type"] for t in types)
+    ]
+
+
+# The app's own rollup tables are not shown as tables.
+USER_SCHEMAS = f"""
+    n.nspname NOT IN ('pg_catalog', 'information_schema',
+                      '{ROLLUP_SCHEMA.replace("'", "''")}')
+    AND n.nspname NOT LIKE 'pg\\_toast%'
+    AND n.nspname NOT LIKE 'pg\\_temp\\_%'
+"""
+
+SCHEMA_QUERY = f"""
+    SELECT
+        n.nspname,
+        c.relname,
+        c.reltuples::bigint,
+        COALESCE((
+            SELECT json_agg(json_build_object(
+                'name', a.attname,
+                'type', CASE WHEN t.typcategory = 'A' THEN 'ARRAY'
+                             ELSE format_type(a.atttypid, NULL) END,
+                'not_null', a.attnotnull
+            ) ORDER BY a.attnum)
+            FROM pg_attribute a
+            JOIN pg_type t ON t.oid = a.atttypid
+            WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        ), '[]'::json),
+        COALESCE((
+            SELECT json_agg(json_build_object(
+                'name', ic.relname,
+                'method', am.amname,
+                'columns', (
+                    SELECT COALESCE(json_agg(a.attname ORDER BY k.ord), '[]'::json)
+                    FROM unnest(x.indkey) WITH ORDINALITY AS k(attnum, ord)
+                    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = k.attnum
+                ),
+                'unique', x.indisunique,
+                'primary', x.indisprimary
+            ) ORDER BY ic.relname)
+            FROM pg_index x
+            JOIN pg_class ic ON ic.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = ic.relam
+            WHERE x.indrelid = c.oid
+        ), '[]'::json)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition AND {USER_SCHEMAS}
+    ORDER BY n.nspname <> 'public', n.nspname, c.relname;
+"""
+
+# Any CREATE/ALTER/DROP of a table, column or index writes a new catalog row
+# version, which changes its xmin; hashing oid:xmin pairs detects DDL without
+# reading the full catalog.
+FINGERPRINT_QUERY = f"""
+    WITH rels AS (
+        SELECT c.oid, c.xmin
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p', 'i') AND {USER_SCHEMAS}
+    )
+    SELECT md5(
+        COALESCE((SELECT string_agg(oid::text || ':' || xmin::text, ',' ORDER BY oid) FROM rels), '')
+        || '|' ||
+        COALESCE((
+            SELECT string_agg(
+                a.attrelid::text || ':' || a.attnum::text || ':' || a.xmin::text, ','
+                ORDER BY a.attrelid, a.attnum
+            )
+            FROM pg_attribute a
+            JOIN rels ON rels.oid = a.attrelid
+            WHERE a.attnum > 0
+        ), '')
+    );
+"""
+
+_schema_cache: dict[Hashable, tuple[str, list[TableInfo]]] = {}
+_cache_lock = threading.Lock()
+
+
+def schema_fingerprint(conn: connection) -> str:
+    with conn.cursor() as cur:
+        cur.execute(FINGERPRINT_QUERY)
+        return cur.fetchone()[0]
+
+
+def fetch_tables(conn: connection) -> list[TableInfo]:
+    """Read every user table with its columns, indexes and row estimate in one query."""
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_QUERY)
+        rows = cur.fetchall()
+    tables: list[TableInfo] = []
+    for schema, relname, row_estimate, columns, indexes in rows:
+        primary = next((i for i in indexes if i["primary"]), None)
+        tables.append(
+            {
+                "name": relname if schema == "public" else f"{schema}.{relname}",
+                "schema": schema,
+                "relname": relname,
+                "columns": columns,
+                "primary_key": primary["columns"] if primary else [],
+                "indexes": indexes,
+                "row_estimate": max(int(row_estimate or 0), -1),
+            }
+        )
+    return tables
+
+
+def load_schema(conn: connection, cache_key: Hashable) -> list[TableInfo]:
+    """Return the schema, re-reading the catalog only when its fingerprint changed."""
+    fingerprint = schema_fingerprint(conn)
+    with _cache_lock:
+        cached = _schema_cache.get(cache_key)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+    tables = fetch_tables(conn)
+    with _cache_lock:
+        _schema_cache[cache_key] = (fingerprint, tables)
+    return tables
+
+
+def find_table(tables: list[TableInfo], name: str) -> TableInfo | None:
+    return next((t for t in tables if t["name"] == name), None)
+
+
+def table_identifier(table: TableInfo) -> sql.Identifier:
+    """Schema-qualified identifier for use in composed queries."""
+    return sql.Identifier(table["schema"], table["relname"])
@@ -0,0 +1,213 @@
+from typing import Any, Hashable, Iterator
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from .aggregation import sampled_table
+from .cache import query_cache
+from .introspection import ColumnInfo, TableInfo
+
+PAGE_SIZES = [100, 1000, 5000, 10000]
+DEFAULT_PAGE_SIZE = 1000
+# Column types whose values can be large; the table view fetches a preview.
+WIDE_TYPES = ("text", "json", "jsonb", "xml", "bytea", "tsvector", "ARRAY")
+WIDE_PREVIEW_CHARS = 200
+TRUNCATION_MARK = "…"
+
+
+def estimate_row_count(conn: connection, table: sql.Identifier) -> int | None:
+    """Planner row estimate from pg_class; None if the table was never analyzed."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s);",
+            (table.as_string(conn),),
+        )
+        row = cur.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def is_wide(column: ColumnInfo) -> bool:
+    return column["type"] in WIDE_TYPES
+
+
+def select_list(columns: list[ColumnInfo], full: list[str]) -> sql.Composable:
+    """SELECT list for the table view.
+
+    Wide columns are cut to WIDE_PREVIEW_CHARS on the server and marked
+    with TRUNCATION_MARK, so long JSON and text values are not sent in full
+    until a cell is expanded. Columns named in ``full`` (the keyset
+    columns) are always fetched as they are.
+    """
+    items: list[sql.Composable] = []
+    for column in columns:
+        ident = sql.Identifier(column["name"])
+        if not is_wide(column) or column["name"] in full:
+            items.append(ident)
+            continue
+        items.append(
+            sql.SQL(
+                "CASE WHEN length({c}::text) > {n} "
+                "THEN left({c}::text, {n}) || {mark} ELSE {c}::text END AS {c}"
+            ).format(
+                c=ident,
+                n=sql.Literal(WIDE_PREVIEW_CHARS),
+                mark=sql.Literal(TRUNCATION_MARK),
+            )
+        )
+    return sql.SQL(", ").join(items)
+
+
+def fetch_cell(
+    conn: connection,
+    table: sql.Identifier,
+    column: str,
+    key_columns: list[str],
+    key: list[Any],
+) -> Any:
+    """Fetch one full value by primary key, for a cell the table view cut short."""
+    query = sql.SQL("SELECT {} FROM {} WHERE ({}) = ({})").format(
+        sql.Identifier(column),
+        table,
+        sql.SQL(", ").join(sql.Identifier(c) for c in key_columns),
+        sql.SQL(", ").join([sql.Placeholder()] * len(key)),
+    )
+    with conn.cursor() as cur:
+        cur.execute(query, key)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def order_columns(table: TableInfo, order_column: str = "") -> tuple[list[str], bool]:
+    """Columns the table view is ordered by, and whether to page it by key.
+
+    Keyset pagination skips rows whose key is NULL and, on a key that is
+    not unique, rows that share the boundary value. It is only used when
+    the key ends in the primary key and every key column is NOT NULL;
+    other orders are paged with OFFSET.
+    """
+    key_columns = [order_column] if order_column else []
+    key_columns += [c for c in table["primary_key"] if c not in key_columns]
+    not_null = {c["name"] for c in table["columns"] if c["not_null"]}
+    not_null.update(table["primary_key"])
+    keyset = bool(table["primary_key"]) and all(c in not_null for c in key_columns)
+    return (key_columns, keyset)
+
+
+def _page_query(
+    table: sql.Identifier,
+    key_columns: list[str],
+    page_size: int,
+    after: list[Any] | None = None,
+    offset: int = 0,
+    where: sql.Composable | None = None,
+    where_params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    select_columns: list[ColumnInfo] | None = None,
+) -> tuple[sql.Composable, list[Any]]:
+    select = (
+        select_list(select_columns, key_columns) if select_columns else sql.SQL("*")
+    )
+    query = sql.SQL("SELECT {} FROM {}").format(
+        select, sampled_table(table, sample_percent)
+    )
+    conditions: list[sql.Composable] = []
+    params: list[Any] = []
+    if where is not None:
+        conditions.append(where)
+        params.extend(where_params or [])
+    if key_columns and after is not None:
+        conditions.append(
+            sql.SQL("({}) > ({})").format(
+                sql.SQL(", ").join(sql.Identifier(c) for c in key_columns),
+                sql.SQL(", ").join([sql.Placeholder()] * len(after)),
+            )
+        )
+        params.extend(after)
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    if key_columns:
+        query += sql.SQL(" ORDER BY {}").format(
+            sql.SQL(", ").join(sql.Identifier(c) for c in key_columns)
+        )
+    query += sql.SQL(" LIMIT %s")
+    params.append(page_size)
+    if after is None and offset:
+        query += sql.SQL(" OFFSET %s")
+        params.append(offset)
+    return (query, params)
+
+
+def fetch_page(
+    conn: connection,
+    table: sql.Identifier,
+    key_columns: list[str],
+    page_size: int,
+    after: list[Any] | None = None,
+    offset: int = 0,
+    where: sql.Composable | None = None,
+    where_params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    select_columns: list[ColumnInfo] | None = None,
+    cache_scope: Hashable | None = None,
+) -> tuple[list[str], list[tuple]]:
+    """Fetch one page of rows ordered by key_columns.
+
+    With ``after`` set the page starts right after that key (keyset
+    pagination, an index range scan on the key; see order_columns for when
+    it is safe); otherwise ``offset`` rows are skipped. Without key columns
+    the table is read in physical order. ``where`` is an extra filter ANDed
+    with the keyset condition, and ``sample_percent`` pages through a
+    repeatable TABLESAMPLE instead of the whole table. ``select_columns``
+    limits the columns fetched (see select_list); by default every column
+    is. Pages are served from the query cache under ``cache_scope`` when one
+    is given.
+    """
+    query, params = _page_query(
+        table,
+        key_columns,
+        page_size,
+        after,
+        offset,
+        where,
+        where_params,
+        sample_percent,
+        select_columns,
+    )
+    return query_cache.fetch(conn, cache_scope, query, params)
+
+
+def iter_page(
+    conn: connection,
+    table: sql.Identifier,
+    key_columns: list[str],
+    page_size: int,
+    after: list[Any] | None = None,
+    offset: int = 0,
+    where: sql.Composable | None = None,
+    where_params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    select_columns: list[ColumnInfo] | None = None,
+    cache_scope: Hashable | None = None,
+) -> Iterator[tuple[list[str], list[tuple]]]:
+    """Like fetch_page, but yield the page in batches as the server produces them.
+
+    The first batch is small so the browser can show rows while the rest
+    of the page is still being read from a server-side cursor.
+    """
+    query, params = _page_query(
+        table,
+        key_columns,
+        page_size,
+        after,
+        offset,
+        where,
+        where_params,
+        sample_percent,
+        select_columns,
+    )
+    return query_cache.stream(conn, cache_scope, query, params)
+
+
+def row_key(columns: list[str], row: tuple, key_columns: list[str]) -> list[Any]:
+    """Extract the keyset values of a row."""
+    return [row[columns.index(c)] for c in key_columns]
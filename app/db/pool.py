@@ -0,0 +1,305 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import TypedDict
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection
+from ..states.credentials_state import Env
+from .tunnels import tunnel_manager, uses_ssh
+
+POOL_MIN_SIZE = int(os.environ.get("PG_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.environ.get("PG_POOL_MAX_SIZE", "8"))
+POOL_IDLE_TIMEOUT = float(os.environ.get("PG_POOL_IDLE_TIMEOUT", "300"))
+POOL_CHECKOUT_TIMEOUT = float(os.environ.get("PG_POOL_CHECKOUT_TIMEOUT", "10"))
+HEALTH_CHECK_INTERVAL = float(os.environ.get("PG_POOL_HEALTH_CHECK_INTERVAL", "5"))
+CONNECT_TIMEOUT = 3
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PoolStats(TypedDict):
+    size: int
+    idle: int
+    in_use: int
+    checkouts: int
+    created: int
+    discarded: int
+    health_check_failures: int
+    timeouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+@dataclass(frozen=True)
+class PoolKey:
+    """Identifies the database an environment points at, independent of its name."""
+
+    host: str
+    port: int
+    database: str
+    username: str
+    ssh_host: str | None
+    ssh_port: int
+    ssh_user: str | None
+    statement_timeout: int
+    secret_digest: str
+
+
+def pool_key(env: Env) -> PoolKey:
+    """Build the pool key for an environment.
+
+    Secrets are folded into a digest so editing a password or SSH key yields
+    a fresh pool instead of reusing connections opened with stale credentials.
+    """
+    secret = f"{env.password}\x00{env.ssh_key or ''}".encode()
+    ssh = uses_ssh(env)
+    return PoolKey(
+        host=env.host,
+        port=env.port,
+        database=env.database,
+        username=env.username,
+        ssh_host=env.ssh_host if ssh else None,
+        ssh_port=env.ssh_port if ssh else 0,
+        ssh_user=env.ssh_user if ssh else None,
+        statement_timeout=max(env.statement_timeout, 0),
+        secret_digest=hashlib.sha256(secret).hexdigest(),
+    )
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of psycopg2 connections for one environment."""
+
+    def __init__(
+        self,
+        env: Env,
+        min_size: int = POOL_MIN_SIZE,
+        max_size: int = POOL_MAX_SIZE,
+        idle_timeout: float = POOL_IDLE_TIMEOUT,
+        checkout_timeout: float = POOL_CHECKOUT_TIMEOUT,
+    ):
+        self.env = env
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._cond = threading.Condition()
+        self._idle: list[tuple[connection, float]] = []
+        self._size = 0
+        self._checkouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._health_check_failures = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._closed = False
+
+    def getconn(self) -> connection:
+        """Check out a healthy connection, opening a new one if the pool has room.
+
+        For SSH environments the checkout holds a reference on the shared
+        tunnel until the connection is handed back with putconn.
+        """
+        address = (self.env.host, self.env.port)
+        if uses_ssh(self.env):
+            address = tunnel_manager.acquire(self.env)
+        try:
+            return self._checkout(address)
+        except BaseException:
+            if uses_ssh(self.env):
+                tunnel_manager.release(self.env)
+            raise
+
+    def _checkout(self, address: tuple[str, int]) -> connection:
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            with self._cond:
+                conn, idle_since = self._reserve(deadline)
+                waited = time.monotonic() - started
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            if waited > 1:
+                logging.warning(
+                    f"Waited {waited:.2f}s for a connection to {self.env.database}"
+                )
+            if conn is None:
+                try:
+                    return self._connect(*address)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            if self._is_healthy(conn, idle_since):
+                return conn
+            with self._cond:
+                self._health_check_failures += 1
+                self._discard(conn)
+            started = time.monotonic()
+
+    def putconn(self, conn: connection):
+        """Return a connection to the pool, discarding it if it is unusable."""
+        reusable = not conn.closed
+        if reusable and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                reusable = False
+        with self._cond:
+            if reusable and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._reap_idle()
+            self._cond.notify()
+        if uses_ssh(self.env):
+            tunnel_manager.release(self.env)
+
+    def close(self):
+        """Close every idle connection, and the rest as they are handed back.
+
+        The environment's SSH tunnel is stopped too unless connections
+        still hold it.
+        """
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+        if uses_ssh(self.env):
+            tunnel_manager.discard(self.env)
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "checkouts": self._checkouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "health_check_failures": self._health_check_failures,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": (
+                    self._wait_total / self._checkouts * 1000 if self._checkouts else 0.0
+                ),
+                "wait_max_ms": self._wait_max * 1000,
+            }
+
+    def _reserve(self, deadline: float) -> tuple[connection | None, float]:
+        """Pop an idle connection or claim a slot for a new one (lock held)."""
+        while True:
+            self._reap_idle()
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return (None, 0.0)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timeouts += 1
+                raise PoolTimeout(
+                    f"No connection available after {self.checkout_timeout:.0f}s "
+                    f"({self.max_size} connections in use)."
+                )
+            self._cond.wait(remaining)
+
+    def _reap_idle(self):
+        """Close connections idle past the timeout, keeping at least min_size (lock held)."""
+        now = time.monotonic()
+        keep = []
+        for conn, idle_since in self._idle:
+            if now - idle_since > self.idle_timeout and self._size > self.min_size:
+                self._discard(conn)
+            else:
+                keep.append((conn, idle_since))
+        self._idle = keep
+
+    def _discard(self, conn: connection):
+        """Close a connection and free its slot (lock held)."""
+        self._size -= 1
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception as e:
+            logging.exception(f"Error closing pooled connection: {e}")
+
+    def _is_healthy(self, conn: connection, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logging.warning(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    def _connect(self, host: str, port: int) -> connection:
+        conn = psycopg2.connect(
+            host=host,
+            port=port,
+            dbname=self.env.database,
+            user=self.env.username,
+            password=self.env.password,
+            connect_timeout=CONNECT_TIMEOUT,
+            options=f"-c statement_timeout={max(self.env.statement_timeout, 0) * 1000}",
+        )
+        with self._cond:
+            self._created += 1
+        return conn
+
+
+_pools: dict[PoolKey, ConnectionPool] = {}
+_owners: dict[int, ConnectionPool] = {}
+_registry_lock = threading.Lock()
+
+
+def get_pool(env: Env) -> ConnectionPool:
+    """Return the process-wide pool for an environment, creating it on first use.
+
+    A new pool for changed credentials replaces, and closes, the pool
+    opened with the old ones.
+    """
+    key = pool_key(env)
+    replaced = []
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(env)
+            for old_key in list(_pools):
+                if replace(old_key, secret_digest=key.secret_digest) == key:
+                    replaced.append(_pools.pop(old_key))
+            _pools[key] = pool
+    for old in replaced:
+        old.close()
+    return pool
+
+
+def get_connection(env: Env) -> connection:
+    """Check out a connection from the environment's pool."""
+    pool = get_pool(env)
+    conn = pool.getconn()
+    with _registry_lock:
+        _owners[id(conn)] = pool
+    return conn
+
+
+def release_connection(conn: connection):
+    """Hand a connection obtained from get_connection back to its pool."""
+    with _registry_lock:
+        pool = _owners.pop(id(conn), None)
+    if pool is None:
+        conn.close()
+        return
+    pool.putconn(conn)
@@ -0,0 +1,421 @@
+import atexit
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Hashable, TypedDict
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from ..states.credentials_state import Env
+from .aggregation import (
+    MAX_SERIES_COLUMNS,
+    TARGET_POINTS,
+    aggregate_series,
+    bucket_expr,
+    bucket_floor,
+    bucket_label,
+    choose_bucket_seconds,
+    json_value,
+    series_key,
+)
+from .cache import query_cache
+from .pool import PoolKey, get_connection, pool_key, release_connection
+
+# Off by default: rollups are tables the app creates, so they need write access.
+ROLLUPS_ENABLED = os.environ.get("ROLLUPS", "0") == "1"
+ROLLUP_SCHEMA = os.environ.get("ROLLUP_SCHEMA", "dashboard_rollups")
+ROLLUP_REFRESH_INTERVAL = float(os.environ.get("ROLLUP_REFRESH_INTERVAL", "300"))
+ROLLUP_IDLE_TIMEOUT = float(os.environ.get("ROLLUP_IDLE_TIMEOUT", str(7 * 86400)))
+ROLLUP_CHECK_INTERVAL = 10
+STATE_TABLE = "rollup_state"
+# Aggregates that can be recombined from per-bucket count/sum/min/max.
+ROLLUP_FUNCTIONS = ["avg", "sum", "min", "max"]
+
+
+class Rollup(TypedDict):
+    """Per-bucket aggregates of one table's time column, kept in ROLLUP_SCHEMA.
+
+    Each row holds a bucket's row count and, for the i-th of ``columns``,
+    its sum (``s{i}``), non-null count (``n{i}``), minimum (``lo{i}``) and
+    maximum (``hi{i}``). ``rolled_to`` is the newest source timestamp
+    rolled up so far; None until the first refresh.
+    """
+
+    name: str
+    schema: str
+    relname: str
+    time_column: str
+    bucket_seconds: int
+    columns: list[str]
+    rolled_to: datetime.datetime | None
+
+
+def rollup_for(
+    schema: str,
+    relname: str,
+    time_column: str,
+    bucket_seconds: int,
+    numeric_columns: list[str],
+) -> Rollup:
+    """Describe the rollup of a table; the name is stable for the same inputs."""
+    digest = hashlib.sha1(
+        f"{schema}.{relname}.{time_column}.{bucket_seconds}".encode()
+    ).hexdigest()[:8]
+    return {
+        "name": f"{relname[:40]}_{bucket_label(bucket_seconds)}_{digest}",
+        "schema": schema,
+        "relname": relname,
+        "time_column": time_column,
+        "bucket_seconds": bucket_seconds,
+        "columns": numeric_columns[:MAX_SERIES_COLUMNS],
+        "rolled_to": None,
+    }
+
+
+def ensure_rollup(conn: connection, rollup: Rollup) -> Rollup:
+    """Create the rollup's table and state row, rebuilding it if its columns changed."""
+    state = sql.Identifier(ROLLUP_SCHEMA, STATE_TABLE)
+    target = sql.Identifier(ROLLUP_SCHEMA, rollup["name"])
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(
+                sql.Identifier(ROLLUP_SCHEMA)
+            )
+        )
+        cur.execute(
+            sql.SQL(
+                "CREATE TABLE IF NOT EXISTS {} (name text PRIMARY KEY, "
+                "source text NOT NULL, time_column text NOT NULL, "
+                "bucket_seconds int NOT NULL, columns text[] NOT NULL, "
+                "rolled_to timestamptz, refreshed_at timestamptz)"
+            ).format(state)
+        )
+        cur.execute(
+            sql.SQL("SELECT columns, rolled_to FROM {} WHERE name = %s").format(state),
+            [rollup["name"]],
+        )
+        row = cur.fetchone()
+        if row is not None and list(row[0]) == rollup["columns"]:
+            conn.commit()
+            return {**rollup, "rolled_to": row[1]}
+        definitions = [sql.SQL("bucket timestamptz PRIMARY KEY, count bigint NOT NULL")]
+        definitions += [
+            sql.SQL("s{i} numeric, n{i} bigint, lo{i} numeric, hi{i} numeric").format(
+                i=sql.SQL(str(i))
+            )
+            for i in range(len(rollup["columns"]))
+        ]
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(target))
+        cur.execute(
+            sql.SQL("CREATE TABLE {} ({})").format(
+                target, sql.SQL(", ").join(definitions)
+            )
+        )
+        cur.execute(
+            sql.SQL(
+                "INSERT INTO {} (name, source, time_column, bucket_seconds, columns) "
+                "VALUES (%s, %s, %s, %s, %s) ON CONFLICT (name) DO UPDATE SET "
+                "columns = EXCLUDED.columns, rolled_to = NULL, refreshed_at = NULL"
+            ).format(state),
+            [
+                rollup["name"],
+                f"{rollup['schema']}.{rollup['relname']}",
+                rollup["time_column"],
+                rollup["bucket_seconds"],
+                rollup["columns"],
+            ],
+        )
+    conn.commit()
+    return {**rollup, "rolled_to": None}
+
+
+def refresh_rollup(conn: connection, rollup: Rollup) -> Rollup:
+    """Roll up the source rows from the last rolled bucket on, in one scan.
+
+    The last bucket may have been partial when it was rolled up, so it is
+    recomputed and newer buckets are added. Earlier buckets are never
+    revisited: rows inserted late with old timestamps, and deleted rows,
+    are only picked up when the rollup is rebuilt.
+    """
+    state = sql.Identifier(ROLLUP_SCHEMA, STATE_TABLE)
+    target = sql.Identifier(ROLLUP_SCHEMA, rollup["name"])
+    col = sql.Identifier(rollup["time_column"])
+    names = [sql.SQL("count")]
+    selects = [sql.SQL("count(*)")]
+    for i, column in enumerate(rollup["columns"]):
+        names += [sql.SQL(f"{k}{i}") for k in ("s", "n", "lo", "hi")]
+        selects += [
+            sql.SQL("{}({})").format(sql.SQL(func), sql.Identifier(column))
+            for func in ("sum", "count", "min", "max")
+        ]
+    with conn.cursor() as cur:
+        # The first refresh scans the whole table; it runs in the background.
+        cur.execute("SET LOCAL statement_timeout = 0")
+        # Serializes refreshes of the same rollup across sessions and processes.
+        cur.execute(
+            sql.SQL("SELECT 1 FROM {} WHERE name = %s FOR UPDATE").format(state),
+            [rollup["name"]],
+        )
+        cur.execute(sql.SQL("SELECT max(bucket) FROM {}").format(target))
+        start = cur.fetchone()[0]
+        condition = sql.SQL("{} IS NOT NULL").format(col)
+        params: list[Any] = []
+        if start is not None:
+            condition = sql.SQL("{} >= %s").format(col)
+            params = [start]
+        cur.execute(
+            sql.SQL(
+                "WITH agg AS (SELECT {bucket} AS bucket, {selects}, "
+                "max({col}) AS newest FROM {source} WHERE {condition} GROUP BY 1), "
+                "ins AS (INSERT INTO {target} (bucket, {names}) "
+                "SELECT bucket, {names} FROM agg "
+                "ON CONFLICT (bucket) DO UPDATE SET {updates}) "
+                "SELECT max(newest) FROM agg"
+            ).format(
+                bucket=bucket_expr(
+                    rollup["time_column"], rollup["bucket_seconds"], conn.server_version
+                ),
+                selects=sql.SQL(", ").join(
+                    sql.SQL("{} AS {}").format(s, n) for s, n in zip(selects, names)
+                ),
+                col=col,
+                source=sql.Identifier(rollup["schema"], rollup["relname"]),
+                condition=condition,
+                target=target,
+                names=sql.SQL(", ").join(names),
+                updates=sql.SQL(", ").join(
+                    sql.SQL("{n} = EXCLUDED.{n}").format(n=n) for n in names
+                ),
+            ),
+            params,
+        )
+        newest = cur.fetchone()[0]
+        cur.execute(
+            sql.SQL(
+                "UPDATE {} SET rolled_to = greatest(rolled_to, %s), "
+                "refreshed_at = now() WHERE name = %s RETURNING rolled_to"
+            ).format(state),
+            [newest, rollup["name"]],
+        )
+        rolled_to = cur.fetchone()[0]
+    conn.commit()
+    return {**rollup, "rolled_to": rolled_to}
+
+
+def _rollup_expr(func: str, i: int) -> sql.Composable:
+    if func == "avg":
+        return sql.SQL("sum(s{i}) / nullif(sum(n{i}), 0)").format(i=sql.SQL(str(i)))
+    if func == "sum":
+        return sql.SQL("sum(s{})").format(sql.SQL(str(i)))
+    return sql.SQL("{}({}{})").format(
+        sql.SQL(func), sql.SQL("lo" if func == "min" else "hi"), sql.SQL(str(i))
+    )
+
+
+def rollup_series(
+    conn: connection,
+    rollup: Rollup,
+    func: str = "avg",
+    numeric_columns: list[str] | None = None,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    target_points: int = TARGET_POINTS,
+    cache_scope: Hashable | None = None,
+) -> tuple[int, list[dict[str, Any]]] | None:
+    """The bucketed series of ``bucketed_series``, read from a rollup.
+
+    Returns None when the rollup cannot answer: it has not been built,
+    ``func`` cannot be recombined from its aggregates, or the range needs
+    buckets finer than the rollup's. Only whole chart buckets between
+    ``since`` and the one holding ``rolled_to`` are read from the rollup;
+    the partial bucket before them and everything from the ``rolled_to``
+    bucket on (which may have gained rows since the refresh) are
+    aggregated from the table itself, so the series matches the table's
+    even between refreshes.
+    """
+    numeric_columns = (numeric_columns or [])[:MAX_SERIES_COLUMNS]
+    rolled_to = rollup["rolled_to"]
+    if rolled_to is None:
+        return None
+    if numeric_columns and func not in ROLLUP_FUNCTIONS:
+        return None
+    if any(c not in rollup["columns"] for c in numeric_columns):
+        return None
+    target = sql.Identifier(ROLLUP_SCHEMA, rollup["name"])
+    start, end = since, until
+    if since is None:
+        _, rows = query_cache.fetch(
+            conn, cache_scope, sql.SQL("SELECT min(bucket) FROM {}").format(target)
+        )
+        start, end = rows[0][0], rolled_to
+    seconds = choose_bucket_seconds(start, end, target_points)
+    if seconds % rollup["bucket_seconds"]:
+        return None
+    cutoff = bucket_floor(rolled_to, seconds, conn.server_version)
+    boundary = None
+    if since is not None:
+        boundary = bucket_floor(since, seconds, conn.server_version)
+        if boundary < since:
+            boundary += datetime.timedelta(seconds=seconds)
+    selects = [
+        sql.SQL("{} AS timestamp").format(
+            bucket_expr("bucket", seconds, conn.server_version)
+        ),
+        sql.SQL("sum(count)::bigint AS count"),
+    ]
+    selects += [
+        sql.SQL("{} AS {}").format(
+            _rollup_expr(func, rollup["columns"].index(column)),
+            sql.Identifier(series_key(func, column)),
+        )
+        for column in numeric_columns
+    ]
+    query = sql.SQL("SELECT {} FROM {} WHERE bucket < %s").format(
+        sql.SQL(", ").join(selects), target
+    )
+    params: list[Any] = [cutoff]
+    if boundary is not None:
+        query += sql.SQL(" AND bucket >= %s")
+        params.append(boundary)
+    query += sql.SQL(" GROUP BY 1 ORDER BY 1")
+    names, rows = query_cache.fetch(conn, cache_scope, query, params)
+    if not rows:
+        return None
+    col = sql.Identifier(rollup["time_column"])
+
+    def from_table(where: sql.Composable, params: list[Any]) -> list[dict[str, Any]]:
+        return aggregate_series(
+            conn,
+            sql.Identifier(rollup["schema"], rollup["relname"]),
+            rollup["time_column"],
+            seconds,
+            func=func,
+            numeric_columns=numeric_columns,
+            where=where,
+            params=params,
+            cache_scope=cache_scope,
+        )
+
+    head: list[dict[str, Any]] = []
+    if boundary is not None and boundary > since:
+        head = from_table(
+            sql.SQL("{c} >= %s AND {c} < %s").format(c=col), [since, boundary]
+        )
+    tail = from_table(sql.SQL("{} >= %s").format(col), [cutoff])
+    middle = [
+        {name: json_value(value) for name, value in zip(names, row)} for row in rows
+    ]
+    return (seconds, head + middle + tail)
+
+
+@dataclass
+class _TrackedRollup:
+    env: Env
+    rollup: Rollup
+    built: bool = False
+    last_refresh: float = 0.0
+    last_requested: float = 0.0
+
+
+class RollupManager:
+    """Builds the rollups charts ask for and keeps them up to date.
+
+    A rollup is registered the first time a chart asks for it, then built
+    and refreshed every ``refresh_interval`` seconds by one background
+    thread, with connections from the environment's pool. Rollups nobody
+    has asked for in ``idle_timeout`` seconds stop being refreshed; their
+    tables stay and resume from where they stopped when asked for again.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = ROLLUP_REFRESH_INTERVAL,
+        idle_timeout: float = ROLLUP_IDLE_TIMEOUT,
+        check_interval: float = ROLLUP_CHECK_INTERVAL,
+    ):
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self._tracked: dict[tuple[PoolKey, str], _TrackedRollup] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def request(self, env: Env, rollup: Rollup) -> Rollup | None:
+        """Register a rollup; returns its latest state once it has been built."""
+        key = (pool_key(env), rollup["name"])
+        with self._lock:
+            entry = self._tracked.get(key)
+            if entry is None or entry.rollup["columns"] != rollup["columns"]:
+                entry = _TrackedRollup(env, rollup)
+                self._tracked[key] = entry
+                self._wake.set()
+                self._start_worker()
+            entry.last_requested = time.monotonic()
+            return entry.rollup if entry.built else None
+
+    def close(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def _start_worker(self):
+        """Start the background refresh thread once (lock held)."""
+        if self._worker is not None:
+            return
+        self._worker = threading.Thread(
+            target=self._run_worker, name="rollup-refresher", daemon=True
+        )
+        self._worker.start()
+
+    def _run_worker(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                self._refresh_due()
+            except Exception as e:
+                logging.exception(f"Rollup refresher error: {e}")
+            self._wake.wait(self.check_interval)
+
+    def _refresh_due(self):
+        now = time.monotonic()
+        with self._lock:
+            for key, entry in list(self._tracked.items()):
+                if now - entry.last_requested > self.idle_timeout:
+                    del self._tracked[key]
+            due = [
+                entry
+                for entry in self._tracked.values()
+                if not entry.last_refresh
+                or now - entry.last_refresh >= self.refresh_interval
+            ]
+        for entry in due:
+            if self._stopping.is_set():
+                return
+            self._refresh(entry)
+
+    def _refresh(self, entry: _TrackedRollup):
+        name = entry.rollup["name"]
+        conn = None
+        try:
+            conn = get_connection(entry.env)
+            rollup = entry.rollup
+            if not entry.built:
+                rollup = ensure_rollup(conn, rollup)
+            rollup = refresh_rollup(conn, rollup)
+            with self._lock:
+                entry.rollup = rollup
+                entry.built = True
+        except Exception as e:
+            logging.exception(f"Failed to refresh rollup {name}: {e}")
+        finally:
+            entry.last_refresh = time.monotonic()
+            if conn is not None:
+                release_connection(conn)
+
+
+rollup_manager = RollupManager()
+atexit.register(rollup_manager.close)
@@ -0,0 +1,264 @@
+from decimal import Decimal
+from typing import Any, Hashable, TypedDict
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from .aggregation import sampled_table
+from .cache import query_cache
+from .filters import LARGE_TABLE_ROWS, sample_percent_for
+from .introspection import TableInfo, table_identifier
+
+MAX_STATS_COLUMNS = 12
+MAX_CATEGORY_COLUMNS = 6
+TOP_N = 5
+PERCENTILES = [0.5, 0.95]
+
+
+class NumericStats(TypedDict):
+    column: str
+    null_fraction: float | None
+    min: float | None
+    max: float | None
+    mean: float | None
+    stddev: float | None
+    p50: float | None
+    p95: float | None
+
+
+class TopValue(TypedDict):
+    value: str
+    fraction: float
+
+
+class CategoryStats(TypedDict):
+    column: str
+    null_fraction: float | None
+    top: list[TopValue]
+
+
+class TableStats(TypedDict):
+    row_count: int
+    numeric: list[NumericStats]
+    categorical: list[CategoryStats]
+
+
+def _float(value: Any) -> float | None:
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _fraction(part: float | None, total: float) -> float | None:
+    return None if not total or part is None else part / total
+
+
+def _numeric(column: str, null_fraction: float | None = None) -> NumericStats:
+    return {
+        "column": column,
+        "null_fraction": null_fraction,
+        "min": None,
+        "max": None,
+        "mean": None,
+        "stddev": None,
+        "p50": None,
+        "p95": None,
+    }
+
+
+def table_stats(
+    conn: connection,
+    table: TableInfo,
+    numeric_columns: list[str],
+    categorical_columns: list[str],
+    where: sql.Composable | None = None,
+    params: list[Any] | None = None,
+    sample_percent: float | None = None,
+    cache_scope: Hashable | None = None,
+) -> TableStats:
+    """Per-column statistics for the KPI panel, in a single round trip.
+
+    Counts, nulls, min/max/mean/stddev come from one aggregate over the
+    rows. Percentiles and top values have to sort or group each column, so
+    on tables of LARGE_TABLE_ROWS or more they come from a TABLESAMPLE and
+    are approximate. With ``sample_percent`` everything is computed over
+    that sample and the row count is scaled back up.
+    """
+    numeric_columns = numeric_columns[:MAX_STATS_COLUMNS]
+    categorical_columns = categorical_columns[:MAX_CATEGORY_COLUMNS]
+    ident = table_identifier(table)
+    detail_percent = sample_percent
+    if detail_percent is None and table["row_estimate"] >= LARGE_TABLE_ROWS:
+        detail_percent = sample_percent_for(table["row_estimate"])
+    detail_table = sampled_table(ident, detail_percent)
+    condition = sql.SQL("") if where is None else sql.SQL(" WHERE ") + where
+
+    totals: list[sql.Composable] = [sql.SQL("count(*)")]
+    for name in numeric_columns:
+        col = sql.Identifier(name)
+        totals += [
+            sql.SQL("{}({})").format(sql.SQL(func), col)
+            for func in ("count", "min", "max", "avg", "stddev_samp")
+        ]
+    totals += [
+        sql.SQL("count({})").format(sql.Identifier(name))
+        for name in categorical_columns
+    ]
+    percentiles = [
+        sql.SQL("percentile_cont({}::float8[]) WITHIN GROUP (ORDER BY {})").format(
+            sql.Literal(PERCENTILES), sql.Identifier(name)
+        )
+        for name in numeric_columns
+    ] or [sql.SQL("NULL")]
+    tops = [
+        sql.SQL(
+            ", (SELECT json_agg(json_build_array(v, n)) FROM ("
+            "SELECT {col}::text AS v, count(*) AS n FROM {table}{cond} "
+            "GROUP BY 1 ORDER BY 2 DESC LIMIT {top}) t), "
+            "(SELECT count(*) FROM {table}{cond})"
+        ).format(
+            col=sql.Identifier(name),
+            table=detail_table,
+            cond=condition,
+            top=sql.Literal(TOP_N),
+        )
+        for name in categorical_columns
+    ]
+    query = sql.SQL(
+        "SELECT t.*, p.*{tops} FROM (SELECT {totals} FROM {table}{cond}) t, "
+        "(SELECT {pcts} FROM {detail}{cond}) p"
+    ).format(
+        tops=sql.SQL("").join(tops),
+        totals=sql.SQL(", ").join(totals),
+        table=sampled_table(ident, sample_percent),
+        cond=condition,
+        pcts=sql.SQL(", ").join(percentiles),
+        detail=detail_table,
+    )
+    # Every FROM carries the same filter, so its parameters repeat.
+    filters = 2 + 2 * len(categorical_columns)
+    _, rows = query_cache.fetch(conn, cache_scope, query, list(params or []) * filters)
+
+    values = iter(rows[0])
+    seen = next(values)
+    numeric: list[NumericStats] = []
+    for name in numeric_columns:
+        count, low, high, mean, stddev = [next(values) for _ in range(5)]
+        stats = _numeric(name, _fraction(seen - count, seen))
+        stats.update(
+            min=_float(low), max=_float(high), mean=_float(mean), stddev=_float(stddev)
+        )
+        numeric.append(stats)
+    non_null = [next(values) for _ in categorical_columns]
+    for stats in numeric:
+        p50, p95 = next(values) or [None, None]
+        stats.update(p50=_float(p50), p95=_float(p95))
+    if not numeric:
+        next(values)
+    categorical: list[CategoryStats] = []
+    for name, count in zip(categorical_columns, non_null):
+        top, sampled = next(values), next(values)
+        categorical.append(
+            {
+                "column": name,
+                "null_fraction": _fraction(seen - count, seen),
+                "top": [
+                    {"value": "NULL" if v is None else v, "fraction": n / sampled}
+                    for v, n in top or []
+                ],
+            }
+        )
+    scale = 100 / sample_percent if sample_percent else 1
+    return {
+        "row_count": round(seen * scale),
+        "numeric": numeric,
+        "categorical": categorical,
+    }
+
+
+def _histogram_stats(
+    stats: NumericStats, mcv: list[tuple[float, float]], bounds: list[float]
+):
+    """Fill extremes, percentiles, mean and stddev from pg_stats' MCVs and histogram.
+
+    The histogram holds the non-MCV values in equal-frequency buckets, so
+    each bucket's midpoint stands in for its share of the rows.
+    """
+    rest = 1 - (stats["null_fraction"] or 0) - sum(f for _, f in mcv)
+    points = list(mcv)
+    if len(bounds) > 1:
+        share = max(rest, 0) / (len(bounds) - 1)
+        points += [((a + b) / 2, share) for a, b in zip(bounds, bounds[1:])]
+    candidates = [v for v, _ in mcv] + bounds
+    if candidates:
+        stats.update(min=min(candidates), max=max(candidates))
+    weight = sum(f for _, f in points)
+    if weight > 0:
+        mean = sum(v * f for v, f in points) / weight
+        variance = sum((v - mean) ** 2 * f for v, f in points) / weight
+        stats.update(mean=mean, stddev=variance**0.5)
+    if len(bounds) > 1:
+        last = len(bounds) - 1
+        stats.update(
+            p50=bounds[round(PERCENTILES[0] * last)],
+            p95=bounds[round(PERCENTILES[1] * last)],
+        )
+
+
+def estimated_stats(
+    conn: connection,
+    table: TableInfo,
+    numeric_columns: list[str],
+    categorical_columns: list[str],
+    cache_scope: Hashable | None = None,
+) -> TableStats:
+    """The same statistics estimated from pg_stats, without reading the table.
+
+    Instant on any table, but only as fresh as the last ANALYZE and blind
+    to the time filter. Columns without statistics are left empty.
+    """
+    query = sql.SQL(
+        "SELECT attname, null_frac, most_common_vals::text::text[], "
+        "most_common_freqs, histogram_bounds::text::text[] "
+        "FROM pg_stats WHERE schemaname = %s AND tablename = %s"
+    )
+    _, rows = query_cache.fetch(
+        conn, cache_scope, query, [table["schema"], table["relname"]]
+    )
+    by_column = {row[0]: row[1:] for row in rows}
+    numeric: list[NumericStats] = []
+    for name in numeric_columns[:MAX_STATS_COLUMNS]:
+        if name not in by_column:
+            numeric.append(_numeric(name))
+            continue
+        null_frac, mcv_values, mcv_freqs, bounds = by_column[name]
+        stats = _numeric(name, float(null_frac))
+        mcv = [
+            (value, float(freq))
+            for value, freq in zip(map(_float, mcv_values or []), mcv_freqs or [])
+            if value is not None
+        ]
+        bounds = [v for v in map(_float, bounds or []) if v is not None]
+        _histogram_stats(stats, mcv, bounds)
+        numeric.append(stats)
+    categorical: list[CategoryStats] = []
+    for name in categorical_columns[:MAX_CATEGORY_COLUMNS]:
+        null_frac, mcv_values, mcv_freqs, _ = by_column.get(name, (None, [], [], []))
+        categorical.append(
+            {
+                "column": name,
+                "null_fraction": None if null_frac is None else float(null_frac),
+                "top": [
+                    {"value": value, "fraction": float(freq)}
+                    for value, freq in zip((mcv_values or [])[:TOP_N], mcv_freqs or [])
+                ],
+            }
+        )
+    return {
+        "row_count": max(table["row_estimate"], 0),
+        "numeric": numeric,
+        "categorical": categorical,
+    }
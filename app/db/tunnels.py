@@ -0,0 +1,244 @@
+import atexit
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+import paramiko
+from sshtunnel import SSHTunnelForwarder
+from ..states.credentials_state import Env
+
+
+TUNNEL_IDLE_TIMEOUT = float(os.environ.get("SSH_TUNNEL_IDLE_TIMEOUT", "600"))
+TUNNEL_KEEPALIVE = float(os.environ.get("SSH_TUNNEL_KEEPALIVE", "15"))
+TUNNEL_CHECK_INTERVAL = float(os.environ.get("SSH_TUNNEL_CHECK_INTERVAL", "10"))
+
+
+class SSHKeyError(Exception):
+    """Raised when an SSH private key cannot be parsed."""
+
+
+class TunnelError(Exception):
+    """Raised when an SSH tunnel to the jump host cannot be established."""
+
+
+def uses_ssh(env: Env) -> bool:
+    """Whether the environment is configured to connect through an SSH tunnel."""
+    return bool(env.ssh_host and env.ssh_user and env.ssh_key)
+
+
+def parse_ssh_key(key_string: str) -> tuple[paramiko.PKey | None, str | None]:
+    """Parse SSH private key from string, trying multiple key types."""
+    if not key_string or not key_string.strip():
+        return (None, "SSH private key is empty.")
+    key_types = [
+        (paramiko.RSAKey, "RSA"),
+        (paramiko.Ed25519Key, "Ed25519"),
+        (paramiko.ECDSAKey, "ECDSA"),
+        (paramiko.DSSKey, "DSS"),
+    ]
+    errors = []
+    for key_class, key_name in key_types:
+        try:
+            key_file = io.StringIO(key_string)
+            pkey = key_class.from_private_key(key_file)
+            return (pkey, None)
+        except paramiko.SSHException as e:
+            logging.exception(f"Failed to parse key as {key_name}: {e}")
+            errors.append(f"{key_name}: {e}")
+        except Exception as e:
+            logging.exception(f"Unhandled error parsing {key_name} key: {e}")
+            errors.append(f"{key_name}: Unhandled error - {e}")
+    return (None, f"Unsupported key format. Details: {'; '.join(errors)}")
+
+
+def open_tunnel(env: Env) -> SSHTunnelForwarder:
+    """Start an SSH tunnel forwarding a local port to the environment's database."""
+    pkey, err = parse_ssh_key(env.ssh_key or "")
+    if err:
+        raise SSHKeyError(err)
+    tunnel = SSHTunnelForwarder(
+        (env.ssh_host, env.ssh_port),
+        ssh_username=env.ssh_user,
+        ssh_pkey=pkey,
+        remote_bind_address=(env.host, env.port),
+        set_keepalive=TUNNEL_KEEPALIVE,
+        logger=logging.getLogger(__name__),
+    )
+    try:
+        tunnel.start()
+    except paramiko.AuthenticationException:
+        raise
+    except Exception as e:
+        if tunnel.is_active:
+            tunnel.stop()
+        raise TunnelError(str(e)) from e
+    return tunnel
+
+
+@dataclass(frozen=True)
+class TunnelKey:
+    ssh_host: str
+    ssh_port: int
+    ssh_user: str
+    remote_host: str
+    remote_port: int
+
+
+def tunnel_key(env: Env) -> TunnelKey:
+    return TunnelKey(
+        ssh_host=env.ssh_host or "",
+        ssh_port=env.ssh_port,
+        ssh_user=env.ssh_user or "",
+        remote_host=env.host,
+        remote_port=env.port,
+    )
+
+
+class _ManagedTunnel:
+    def __init__(self, env: Env):
+        self.env = env
+        self.key_digest = _key_digest(env)
+        self.forwarder: SSHTunnelForwarder | None = None
+        self.refs = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def ensure_started(self) -> tuple[str, int]:
+        """Start the tunnel, or rebuild it if the SSH transport has dropped."""
+        with self.lock:
+            if self.forwarder is not None and not self.forwarder.is_active:
+                logging.warning(
+                    f"SSH tunnel to {self.env.ssh_host} dropped, reconnecting."
+                )
+                self.stop_locked()
+            if self.forwarder is None:
+                self.forwarder = open_tunnel(self.env)
+            return (self.forwarder.local_bind_host, self.forwarder.local_bind_port)
+
+    def stop_locked(self):
+        if self.forwarder is None:
+            return
+        try:
+            self.forwarder.stop()
+        except Exception as e:
+            logging.exception(f"Error stopping SSH tunnel: {e}")
+        self.forwarder = None
+
+
+def _key_digest(env: Env) -> str:
+    return hashlib.sha256((env.ssh_key or "").encode()).hexdigest()
+
+
+class TunnelManager:
+    """Keeps one long-lived SSH tunnel per jump host and database address.
+
+    Tunnels are reference counted by the connections checked out through them,
+    kept alive with SSH keepalives, rebuilt when the transport drops, and torn
+    down once nobody has used them for ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = TUNNEL_IDLE_TIMEOUT,
+        check_interval: float = TUNNEL_CHECK_INTERVAL,
+    ):
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self._tunnels: dict[TunnelKey, _ManagedTunnel] = {}
+        self._lock = threading.Lock()
+        self._monitor: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def acquire(self, env: Env) -> tuple[str, int]:
+        """Take a reference on the environment's tunnel and return its local address."""
+        key = tunnel_key(env)
+        with self._lock:
+            entry = self._tunnels.get(key)
+            if entry is not None and entry.refs == 0:
+                if entry.key_digest != _key_digest(env):
+                    with entry.lock:
+                        entry.stop_locked()
+                    entry = None
+            if entry is None:
+                entry = _ManagedTunnel(env)
+                self._tunnels[key] = entry
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+            self._start_monitor()
+        try:
+            return entry.ensure_started()
+        except BaseException:
+            self.release(env)
+            raise
+
+    def release(self, env: Env):
+        """Drop a reference taken with acquire."""
+        with self._lock:
+            entry = self._tunnels.get(tunnel_key(env))
+            if entry is None:
+                return
+            entry.refs = max(entry.refs - 1, 0)
+            entry.last_used = time.monotonic()
+
+    def discard(self, env: Env):
+        """Stop the environment's tunnel now if no connection holds it."""
+        with self._lock:
+            entry = self._tunnels.get(tunnel_key(env))
+            if entry is None or entry.refs > 0:
+                return
+            del self._tunnels[tunnel_key(env)]
+        with entry.lock:
+            entry.stop_locked()
+
+    def close_all(self):
+        """Stop every tunnel; used at interpreter shutdown."""
+        self._stopping.set()
+        with self._lock:
+            entries = list(self._tunnels.values())
+            self._tunnels = {}
+        for entry in entries:
+            with entry.lock:
+                entry.stop_locked()
+
+    def _start_monitor(self):
+        """Start the background monitor thread once (lock held)."""
+        if self._monitor is not None:
+            return
+        self._monitor = threading.Thread(
+            target=self._run_monitor, name="ssh-tunnel-monitor", daemon=True
+        )
+        self._monitor.start()
+
+    def _run_monitor(self):
+        while not self._stopping.wait(self.check_interval):
+            try:
+                self._check_tunnels()
+            except Exception as e:
+                logging.exception(f"SSH tunnel monitor error: {e}")
+
+    def _check_tunnels(self):
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._tunnels.items())
+        for key, entry in entries:
+            with self._lock:
+                in_use = entry.refs > 0
+                idle = not in_use and now - entry.last_used > self.idle_timeout
+                if idle:
+                    self._tunnels.pop(key, None)
+            if idle:
+                logging.info(f"Closing idle SSH tunnel to {key.ssh_host}.")
+                with entry.lock:
+                    entry.stop_locked()
+            elif in_use and entry.forwarder is not None:
+                try:
+                    entry.ensure_started()
+                except Exception as e:
+                    logging.warning(f"SSH tunnel to {key.ssh_host} still down: {e}")
+
+
+tunnel_manager = TunnelManager()
+atexit.register(tunnel_manager.close_all)
@@ -5,6 +5,8 @@ import base64
 import logging
 from typing import Optional
 
+DEFAULT_STATEMENT_TIMEOUT = 60
+
 
 class Env(BaseModel):
     name: str = ""
@@ -17,6 +19,17 @@ class Env(BaseModel):
     ssh_port: int = 22
     ssh_user: Optional[str] = None
     ssh_key: Optional[str] = None
+    statement_timeout: int = DEFAULT_STATEMENT_TIMEOUT
+
+
+def _statement_timeout(value: Optional[str]) -> int:
+    """Seconds from the form; blank input keeps the default.
+
+    Raises ValueError for text that is not a whole number.
+    """
+    if value is None or not str(value).strip():
+        return DEFAULT_STATEMENT_TIMEOUT
+    return int(value)
 
 
 class CredentialsState(rx.State):
@@ -58,10 +71,16 @@ class CredentialsState(rx.State):
                 ssh_port=int(form_data.get("ssh_port", 22)),
                 ssh_user=form_data.get("ssh_user"),
                 ssh_key=form_data.get("ssh_key"),
+                statement_timeout=_statement_timeout(
+                    form_data.get("statement_timeout")
+                ),
             )
         except (ValueError, TypeError) as e:
             logging.exception(f"Error parsing form data: {e}")
-            yield rx.toast.error("Invalid port number.")
+            yield rx.toast.error("Invalid port number or statement timeout.")
+            return
+        if new_env.statement_timeout < 0:
+            yield rx.toast.error("Statement timeout cannot be negative.")
             return
         idx = next(
             (i for i, env in enumerate(self.environments) if env.name == new_env.name),
@@ -121,7 +140,7 @@ class CredentialsState(rx.State):
     def set_current_env_field(self, field: str, value: str):
         """Update a field in the current_env being edited."""
         try:
-            if field == "port":
+            if field in ("port", "statement_timeout"):
                 setattr(self.current_env, field, int(value))
             else:
                 setattr(self.current_env, field, value)
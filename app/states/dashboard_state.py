@@ -1,6 +1,18 @@
 import reflex as rx
 from .db_state import DatabaseState, TableInfo
 from .query_state import QueryState
+from ..db.filters import (
+    NO_TIME_FILTER,
+    TimeFilterPlan,
+    explore_sample_percent,
+    plan_time_filter,
+)
+from ..db.introspection import (
+    CATEGORICAL_TYPES,
+    NUMERIC_TYPES,
+    TIME_TYPES,
+    columns_of_kind,
+)
 
 
 class DashboardState(rx.State):
@@ -8,17 +20,70 @@ class DashboardState(rx.State):
 
     selected_table: str = ""
     data_source: str = "database"
+    time_range: str = "all"
+    time_column: str = ""
+    time_filter_warning: str = ""
+    sample: str = "exact"
 
     @rx.event
     def set_selected_table(self, table_name: str):
-        """Set the selected table and trigger data fetch."""
-        from .viz_state import VizState
+        """Set the selected table and trigger data fetch.
 
+        Queries still running for the previous table are cancelled first.
+        """
+        if table_name != self.selected_table:
+            yield QueryState.cancel_query
         self.selected_table = table_name
         self.data_source = "database"
+        self.time_column = ""
         yield QueryState.set_is_uploaded_data(False)
         yield QueryState.fetch_data(table_name)
-        yield VizState.update_viz_data
+
+    @rx.event
+    def set_time_range(self, time_range: str):
+        """Restrict the table view and charts to a recent time window."""
+        self.time_range = time_range
+        return QueryState.fetch_data(self.selected_table)
+
+    @rx.event
+    def set_time_column(self, column: str):
+        self.time_column = column
+        return QueryState.fetch_data(self.selected_table)
+
+    @rx.event
+    def set_sample(self, option: str):
+        """Browse a TABLESAMPLE of the table instead of the table itself, or go back to exact."""
+        self.sample = option
+        return QueryState.fetch_data(self.selected_table)
+
+    async def _sample_percent(self) -> float | None:
+        """TABLESAMPLE percentage chosen for the selected table, None when exact."""
+        table_info = await self.selected_table_info
+        if not table_info:
+            return None
+        return explore_sample_percent(self.sample, table_info["row_estimate"])
+
+    @rx.var
+    async def active_time_column(self) -> str:
+        """The timestamp column filters and charts use for the selected table."""
+        time_columns = await self.time_columns
+        if self.time_column in time_columns:
+            return self.time_column
+        return time_columns[0] if time_columns else ""
+
+    async def _time_filter_plan(self) -> TimeFilterPlan:
+        """Plan the time-range filter for the selected table and record any warning."""
+        table_info = await self.selected_table_info
+        column = await self.active_time_column
+        if not table_info or not column:
+            self.time_filter_warning = ""
+            return NO_TIME_FILTER
+        plan = plan_time_filter(table_info, column, self.time_range)
+        sample_percent = await self._sample_percent()
+        if sample_percent is not None:
+            plan = plan._replace(sample_percent=sample_percent, warning="")
+        self.time_filter_warning = plan.warning
+        return plan
 
     @rx.var
     async def selected_table_info(self) -> TableInfo | None:
@@ -29,18 +94,21 @@ class DashboardState(rx.State):
                 return table
         return None
 
+    @rx.var
+    async def table_columns(self) -> list[str]:
+        """Get all column names for the selected table."""
+        table_info = await self.selected_table_info
+        if not table_info:
+            return []
+        return [col["name"] for col in table_info["columns"]]
+
     @rx.var
     async def numeric_columns(self) -> list[str]:
         """Get numeric columns for the selected table."""
         table_info = await self.selected_table_info
         if not table_info:
             return []
-        numeric_types = ["integer", "bigint", "numeric", "double precision", "real"]
-        return [
-            col["name"]
-            for col in table_info["columns"]
-            if any((t in col["type"] for t in numeric_types))
-        ]
+        return columns_of_kind(table_info, NUMERIC_TYPES)
 
     @rx.var
     async def time_columns(self) -> list[str]:
@@ -48,12 +116,7 @@ class DashboardState(rx.State):
         table_info = await self.selected_table_info
         if not table_info:
             return []
-        time_types = ["timestamp", "date"]
-        return [
-            col["name"]
-            for col in table_info["columns"]
-            if any((t in col["type"] for t in time_types))
-        ]
+        return columns_of_kind(table_info, TIME_TYPES)
 
     @rx.var
     async def categorical_columns(self) -> list[str]:
@@ -61,9 +124,4 @@ class DashboardState(rx.State):
         table_info = await self.selected_table_info
         if not table_info:
             return []
-        cat_types = ["character varying", "text", "char"]
-        return [
-            col["name"]
-            for col in table_info["columns"]
-            if any((t in col["type"] for t in cat_types))
-        ]
\ No newline at end of file
+        return columns_of_kind(table_info, CATEGORICAL_TYPES)
\ No newline at end of file
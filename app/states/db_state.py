@@ -1,38 +1,33 @@
 import reflex as rx
-import os
-import psycopg2
-from typing import TypedDict, Any
 import logging
-import base64
-import json
-from .credentials_state import CredentialsState
-from sshtunnel import SSHTunnelForwarder
-import io
+from typing import Any, Callable, TypeVar
+from .credentials_state import CredentialsState, Env
+from ..db.executor import db_executor
+from ..db.introspection import ColumnInfo, IndexInfo, TableInfo, load_schema
+from ..db.pool import (
+    PoolKey,
+    PoolTimeout,
+    get_connection,
+    pool_key,
+    release_connection,
+)
+from ..db.tunnels import SSHKeyError, TunnelError
 import paramiko
 
-
-class ColumnInfo(TypedDict):
-    name: str
-    type: str
-
-
-class TableInfo(TypedDict):
-    name: str
-    columns: list[ColumnInfo]
+T = TypeVar("T")
 
 
 class DatabaseState(rx.State):
     tables: list[TableInfo] = []
     is_connected: bool = False
     connection_error: str = ""
-    _tunnel: SSHTunnelForwarder | None = None
 
     @rx.var
     def table_names(self) -> list[str]:
         """Return a list of table names."""
         return [table["name"] for table in self.tables]
 
-    async def _get_db_conn(self):
+    async def _get_active_env(self) -> Env | None:
         creds_state = await self.get_state(CredentialsState)
         if not creds_state or not creds_state.active_environment:
             self.connection_error = "No active database environment selected."
@@ -43,120 +38,72 @@ class DatabaseState(rx.State):
             self.connection_error = "Active environment not found."
             self.is_connected = False
             return None
-        if env.ssh_host and env.ssh_user and env.ssh_key:
-            try:
-                pkey, err = self._parse_ssh_key(env.ssh_key)
-                if err:
-                    self.connection_error = f"SSH Key Error: {err}"
-                    self.is_connected = False
-                    return None
-                tunnel = SSHTunnelForwarder(
-                    (env.ssh_host, env.ssh_port),
-                    ssh_username=env.ssh_user,
-                    ssh_pkey=pkey,
-                    remote_bind_address=(env.host, env.port),
-                    logger=logging.getLogger(__name__),
-                )
-                tunnel.start()
-                self._tunnel = tunnel
-                db_host = tunnel.local_bind_host
-                db_port = tunnel.local_bind_port
-            except paramiko.AuthenticationException as e:
-                logging.exception("SSH Auth Error")
-                self.connection_error = f"SSH Authentication Failed: {e}. Please check your SSH user and private key."
-                self.is_connected = False
-                if self._tunnel and self._tunnel.is_active:
-                    self._tunnel.stop()
-                self._tunnel = None
-                return None
-            except Exception as e:
-                logging.exception(f"SSH tunnel failed: {e}")
-                self.connection_error = f"SSH Tunnel Failed: {e}. Check your SSH host, port, and VPN connection."
-                self.is_connected = False
-                if self._tunnel and self._tunnel.is_active:
-                    self._tunnel.stop()
-                self._tunnel = None
-                return None
-        else:
-            db_host = env.host
-            db_port = env.port
-        db_url = f"postgresql://{env.username}:{env.password}@{db_host}:{db_port}/{env.database}"
+        return env
+
+    async def _run_blocking(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run blocking work (queries, tunnels, parsing) off the event loop.
+
+        Work goes to the shared database thread pool, limited per browser
+        session so one user's slow query cannot starve everyone else.
+        """
+        user = self.router.session.client_token
+        return await db_executor.run(user, func, *args, **kwargs)
+
+    async def _get_db_conn(self):
+        """Check out a pooled connection for the active environment."""
+        env = await self._get_active_env()
+        if not env:
+            return None
         try:
-            conn = psycopg2.connect(dsn=db_url, connect_timeout=3)
-            return conn
+            return await self._run_blocking(get_connection, env)
+        except SSHKeyError as e:
+            self.connection_error = f"SSH Key Error: {e}"
+        except paramiko.AuthenticationException as e:
+            logging.exception("SSH Auth Error")
+            self.connection_error = f"SSH Authentication Failed: {e}. Please check your SSH user and private key."
+        except TunnelError as e:
+            logging.exception(f"SSH tunnel failed: {e}")
+            self.connection_error = f"SSH Tunnel Failed: {e}. Check your SSH host, port, and VPN connection."
+        except PoolTimeout as e:
+            logging.warning(f"Connection pool exhausted: {e}")
+            self.connection_error = f"Database busy: {e}"
         except Exception as e:
             logging.exception(f"Error connecting to database: {e}")
             error_message = str(e).split("""
 """)[0]
             self.connection_error = f"Failed to connect: {error_message}"
-            self.is_connected = False
-            return None
+        self.is_connected = False
+        return None
+
+    async def _cache_scope(self) -> PoolKey | None:
+        """Query cache scope, shared by every session on the active environment."""
+        env = await self._get_active_env()
+        return pool_key(env) if env else None
+
+    async def _release_db_conn(self, conn):
+        """Return a connection from _get_db_conn to the pool."""
+        await self._run_blocking(release_connection, conn)
 
     @rx.event
     async def fetch_schema(self):
-        """Connect to the database and fetch the schema."""
+        """Connect to the database and fetch the schema.
+
+        The catalog is cached per environment and only re-read when a cheap
+        fingerprint query reports DDL changes.
+        """
+        env = await self._get_active_env()
+        if not env:
+            return
         conn = await self._get_db_conn()
         if not conn:
             return
         self.is_connected = True
         self.connection_error = ""
-        self.tables = []
         try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_schema = 'public' AND table_type = 'BASE TABLE';
-                """)
-                tables = [row[0] for row in cur.fetchall()]
-                table_info_list = []
-                for table_name in tables:
-                    cur.execute(
-                        """
-                        SELECT column_name, data_type 
-                        FROM information_schema.columns 
-                        WHERE table_name = %s;
-                    """,
-                        (table_name,),
-                    )
-                    columns = cur.fetchall()
-                    column_info: list[ColumnInfo] = [
-                        {"name": col[0], "type": col[1]} for col in columns
-                    ]
-                    table_info_list.append({"name": table_name, "columns": column_info})
-                self.tables = table_info_list
+            self.tables = await self._run_blocking(load_schema, conn, pool_key(env))
         except Exception as e:
             logging.exception(f"Error fetching schema: {e}")
+            self.tables = []
             self.connection_error = f"An error occurred while fetching the schema: {e}"
         finally:
-            if conn:
-                conn.close()
-            if self._tunnel:
-                self._tunnel.stop()
-                self._tunnel = None
-
-    def _parse_ssh_key(
-        self, key_string: str
-    ) -> tuple[paramiko.PKey | None, str | None]:
-        """Parse SSH private key from string, trying multiple key types."""
-        if not key_string or not key_string.strip():
-            return (None, "SSH private key is empty.")
-        key_types = [
-            (paramiko.RSAKey, "RSA"),
-            (paramiko.Ed25519Key, "Ed25519"),
-            (paramiko.ECDSAKey, "ECDSA"),
-            (paramiko.DSSKey, "DSS"),
-        ]
-        errors = []
-        for key_class, key_name in key_types:
-            try:
-                key_file = io.StringIO(key_string)
-                pkey = key_class.from_private_key(key_file)
-                return (pkey, None)
-            except paramiko.SSHException as e:
-                logging.exception(f"Failed to parse key as {key_name}: {e}")
-                errors.append(f"{key_name}: {e}")
-            except Exception as e:
-                logging.exception(f"Unhandled error parsing {key_name} key: {e}")
-                errors.append(f"{key_name}: Unhandled error - {e}")
-        return (None, f"Unsupported key format. Details: {'; '.join(errors)}")
\ No newline at end of file
+            await self._release_db_conn(conn)
@@ -1,182 +1,695 @@
 import reflex as rx
 from .db_state import DatabaseState
+import asyncio
 import logging
-import pandas as pd
 from typing import Any
 import json
+import time
+from pathlib import Path
+from psycopg2.errors import QueryCanceled
 from .credentials_state import CredentialsState
+from ..data.charts import resolve_spec, spec_columns
+from ..data.coerce import coerce_result
+from ..data.results import JsonValue, ResultBuilder, ResultSet, result_store
+from ..data.upload import UploadReader, save_upload
+from ..db.introspection import TableInfo, find_table, table_identifier
+from ..db.export import (
+    export_suffix,
+    export_url,
+    new_export_path,
+    write_file_export,
+    write_json_export,
+)
+from ..db.cache import FIRST_BATCH_ROWS, query_cache
+from ..db.cancel import inflight_queries, is_timeout
+from ..db.export import size_label
+from ..db.filters import sample_label
+from ..db.introspection import NUMERIC_TYPES, TIME_TYPES, ColumnInfo, columns_of_kind
+from ..db.paging import (
+    DEFAULT_PAGE_SIZE,
+    TRUNCATION_MARK,
+    estimate_row_count,
+    fetch_cell,
+    iter_page,
+    order_columns,
+    row_key,
+)
+
+SCROLL_CONTAINER_ID = "data-table-scroll"
+EXPORT_PROGRESS_INTERVAL = 0.5
+UPLOAD_PROGRESS_ROWS = 10_000
+ROW_HEIGHT_PX = 36
+VIEWPORT_ROWS = 17
+OVERSCAN_ROWS = 10
+
+
+def _cell_text(value: Any) -> str:
+    """Display text of a cell value; JSON is pretty-printed."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, indent=2, default=str)
+    if isinstance(value, (bytes, memoryview)):
+        return "\\x" + bytes(value).hex()
+    return str(value)
 
 
 class QueryState(rx.State):
     """Handles querying the database and storing results."""
 
     is_loading: bool = False
+    is_streaming: bool = False
     is_downloading_all: bool = False
-    query_results: list[dict] = []
+    export_gzip: bool = True
+    export_format: str = "json"
+    export_status: str = ""
+    export_done: int = 0
+    export_total: int = 0
+    columns: list[str] = []
+    row_count: int = 0
+    window_start: int = 0
+    visible_rows: list[list[JsonValue]] = []
     query_error: str = ""
     is_uploaded_data: bool = False
+    page: int = 0
+    page_size: int = DEFAULT_PAGE_SIZE
+    order_column: str = ""
+    row_estimate: int = -1
+    sample_note: str = ""
+    has_next_page: bool = False
+    upload_tables: list[str] = []
+    upload_table: str = ""
+    upload_progress: int = 0
+    upload_status: str = ""
+    upload_dedup_column: str = ""
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_size: str = ""
+    hidden_columns: list[str] = []
+    expanded_label: str = ""
+    expanded_cell: str = ""
+    _upload_path: str = ""
+    _upload_name: str = ""
+    _table: TableInfo | None = None
+    _key_columns: list[str] = []
+    _keyset: bool = False
+    _page_keys: list[list[Any]] = []
+    _load_id: int = 0
+
+    @rx.var
+    def top_spacer_height(self) -> str:
+        """Height standing in for the rows scrolled past above the window."""
+        return f"{self.window_start * ROW_HEIGHT_PX}px"
+
+    @rx.var
+    def bottom_spacer_height(self) -> str:
+        """Height standing in for the rows below the window."""
+        below = self.row_count - self.window_start - len(self.visible_rows)
+        return f"{max(below, 0) * ROW_HEIGHT_PX}px"
+
+    @rx.var
+    def window_label(self) -> str:
+        if not self.row_count:
+            return ""
+        first = self.window_start + 1
+        last = self.window_start + len(self.visible_rows)
+        return f"Rows {first:,}-{last:,} of {self.row_count:,}"
+
+    def _result(self) -> ResultSet | None:
+        """The full current result, kept server-side in the result store."""
+        return result_store.get(self.router.session.client_token)
+
+    def _set_result(self, result: ResultSet | None, keep_window: bool = False):
+        """Store a new result and show its first window.
+
+        With ``keep_window`` the current scroll window is kept, for results
+        that grow while the user is already looking at them.
+        """
+        token = self.router.session.client_token
+        if result is None:
+            result_store.drop(token)
+            self.columns = []
+            self.row_count = 0
+        else:
+            result_store.put(token, result)
+            self.columns = result.columns
+            self.row_count = len(result)
+        if not keep_window:
+            self.window_start = 0
+        stop = self.window_start + VIEWPORT_ROWS + OVERSCAN_ROWS
+        self.visible_rows = result.window(self.window_start, stop) if result else []
+
+    @rx.event
+    def scroll_table(self, scroll_top: int):
+        """Send the rows around the table's scroll position to the browser."""
+        result = self._result()
+        if result is None:
+            return
+        first_visible = int(scroll_top or 0) // ROW_HEIGHT_PX
+        start = max(first_visible - OVERSCAN_ROWS, 0)
+        if start == self.window_start and self.visible_rows:
+            return
+        self.window_start = start
+        self.visible_rows = result.window(
+            start, first_visible + VIEWPORT_ROWS + OVERSCAN_ROWS
+        )
+
+    def _sync_cache_stats(self):
+        """Copy the shared query cache counters into the UI."""
+        stats = query_cache.stats()
+        self.cache_hits = stats["hits"]
+        self.cache_misses = stats["misses"]
+        self.cache_size = f"{stats['entries']} results, {size_label(stats['bytes'])}"
+
+    @rx.event
+    async def clear_query_cache(self):
+        """Forget cached results for the active environment and reload."""
+        db_state = await self.get_state(DatabaseState)
+        scope = await db_state._cache_scope()
+        if scope is not None:
+            query_cache.clear(scope)
+        self._sync_cache_stats()
+        return QueryState.load_page(self.page)
 
     @rx.var
-    def columns(self) -> list[str]:
-        """Get column names from query results."""
-        if not self.query_results:
-            return []
-        return list(self.query_results[0].keys())
+    def page_count(self) -> int:
+        """Estimated number of pages, at least the pages seen so far."""
+        seen = self.page + (2 if self.has_next_page else 1)
+        if self.row_estimate < 0:
+            return seen
+        return max(-(-self.row_estimate // self.page_size), seen)
+
+    @rx.var
+    def page_label(self) -> str:
+        if self.row_estimate < 0:
+            return f"Page {self.page + 1}"
+        rows = "sampled rows" if self.sample_note else "rows"
+        return (
+            f"Page {self.page + 1} of ~{self.page_count:,} "
+            f"(~{self.row_estimate:,} {rows})"
+        )
 
     @rx.event
     async def download_data(self):
-        """Download the current query results as a JSON file."""
+        """Download the selected table (or the uploaded data) in the chosen format."""
         from .dashboard_state import DashboardState
 
-        if not self.query_results:
+        dashboard_state = await self.get_state(DashboardState)
+        if self._table and not self.is_uploaded_data:
+            async for event in self._export_tables(
+                [self._table], self._table["name"], single_table=True
+            ):
+                yield event
+            return
+        result = self._result()
+        if not result:
             yield rx.toast.error("No data to download.")
             return
-        dashboard_state = await self.get_state(DashboardState)
         filename = f"{dashboard_state.selected_table}.json"
-        data_to_download = json.dumps(self.query_results, indent=2)
+        data_to_download = json.dumps(result.records(), indent=2)
         yield rx.download(data=data_to_download, filename=filename)
 
     @rx.event
     async def download_all_data(self):
-        """Download all tables and their schemas from the database as a single JSON file."""
-        self.is_downloading_all = True
-        yield
+        """Download every table: one JSON document, or a zip of CSV/Parquet files."""
         db_state = await self.get_state(DatabaseState)
         if not db_state.is_connected:
-            self.is_downloading_all = False
             yield rx.toast.error("Not connected to any database.")
             return
-        all_data = {}
+        creds_state = await self.get_state(CredentialsState)
+        async for event in self._export_tables(
+            db_state.tables, f"{creds_state.active_environment}_export"
+        ):
+            yield event
+
+    @rx.event
+    def set_export_gzip(self, value: bool):
+        self.export_gzip = value
+
+    @rx.event
+    def set_export_format(self, fmt: str):
+        self.export_format = fmt
+
+    async def _export_tables(
+        self, tables: list[TableInfo], stem: str, single_table: bool = False
+    ):
+        """Stream tables to a temporary file and hand the browser a download link."""
+        self.is_downloading_all = True
+        self.export_status = "Starting export..."
+        self.export_done = 0
+        self.export_total = len(tables)
+        yield
+        db_state = await self.get_state(DatabaseState)
         conn = await db_state._get_db_conn()
         if not conn:
             self.is_downloading_all = False
+            self.export_status = ""
             yield rx.toast.error(f"Connection failed: {db_state.connection_error}")
             return
+        fmt = self.export_format
+        suffix = export_suffix(fmt, self.export_gzip, as_archive=not single_table)
+        path = new_export_path(suffix)
+        progress = None
         try:
-            for table_info in db_state.tables:
-                table_name = table_info["name"]
-                try:
-                    query = f'SELECT * FROM "{table_name}";'
-                    df = pd.read_sql_query(query, conn)
-                    df = df.astype(str)
-                    all_data[table_name] = {
-                        "schema": table_info["columns"],
-                        "data": df.to_dict("records"),
-                    }
-                except Exception as e:
-                    logging.exception(
-                        f"Error fetching data for table {table_name} during all-data download: {e}"
-                    )
-                    yield rx.toast.error(
-                        f"Skipping table {table_name} due to an error."
-                    )
-            if not all_data:
-                yield rx.toast.warning("No data could be fetched from any table.")
-                self.is_downloading_all = False
-                return
-            creds_state = await self.get_state(CredentialsState)
-            env_name = creds_state.active_environment
-            filename = f"{env_name}_export.json"
-            yield rx.download(data=json.dumps(all_data, indent=2), filename=filename)
+            if fmt == "json":
+                progress = write_json_export(
+                    conn, tables, path, compress=self.export_gzip, as_array=single_table
+                )
+            else:
+                progress = write_file_export(
+                    conn,
+                    tables,
+                    path,
+                    fmt,
+                    compress=self.export_gzip,
+                    as_archive=not single_table,
+                )
+            last_update = 0.0
+            while True:
+                step = await db_state._run_blocking(next, progress, None)
+                if step is None:
+                    break
+                table_name, detail, finished = step
+                if finished:
+                    self.export_done += 1
+                if finished or time.monotonic() - last_update > EXPORT_PROGRESS_INTERVAL:
+                    last_update = time.monotonic()
+                    self.export_status = f"{table_name}: {detail}"
+                    yield
+            yield rx.download(url=export_url(path), filename=f"{stem}{suffix}")
         except Exception as e:
-            logging.exception(f"Error during all-data download: {e}")
-            yield rx.toast.error("An unexpected error occurred.")
+            logging.exception(f"Error during export: {e}")
+            yield rx.toast.error(f"Export failed: {e}")
         finally:
-            if conn:
-                conn.close()
-            if db_state._tunnel:
-                db_state._tunnel.stop()
-                db_state._tunnel = None
+            if progress is not None:
+                await db_state._run_blocking(progress.close)
+            await db_state._release_db_conn(conn)
             self.is_downloading_all = False
+            self.export_status = ""
 
     @rx.event
     async def handle_data_upload(self, files: list[rx.UploadFile]):
-        """Handle upload of a JSON data file."""
-        from .dashboard_state import DashboardState
-
+        """Save an uploaded JSON file to disk and load its first table."""
         if not files:
             yield rx.toast.error("No file selected for upload.")
             return
         file = files[0]
+        db_state = await self.get_state(DatabaseState)
         try:
-            data = await file.read()
-            json_data = json.loads(data)
-            if not isinstance(json_data, list) or not all(
-                (isinstance(item, dict) for item in json_data)
+            path = await db_state._run_blocking(save_upload, file.file)
+        except Exception as e:
+            logging.exception(f"Failed to save uploaded file: {e}")
+            yield rx.toast.error(f"Could not save upload: {e}")
+            return
+        self._upload_path = str(path)
+        self._upload_name = file.name or path.name
+        self.upload_tables = []
+        self.upload_table = ""
+        self.upload_dedup_column = ""
+        yield rx.clear_selected_files("upload_data")
+        async for event in self._load_upload(None):
+            yield event
+
+    @rx.event
+    async def select_upload_table(self, table: str):
+        """Load another table from the last uploaded multi-table export."""
+        if not self._upload_path or table == self.upload_table:
+            return
+        self.upload_dedup_column = ""
+        async for event in self._load_upload(table):
+            yield event
+
+    @rx.event
+    async def set_upload_dedup_column(self, column: str):
+        """Reload the upload, treating rows with equal ``column`` values as duplicates."""
+        if not self._upload_path or column == self.upload_dedup_column:
+            return
+        self.upload_dedup_column = column
+        async for event in self._load_upload(self.upload_table or None):
+            yield event
+
+    async def _load_upload(self, table: str | None):
+        """Stream records from the saved upload into a new result, reporting progress."""
+        from .dashboard_state import DashboardState
+        from .viz_state import VizState
+
+        path = Path(self._upload_path)
+        if not path.exists():
+            yield rx.toast.error("The uploaded file has expired; upload it again.")
+            return
+        self._set_result(None)
+        self.is_loading = True
+        self.query_error = ""
+        self.upload_progress = 0
+        self.upload_status = "Reading upload..."
+        yield
+        key_columns = [self.upload_dedup_column] if self.upload_dedup_column else None
+        reader = UploadReader(path, table, key_columns)
+        records = iter(reader)
+        builder = ResultBuilder()
+        db_state = await self.get_state(DatabaseState)
+        try:
+            last_update = time.monotonic()
+            while await db_state._run_blocking(
+                builder.extend, records, UPLOAD_PROGRESS_ROWS
             ):
-                if isinstance(json_data, dict) and all(
-                    (
-                        isinstance(v, dict)
-                        and "schema" in v
-                        and ("data" in v)
-                        and isinstance(v["data"], list)
-                        for v in json_data.values()
-                    )
-                ):
-                    first_table = next(iter(json_data.values()), None)
-                    if first_table:
-                        json_data = first_table["data"]
-                    else:
-                        raise ValueError(
-                            "Uploaded JSON format is not a simple array of objects."
-                        )
-                else:
-                    raise ValueError("JSON must be an array of objects.")
-            unique_records = list({tuple(sorted(d.items())) for d in json_data})
-            self.query_results = [dict(t) for t in unique_records]
-            self.is_loading = False
-            self.query_error = ""
-            self.is_uploaded_data = True
-            dashboard_state = await self.get_state(DashboardState)
-            dashboard_state.data_source = "upload"
-            dashboard_state.selected_table = f"Uploaded: {file.name}"
-            yield rx.toast.success(f"Successfully loaded {file.name}")
-            yield rx.clear_selected_files("upload_data")
+                if time.monotonic() - last_update > EXPORT_PROGRESS_INTERVAL:
+                    last_update = time.monotonic()
+                    self.upload_progress = int(reader.fraction_read * 100)
+                    self.upload_status = f"{reader.records:,} rows read"
+                    yield
+            result = await db_state._run_blocking(builder.build)
+            self.upload_status = "Detecting column types..."
+            yield
+            self._set_result(await db_state._run_blocking(coerce_result, result))
         except Exception as e:
             logging.exception(f"Failed to process uploaded file: {e}")
             yield rx.toast.error(f"Invalid JSON file: {e}")
+            return
+        finally:
+            self.is_loading = False
+            self.upload_status = ""
+        self.is_uploaded_data = True
+        self.sample_note = ""
+        self.upload_tables = reader.tables
+        self.upload_table = reader.table or ""
+        dashboard_state = await self.get_state(DashboardState)
+        dashboard_state.data_source = "upload"
+        label = f"Uploaded: {self._upload_name}"
+        dashboard_state.selected_table = (
+            f"{label} / {self.upload_table}" if self.upload_table else label
+        )
+        message = f"Loaded {reader.records:,} rows from {self._upload_name}"
+        if reader.duplicates:
+            message += f" ({reader.duplicates:,} duplicates removed)"
+        yield rx.toast.success(message)
+        yield VizState.update_viz_data
 
     @rx.event
     async def fetch_data(self, table_name: str):
-        """Fetch all data from the specified table."""
+        """Fetch the first page of the specified table, then refresh the charts."""
         from .dashboard_state import DashboardState
+        from .viz_state import VizState
 
         if not table_name:
+            yield VizState.update_viz_data
             return
         dashboard_state = await self.get_state(DashboardState)
         if dashboard_state.data_source == "upload":
             return
-        self.is_loading = True
-        self.query_error = ""
-        self.query_results = []
-        yield
         db_state = await self.get_state(DatabaseState)
-        conn = await db_state._get_db_conn()
-        if not conn:
+        self._table = find_table(db_state.tables, table_name)
+        names = [c["name"] for c in self._table["columns"]] if self._table else []
+        self.hidden_columns = [c for c in self.hidden_columns if c in names]
+        self.expanded_cell = ""
+        self._key_columns = []
+        self._keyset = False
+        self._page_keys = []
+        self.page = 0
+        self.row_estimate = -1
+        if not self._table:
+            self.query_error = f"Table {table_name} not found in the schema."
+            yield VizState.update_viz_data
+            return
+        if self.order_column not in [c["name"] for c in self._table["columns"]]:
+            self.order_column = ""
+        yield QueryState.load_page(0, True, True)
+
+    @rx.event
+    def next_page(self):
+        if not self.has_next_page:
+            return
+        return QueryState.load_page(self.page + 1)
+
+    @rx.event
+    def prev_page(self):
+        if self.page == 0:
+            return
+        return QueryState.load_page(self.page - 1)
+
+    @rx.event
+    def jump_to_page(self, form_data: dict):
+        """Jump to a 1-based page number entered by the user."""
+        try:
+            page = int(form_data.get("page", "")) - 1
+        except (TypeError, ValueError):
+            yield rx.toast.error("Enter a page number.")
+            return
+        if page < 0:
+            yield rx.toast.error("Page numbers start at 1.")
+            return
+        yield QueryState.load_page(page)
+
+    @rx.event
+    def set_page_size(self, size: str):
+        self.page_size = int(size)
+        self._page_keys = []
+        return QueryState.load_page(0)
+
+    @rx.event
+    def set_order_column(self, column: str):
+        """Order pages by a column (plus the primary key to keep keys unique)."""
+        self.order_column = column
+        self._page_keys = []
+        return QueryState.load_page(0, True)
+
+    @rx.event(background=True)
+    async def load_page(
+        self, page: int, refresh_metadata: bool = False, refresh_viz: bool = False
+    ):
+        """Load one page of the current table, using keyset pagination when possible.
+
+        Runs as a background task so the session stays responsive while the
+        query runs: it can be cancelled, and a newer load supersedes it.
+        """
+        from .dashboard_state import DashboardState
+        from .stats_state import StatsState
+        from .viz_state import VizState
+
+        async with self:
+            table = self._table
+            if not table or self.is_uploaded_data:
+                return
+            self._load_id += 1
+            load_id = self._load_id
+            dashboard_state = await self.get_state(DashboardState)
+            time_filter = await dashboard_state._time_filter_plan()
+            sample_percent = await dashboard_state._sample_percent()
+            self.sample_note = sample_label(sample_percent)
+            self.is_loading = True
+            self.query_error = ""
+            self._set_result(None)
+            if refresh_metadata:
+                self._key_columns, self._keyset = order_columns(
+                    table, self.order_column
+                )
+            key_columns = list(self._key_columns)
+            keyset = self._keyset
+            select_columns = self._projection(table, key_columns)
+            page_size = self.page_size
+            after = None
+            if keyset and page > 0 and page - 1 < len(self._page_keys):
+                after = self._page_keys[page - 1]
             db_state = await self.get_state(DatabaseState)
-            self.query_error = db_state.connection_error
+            conn = await db_state._get_db_conn()
+            if not conn:
+                self.query_error = db_state.connection_error
+                self.is_loading = False
+                return
+            cache_scope = await db_state._cache_scope()
+            token = self.router.session.client_token
+        table_name = table["name"]
+        columns: list[str] = []
+        rows: list[tuple] = []
+        batches = None
+        finished = False
+        error = ""
+        try:
+            with inflight_queries.track(token, conn):
+                if refresh_metadata:
+                    estimate = await db_state._run_blocking(
+                        estimate_row_count, conn, table_identifier(table)
+                    )
+                    if estimate is not None and sample_percent is not None:
+                        estimate = int(estimate * sample_percent / 100)
+                    async with self:
+                        if load_id == self._load_id:
+                            self.row_estimate = -1 if estimate is None else estimate
+                batches = await db_state._run_blocking(
+                    iter_page,
+                    conn,
+                    table_identifier(table),
+                    key_columns,
+                    page_size + 1,
+                    after=after,
+                    offset=page * page_size,
+                    where=time_filter.where,
+                    where_params=time_filter.params,
+                    sample_percent=sample_percent,
+                    select_columns=select_columns,
+                    cache_scope=cache_scope,
+                )
+                while (batch := await db_state._run_blocking(next, batches, None)):
+                    first_batch = not rows and not columns
+                    columns = batch[0]
+                    rows.extend(batch[1])
+                    result = await db_state._run_blocking(
+                        ResultSet.from_rows, columns, rows[:page_size]
+                    )
+                    async with self:
+                        if load_id != self._load_id:
+                            break
+                        self.is_loading = False
+                        self.is_streaming = True
+                        self.page = page
+                        self._set_result(result, keep_window=not first_batch)
+                    if first_batch:
+                        yield rx.call_script(
+                            f"document.getElementById('{SCROLL_CONTAINER_ID}')?.scrollTo(0, 0)"
+                        )
+                        if refresh_viz:
+                            yield VizState.update_viz_data
+                            yield StatsState.refresh_stats
+                else:
+                    finished = True
+        except QueryCanceled as e:
+            error = (
+                f"Query timed out: {str(e).splitlines()[0]}"
+                if is_timeout(e)
+                else "Query cancelled."
+            )
+        except Exception as e:
+            logging.exception(f"Error fetching data for table {table_name}: {e}")
+            error = f"Failed to fetch data: {e}"
+        finally:
+            if batches is not None:
+                await db_state._run_blocking(batches.close)
+            await db_state._release_db_conn(conn)
+        async with self:
+            if load_id != self._load_id:
+                return
             self.is_loading = False
+            self.is_streaming = False
+            self.query_error = error
+            self._sync_cache_stats()
+            if finished:
+                self.has_next_page = len(rows) > page_size
+                rows = rows[:page_size]
+                if not rows and page > 0:
+                    self.query_error = f"Page {page + 1} is past the end of the table."
+                if rows and keyset:
+                    del self._page_keys[page:]
+                    if len(self._page_keys) == page:
+                        self._page_keys.append(row_key(columns, rows[-1], key_columns))
+        if finished and refresh_viz and len(rows) > FIRST_BATCH_ROWS:
+            # The first chart was drawn from the first batch; redraw it from
+            # the full page (the aggregate itself comes from the query cache).
+            yield VizState.update_viz_data
+
+    def _projection(
+        self, table: TableInfo, key_columns: list[str]
+    ) -> list[ColumnInfo]:
+        """Columns the table view and chart need; hidden ones are skipped."""
+        spec = resolve_spec(
+            table["name"],
+            [c["name"] for c in table["columns"]],
+            columns_of_kind(table, TIME_TYPES),
+            columns_of_kind(table, NUMERIC_TYPES),
+        )
+        needed = set(key_columns) | set(spec_columns(spec))
+        return [
+            c
+            for c in table["columns"]
+            if c["name"] in needed or c["name"] not in self.hidden_columns
+        ]
+
+    @rx.event
+    def toggle_column(self, column: str):
+        """Show or hide a column in the table view; hidden columns are not fetched."""
+        total = len(self._table["columns"]) if self._table else 0
+        if column in self.hidden_columns:
+            self.hidden_columns = [c for c in self.hidden_columns if c != column]
+        elif len(self.hidden_columns) + 1 >= total:
+            return rx.toast.error("At least one column must stay visible.")
+        else:
+            self.hidden_columns = self.hidden_columns + [column]
+        return QueryState.load_page(self.page)
+
+    @rx.event
+    def show_all_columns(self):
+        self.hidden_columns = []
+        return QueryState.load_page(self.page)
+
+    @rx.event
+    async def expand_cell(self, row: int, column: int):
+        """Show one cell in full, fetching values cut to a preview by primary key."""
+        result = self._result()
+        if result is None or column >= len(result.columns):
+            return
+        index = self.window_start + row
+        name = result.columns[column]
+        value = result.column(name).to_json(index, index + 1)[0]
+        self.expanded_label = f"{name} (row {index + 1:,})"
+        self.expanded_cell = _cell_text(value)
+        table = self._table
+        if (
+            self.is_uploaded_data
+            or not table
+            or not isinstance(value, str)
+            or not value.endswith(TRUNCATION_MARK)
+        ):
+            return
+        key_columns = table["primary_key"]
+        if not key_columns or any(c not in result.columns for c in key_columns):
+            yield rx.toast.info(
+                "Only a preview is available: the table has no primary key."
+            )
+            return
+        key = [result.column(c).value(index) for c in key_columns]
+        db_state = await self.get_state(DatabaseState)
+        conn = await db_state._get_db_conn()
+        if not conn:
             return
         try:
-            query = f'SELECT * FROM "{table_name}";'
-            df = pd.read_sql_query(query, conn)
-            df = df.astype(str)
-            self.query_results = df.to_dict("records")
+            full = await db_state._run_blocking(
+                fetch_cell, conn, table_identifier(table), name, key_columns, key
+            )
+            self.expanded_cell = _cell_text(full)
         except Exception as e:
-            logging.exception(f"Error fetching data for table {table_name}: {e}")
-            self.query_error = f"Failed to fetch data: {e}"
+            logging.exception(f"Error fetching {name} from {table['name']}: {e}")
+            yield rx.toast.error(f"Failed to load the full value: {e}")
         finally:
-            if conn:
-                conn.close()
+            await db_state._release_db_conn(conn)
+
+    @rx.event
+    def close_expanded_cell(self):
+        self.expanded_cell = ""
+        self.expanded_label = ""
+
+    @rx.event
+    async def cancel_query(self):
+        """Cancel this session's running queries and drop their pending results."""
+        self._load_id += 1
+        cancelled = await asyncio.to_thread(
+            inflight_queries.cancel, self.router.session.client_token
+        )
+        if self.is_loading or self.is_streaming:
             self.is_loading = False
+            self.is_streaming = False
+            self.query_error = "Query cancelled."
+        if cancelled:
+            yield rx.toast.info("Query cancelled.")
 
     @rx.event
     def clear_uploaded_data(self):
         """Clear uploaded data and reset the view."""
         from .dashboard_state import DashboardState
 
-        self.query_results = []
+        self._set_result(None)
         self.is_uploaded_data = False
+        self.upload_tables = []
+        self.upload_table = ""
+        self.upload_dedup_column = ""
         return DashboardState.set_selected_table("")
 
     @rx.event
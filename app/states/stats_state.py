@@ -0,0 +1,146 @@
+import reflex as rx
+import logging
+from psycopg2.errors import QueryCanceled
+from .db_state import DatabaseState
+from .query_state import QueryState
+from ..db.cancel import inflight_queries, is_timeout
+from ..db.filters import LARGE_TABLE_ROWS, sample_label
+from ..db.stats import CategoryStats, NumericStats, estimated_stats, table_stats
+
+NUMERIC_STATS = ["min", "max", "mean", "stddev", "p50", "p95"]
+
+
+def _number(value: float | None) -> str:
+    return "" if value is None else f"{value:,.6g}"
+
+
+def _percent(value: float | None) -> str:
+    return "" if value is None else f"{value:.1%}"
+
+
+class StatsState(rx.State):
+    """KPI panel: per-column statistics computed on the database."""
+
+    numeric_stats: list[NumericStats] = []
+    category_stats: list[CategoryStats] = []
+    stats_rows: int = -1
+    stats_note: str = ""
+    stats_error: str = ""
+    is_loading_stats: bool = False
+    use_estimates: bool = False
+    _stats_id: int = 0
+
+    @rx.var
+    def stats_rows_label(self) -> str:
+        return "" if self.stats_rows < 0 else f"{self.stats_rows:,}"
+
+    @rx.var
+    def numeric_table(self) -> list[list[str]]:
+        """Numeric statistics as display rows: column, nulls, then NUMERIC_STATS."""
+        return [
+            [s["column"], _percent(s["null_fraction"])]
+            + [_number(s[key]) for key in NUMERIC_STATS]
+            for s in self.numeric_stats
+        ]
+
+    @rx.var
+    def category_table(self) -> list[list[str]]:
+        """Categorical statistics as display rows: column, nulls, top values."""
+        rows = []
+        for s in self.category_stats:
+            top = [f"{t['value']} ({_percent(t['fraction'])})" for t in s["top"]]
+            rows.append([s["column"], _percent(s["null_fraction"]), ", ".join(top)])
+        return rows
+
+    @rx.event
+    def set_use_estimates(self, value: bool):
+        """Read statistics from pg_stats instead of scanning the table."""
+        self.use_estimates = value
+        return StatsState.refresh_stats
+
+    @rx.event(background=True)
+    async def refresh_stats(self):
+        """Recompute the panel for the selected table and time filter.
+
+        Like the charts this runs in the background, can be cancelled with
+        the session's other queries, and only the newest refresh is kept.
+        Results are shared through the query cache, so revisiting a table
+        is instant.
+        """
+        from .dashboard_state import DashboardState
+
+        async with self:
+            self._stats_id += 1
+            stats_id = self._stats_id
+            self.stats_error = ""
+            ds = await self.get_state(DashboardState)
+            table = await ds.selected_table_info
+            if ds.data_source != "database" or not table:
+                self.numeric_stats = []
+                self.category_stats = []
+                self.stats_rows = -1
+                return
+            time_filter = await ds._time_filter_plan()
+            numeric_columns = await ds.numeric_columns
+            categorical_columns = await ds.categorical_columns
+            use_estimates = self.use_estimates
+            db_state = await self.get_state(DatabaseState)
+            conn = await db_state._get_db_conn()
+            if not conn:
+                return
+            cache_scope = await db_state._cache_scope()
+            token = self.router.session.client_token
+            self.is_loading_stats = True
+        stats = None
+        error = ""
+        try:
+            with inflight_queries.track(token, conn):
+                if use_estimates:
+                    stats = await db_state._run_blocking(
+                        estimated_stats,
+                        conn,
+                        table,
+                        numeric_columns,
+                        categorical_columns,
+                        cache_scope=cache_scope,
+                    )
+                else:
+                    stats = await db_state._run_blocking(
+                        table_stats,
+                        conn,
+                        table,
+                        numeric_columns,
+                        categorical_columns,
+                        where=time_filter.where,
+                        params=time_filter.params,
+                        sample_percent=time_filter.sample_percent,
+                        cache_scope=cache_scope,
+                    )
+        except QueryCanceled as e:
+            if is_timeout(e):
+                error = f"Statistics query timed out: {str(e).splitlines()[0]}"
+        except Exception as e:
+            logging.exception(f"Error computing statistics for {table['name']}: {e}")
+            error = f"Failed to compute statistics: {e}"
+        finally:
+            await db_state._release_db_conn(conn)
+        async with self:
+            if stats_id != self._stats_id:
+                return
+            self.is_loading_stats = False
+            self.stats_error = error
+            if stats is None:
+                return
+            self.numeric_stats = stats["numeric"]
+            self.category_stats = stats["categorical"]
+            self.stats_rows = stats["row_count"]
+            if use_estimates:
+                self.stats_note = "pg_stats estimates (as of the last ANALYZE)"
+            elif time_filter.sample_percent is not None:
+                self.stats_note = sample_label(time_filter.sample_percent)
+            elif table["row_estimate"] >= LARGE_TABLE_ROWS:
+                self.stats_note = "percentiles and top values from a sample"
+            else:
+                self.stats_note = ""
+            qs = await self.get_state(QueryState)
+            qs._sync_cache_stats()
@@ -1,65 +1,658 @@
 import reflex as rx
 import datetime
-import random
+import logging
+import os
+import time
 from typing import Any
+from psycopg2.errors import QueryCanceled
+from .db_state import DatabaseState
 from .query_state import QueryState
+from ..data.charts import (
+    COUNT,
+    RAW,
+    ChartSpec,
+    chart_rows,
+    column_kinds,
+    resolve_spec,
+    sample_rows,
+    series_styles,
+)
+from ..data.downsample import DEFAULT_CHART_WIDTH, DOWNSAMPLE_METHODS
+from ..data.results import ResultSet
+from ..db.aggregation import (
+    AGG_FUNCTIONS,
+    CROSSTAB_BUCKETS,
+    TARGET_POINTS,
+    BreakdownCategory,
+    bucket_label,
+    bucketed_series,
+    category_breakdown,
+    choose_bucket_seconds,
+    series_key,
+    tail_series,
+    time_bounds,
+)
+from ..db.cancel import inflight_queries, is_timeout
+from ..db.filters import (
+    LARGE_TABLE_ROWS,
+    range_index,
+    sample_label,
+    sample_percent_for,
+)
+from ..db.introspection import table_identifier
+from ..db.rollups import ROLLUPS_ENABLED, rollup_for, rollup_manager, rollup_series
+
+LIVE_INTERVAL = int(os.environ.get("LIVE_INTERVAL", "5"))
+LIVE_MAX_INTERVAL = int(os.environ.get("LIVE_MAX_INTERVAL", "120"))
+LIVE_MAX_POINTS = int(os.environ.get("LIVE_MAX_POINTS", "1000"))
+LIVE_INTERVALS = [2, 5, 10, 30, 60]
+# Cross-tab option for the breakdown chart that groups by time bucket.
+BY_TIME = "__time__"
+BREAKDOWN_COLORS = [
+    "#3b82f6",
+    "#ef4444",
+    "#22c55e",
+    "#f97316",
+    "#a855f7",
+    "#14b8a6",
+    "#eab308",
+    "#ec4899",
+    "#6366f1",
+    "#84cc16",
+    "#9ca3af",
+]
 
 
 class VizState(rx.State):
     """State for managing visualizations and chart data."""
 
-    faults_data: list[dict[str, str | int | float]] = []
-    jobs_data: list[dict[str, str | int | float]] = []
-    bots_data: list[dict[str, str | int | float]] = []
+    chart_mode: str = ""
+    chart_type: str = ""
+    chart_x: str = ""
+    chart_y: list[str] = []
+    chart_title: str = ""
+    chart_data: list[dict[str, str | int | float | None]] = []
+    series_data: list[dict[str, str | int | float | None]] = []
+    series_columns: list[str] = []
+    agg_func: str = "avg"
+    agg_column: str = ""
+    bucket: str = ""
+    viz_error: str = ""
+    series_preview: bool = False
+    series_sample: str = ""
+    series_from_rollup: bool = False
+    chart_width: int = DEFAULT_CHART_WIDTH
+    downsample_method: str = "lttb"
+    zoom_start: float = 0.0
+    zoom_end: float = 1.0
+    chart_points_label: str = ""
+    live_mode: bool = False
+    live_interval: int = LIVE_INTERVAL
+    live_delay: int = LIVE_INTERVAL
+    live_status: str = ""
+    breakdown_column: str = ""
+    breakdown_by: str = ""
+    breakdown_categories: list[BreakdownCategory] = []
+    breakdown_data: list[dict[str, str | int | float | None]] = []
+    breakdown_bucket: str = ""
+    breakdown_error: str = ""
+    _series_id: int = 0
+    _breakdown_id: int = 0
+    _bucket_seconds: int = 0
+    _live_seen: Any = None
+    _series_sample_percent: float | None = None
+    _live_polling: bool = False
+    _chart: ChartSpec | None = None
+    _chart_table: str = ""
 
-    @rx.event
-    def generate_sample_data(self):
-        """Generate sample time-series data for different tables."""
-        now = datetime.datetime.now(datetime.timezone.utc)
-        self.faults_data = [
-            {
-                "timestamp": (now - datetime.timedelta(days=i)).strftime(
-                    "%Y-%m-%dT%H:%M:%S"
-                ),
-                "count": random.randint(0, 10),
-            }
-            for i in range(30)
-        ][::-1]
-        self.jobs_data = [
-            {
-                "timestamp": (now - datetime.timedelta(days=i)).strftime(
-                    "%Y-%m-%dT%H:%M:%S"
-                ),
-                "completed": random.randint(50, 100),
-                "failed": random.randint(0, 20),
-            }
-            for i in range(30)
-        ][::-1]
-        self.bots_data = [
-            {
-                "id": f"bot-{i}",
-                "name": f"Bot {i}",
-                "position_x": round(random.uniform(-10, 10), 2),
-                "position_y": round(random.uniform(-10, 10), 2),
-                "battery_soc": random.randint(0, 100),
-                "state": random.choice(["IDLE", "MOVING", "CHARGING"]),
-            }
-            for i in range(5)
+    @rx.var
+    def series_lines(self) -> list[dict[str, str]]:
+        """Lines for the aggregated chart: bucket counts or the selected column."""
+        if self.agg_column:
+            return series_styles([series_key(self.agg_func, self.agg_column)])
+        return series_styles(["count"])
+
+    @rx.var
+    def chart_lines(self) -> list[dict[str, str]]:
+        """Lines for the chart of raw rows, one per y column of its spec."""
+        return series_styles(self.chart_y)
+
+    @rx.var
+    def series_label(self) -> str:
+        if self.agg_column:
+            label = f"{self.agg_func}({self.agg_column}) per {self.bucket}"
+        else:
+            label = f"Rows per {self.bucket}"
+        if self.series_preview:
+            return f"{label} (sampled preview)"
+        if self.series_from_rollup:
+            return f"{label} (from rollup)"
+        return f"{label} ({self.series_sample})" if self.series_sample else label
+
+    @rx.var
+    def breakdown_bars(self) -> list[dict[str, str]]:
+        """One stacked bar per category; the other bucket is always grey."""
+        bars = []
+        for i, category in enumerate(self.breakdown_categories):
+            color = BREAKDOWN_COLORS[i % (len(BREAKDOWN_COLORS) - 1)]
+            if category["other"]:
+                color = BREAKDOWN_COLORS[-1]
+            bars.append(
+                {"key": category["key"], "name": category["label"], "color": color}
+            )
+        return bars
+
+    @rx.var
+    def breakdown_totals(self) -> list[dict[str, str | int | float | None]]:
+        """Single-breakdown rows as {category, count} for a plain bar chart."""
+        if self.breakdown_by or not self.breakdown_data:
+            return []
+        row = self.breakdown_data[0]
+        return [
+            {"category": category["label"], "count": row.get(category["key"], 0)}
+            for category in self.breakdown_categories
         ]
 
+    @rx.var
+    def breakdown_label(self) -> str:
+        if not self.breakdown_column:
+            return ""
+        if self.breakdown_by == BY_TIME:
+            return f"{self.breakdown_column} per {self.breakdown_bucket}"
+        if self.breakdown_by:
+            return f"{self.breakdown_column} by {self.breakdown_by}"
+        return f"Rows by {self.breakdown_column}"
+
     @rx.event
+    def generate_sample_data(self):
+        """Fill the chart of raw rows with made-up rows until data is loaded."""
+        if self._chart is not None and self._chart["agg"] == RAW:
+            self.chart_data = sample_rows(self._chart)
+
+    async def _select_chart(self):
+        """Resolve the chart spec for the selected table or the uploaded data.
+
+        Called once per data load. When the table changes, an aggregated
+        spec also sets the aggregate function and column; after that the
+        user's choices are kept.
+        """
+        from .dashboard_state import DashboardState
+
+        ds = await self.get_state(DashboardState)
+        if ds.data_source == "database":
+            time_columns = await ds.time_columns
+            active = await ds.active_time_column
+            if active:
+                time_columns = [active, *(c for c in time_columns if c != active)]
+            spec = resolve_spec(
+                ds.selected_table,
+                await ds.table_columns,
+                time_columns,
+                await ds.numeric_columns,
+            )
+        else:
+            qs = await self.get_state(QueryState)
+            result = qs._result()
+            time_columns, numeric_columns = column_kinds(result) if result else ([], [])
+            spec = resolve_spec(
+                ds.selected_table,
+                result.columns if result else [],
+                time_columns,
+                numeric_columns,
+                can_aggregate=False,
+            )
+        if spec is not None and ds.selected_table != self._chart_table:
+            if spec["agg"] == COUNT:
+                self.agg_column = ""
+            elif spec["agg"] in AGG_FUNCTIONS and spec["y"]:
+                self.agg_func = spec["agg"]
+                self.agg_column = spec["y"][0]
+        self._chart_table = ds.selected_table
+        self._chart = spec
+        if spec is None:
+            self.chart_mode = ""
+        else:
+            self.chart_mode = "raw" if spec["agg"] == RAW else "series"
+        self.chart_type = spec["type"] if spec else ""
+        self.chart_x = spec["x"] if spec else ""
+        self.chart_y = spec["y"] if spec else []
+        self.chart_title = spec["title"] or ", ".join(spec["y"]) if spec else ""
+
+    @rx.event(background=True)
     async def update_viz_data(self):
+        """Refresh the charts for the selected table or uploaded data.
+
+        A background task, so chart queries can be cancelled like page loads.
+        """
         from .dashboard_state import DashboardState
 
-        qs = await self.get_state(QueryState)
-        if not qs.query_results:
+        async with self:
+            await self._select_chart()
+            ds = await self.get_state(DashboardState)
+            from_database = ds.data_source == "database"
+            if not from_database:
+                self.series_data = []
+        if from_database:
+            await self._refresh_series()
+            await self._refresh_breakdown()
+        async with self:
+            self.zoom_start, self.zoom_end = 0.0, 1.0
+            await self._redraw_records()
+
+    def _draw_chart(self, result: ResultSet | None):
+        """Fill the chart of raw rows, downsampled to about one point per pixel."""
+        spec = self._chart
+        self.chart_points_label = ""
+        if spec is None or spec["agg"] != RAW:
+            self.chart_data = []
+            return
+        if not result:
             self.generate_sample_data()
             return
-        ds = await self.get_state(DashboardState)
-        table = ds.selected_table
-        if "faults" in table:
-            self.faults_data = qs.query_results
-        elif "jobs" in table:
-            self.jobs_data = qs.query_results
-        elif "bots" in table:
-            self.bots_data = qs.query_results
\ No newline at end of file
+        rows, total = chart_rows(
+            result,
+            spec,
+            max(self.chart_width, 100),
+            self.downsample_method,
+            (self.zoom_start, self.zoom_end),
+        )
+        self.chart_data = rows
+        if len(rows) < total:
+            self.chart_points_label = f"{len(rows):,} of {total:,} points"
+
+    async def _redraw_records(self):
+        qs = await self.get_state(QueryState)
+        self._draw_chart(qs._result())
+
+    @rx.event
+    async def set_chart_width(self, width: int):
+        """Record the rendered chart width; charts get about one point per pixel."""
+        width = int(width or 0)
+        if width <= 0 or abs(width - self.chart_width) < 50:
+            return
+        self.chart_width = width
+        await self._redraw_records()
+
+    @rx.event
+    async def set_downsample_method(self, method: str):
+        self.downsample_method = method if method in DOWNSAMPLE_METHODS else "lttb"
+        await self._redraw_records()
+
+    @rx.event
+    async def zoom_chart(self, direction: str):
+        """Zoom ("in"/"out") or pan ("left"/"right") the record-based chart.
+
+        Zooming re-samples the raw rows in the visible range, so detail
+        increases until every raw point is shown.
+        """
+        span = self.zoom_end - self.zoom_start
+        center = (self.zoom_start + self.zoom_end) / 2
+        if direction == "in":
+            span /= 2
+        elif direction == "out":
+            span = min(span * 2, 1.0)
+        elif direction == "left":
+            center -= span / 4
+        elif direction == "right":
+            center += span / 4
+        else:
+            span, center = 1.0, 0.5
+        start = min(max(center - span / 2, 0.0), 1.0 - span)
+        self.zoom_start, self.zoom_end = start, start + span
+        await self._redraw_records()
+
+    @rx.event
+    def set_breakdown_column(self, column: str):
+        self.breakdown_column = column
+        return VizState.refresh_breakdown
+
+    @rx.event
+    def set_breakdown_by(self, by: str):
+        self.breakdown_by = by
+        return VizState.refresh_breakdown
+
+    @rx.event(background=True)
+    async def refresh_breakdown(self):
+        await self._refresh_breakdown()
+
+    async def _refresh_breakdown(self):
+        """Count rows per category on the database, optionally cross-tabbed.
+
+        Only the top categories (plus an "Other" bucket) come back, so no
+        raw rows are loaded whatever the table's size.
+        """
+        from .dashboard_state import DashboardState
+
+        async with self:
+            self._breakdown_id += 1
+            breakdown_id = self._breakdown_id
+            self.breakdown_error = ""
+            ds = await self.get_state(DashboardState)
+            table = await ds.selected_table_info
+            categorical_columns = await ds.categorical_columns
+            if not table or not categorical_columns:
+                self.breakdown_column = ""
+                self.breakdown_categories = []
+                self.breakdown_data = []
+                return
+            if self.breakdown_column not in categorical_columns:
+                self.breakdown_column = categorical_columns[0]
+            time_column = await ds.active_time_column
+            if self.breakdown_by == BY_TIME and not time_column:
+                self.breakdown_by = ""
+            elif self.breakdown_by not in (BY_TIME, "", *categorical_columns):
+                self.breakdown_by = ""
+            column = self.breakdown_column
+            by = self.breakdown_by
+            time_filter = await ds._time_filter_plan()
+            db_state = await self.get_state(DatabaseState)
+            conn = await db_state._get_db_conn()
+            if not conn:
+                return
+            cache_scope = await db_state._cache_scope()
+            token = self.router.session.client_token
+        ident = table_identifier(table)
+        categories: list[BreakdownCategory] = []
+        rows: list[dict[str, Any]] = []
+        seconds = None
+        error = ""
+        try:
+            with inflight_queries.track(token, conn):
+                if by == BY_TIME:
+                    start, end = time_filter.since, time_filter.until
+                    if start is None:
+                        start, end = await db_state._run_blocking(
+                            time_bounds,
+                            conn,
+                            ident,
+                            time_column,
+                            time_filter.where,
+                            time_filter.params,
+                            time_filter.sample_percent,
+                            cache_scope,
+                        )
+                    seconds = choose_bucket_seconds(start, end, CROSSTAB_BUCKETS)
+                categories, rows = await db_state._run_blocking(
+                    category_breakdown,
+                    conn,
+                    ident,
+                    column,
+                    by=by if by != BY_TIME else None,
+                    time_column=time_column if by == BY_TIME else None,
+                    bucket_seconds=seconds,
+                    where=time_filter.where,
+                    params=time_filter.params,
+                    sample_percent=time_filter.sample_percent,
+                    cache_scope=cache_scope,
+                )
+        except QueryCanceled as e:
+            if is_timeout(e):
+                error = f"Breakdown query timed out: {str(e).splitlines()[0]}"
+        except Exception as e:
+            logging.exception(f"Error breaking down {table['name']}.{column}: {e}")
+            error = f"Failed to compute breakdown: {e}"
+        finally:
+            await db_state._release_db_conn(conn)
+        async with self:
+            if breakdown_id != self._breakdown_id:
+                return
+            self.breakdown_categories = categories
+            self.breakdown_data = rows
+            self.breakdown_bucket = bucket_label(seconds) if seconds else ""
+            self.breakdown_error = error
+
+    @rx.event
+    def set_agg_func(self, func: str):
+        self.agg_func = func
+        return VizState.refresh_series
+
+    @rx.event
+    def set_agg_column(self, column: str):
+        self.agg_column = column
+        return VizState.refresh_series
+
+    @rx.event(background=True)
+    async def refresh_series(self):
+        await self._refresh_series()
+
+    async def _refresh_series(self):
+        """Aggregate the selected table into time buckets on the database.
+
+        Called from background tasks; the queries run outside the state lock
+        and only the newest refresh gets to store its result.
+        """
+        from .dashboard_state import DashboardState
+
+        async with self:
+            self._series_id += 1
+            series_id = self._series_id
+            self.series_data = []
+            self.viz_error = ""
+            ds = await self.get_state(DashboardState)
+            table = await ds.selected_table_info
+            spec = self._chart
+            if not table or spec is None or spec["agg"] == RAW:
+                return
+            time_column = spec["x"]
+            time_filter = await ds._time_filter_plan()
+            self.series_sample = sample_label(time_filter.sample_percent)
+            numeric_columns = await ds.numeric_columns
+            self.series_columns = numeric_columns
+            if self.agg_column not in numeric_columns:
+                self.agg_column = ""
+            agg_func = self.agg_func
+            db_state = await self.get_state(DatabaseState)
+            rollup = None
+            env = None
+            exact = time_filter.sample_percent is None
+            if ROLLUPS_ENABLED and spec["rollup"] and exact:
+                env = await db_state._get_active_env()
+            if env:
+                # Registers the rollup on first use; None until it is built.
+                rollup = rollup_manager.request(
+                    env,
+                    rollup_for(
+                        table["schema"],
+                        table["relname"],
+                        time_column,
+                        spec["rollup"],
+                        numeric_columns,
+                    ),
+                )
+            conn = await db_state._get_db_conn()
+            if not conn:
+                return
+            cache_scope = await db_state._cache_scope()
+            token = self.router.session.client_token
+        ident = table_identifier(table)
+        passes = [(time_filter.sample_percent, TARGET_POINTS)]
+        if time_filter.sample_percent is None and table["row_estimate"] >= LARGE_TABLE_ROWS:
+            # Draw a coarse chart from a small sample first, so something
+            # shows while the exact aggregate scans the whole range.
+            passes.insert(
+                0, (sample_percent_for(table["row_estimate"]), TARGET_POINTS // 4)
+            )
+        series: list[dict[str, Any]] = []
+        bucket = ""
+        seconds = 0
+        error = ""
+        rolled = None
+        series_sample = None
+        try:
+            with inflight_queries.track(token, conn):
+                if rollup is not None:
+                    rolled = await db_state._run_blocking(
+                        rollup_series,
+                        conn,
+                        rollup,
+                        func=agg_func,
+                        numeric_columns=numeric_columns,
+                        since=time_filter.since,
+                        until=time_filter.until,
+                        cache_scope=cache_scope,
+                    )
+                if rolled is not None:
+                    seconds, series = rolled
+                    bucket = bucket_label(seconds)
+                    passes = []
+                for i, (sample_percent, target_points) in enumerate(passes):
+                    seconds, series = await db_state._run_blocking(
+                        bucketed_series,
+                        conn,
+                        ident,
+                        time_column,
+                        func=agg_func,
+                        numeric_columns=numeric_columns,
+                        where=time_filter.where,
+                        params=time_filter.params,
+                        since=time_filter.since,
+                        until=time_filter.until,
+                        sample_percent=sample_percent,
+                        target_points=target_points,
+                        cache_scope=cache_scope,
+                    )
+                    series_sample = sample_percent
+                    bucket = bucket_label(seconds)
+                    if i < len(passes) - 1:
+                        async with self:
+                            if series_id != self._series_id:
+                                break
+                            self.bucket = bucket
+                            self.series_data = series
+                            self.series_preview = True
+        except QueryCanceled as e:
+            if is_timeout(e):
+                error = f"Chart query timed out: {str(e).splitlines()[0]}"
+        except Exception as e:
+            logging.exception(f"Error aggregating {table['name']}: {e}")
+            error = f"Failed to aggregate chart data: {e}"
+        finally:
+            await db_state._release_db_conn(conn)
+        async with self:
+            if series_id != self._series_id:
+                return
+            self.bucket = bucket
+            self.series_data = series
+            self.series_preview = False
+            self.series_from_rollup = rolled is not None
+            self.viz_error = error
+            self._bucket_seconds = seconds
+            self._series_sample_percent = series_sample
+            self._live_seen = None
+            qs = await self.get_state(QueryState)
+            qs._sync_cache_stats()
+
+    @rx.event
+    def toggle_live(self):
+        """Start or stop polling the selected table for new rows."""
+        self.live_mode = not self.live_mode
+        self.live_delay = self.live_interval
+        self.live_status = "Live" if self.live_mode else ""
+
+    @rx.event
+    def set_live_interval(self, seconds: str):
+        self.live_interval = int(seconds)
+        self.live_delay = self.live_interval
+
+    @rx.event(background=True)
+    async def poll_live(self):
+        """Append rows newer than the high-water mark to the aggregated series.
+
+        Fired by a browser timer every ``live_delay`` seconds, so polling
+        stops when the page closes. A poll that fails or takes more than
+        half the interval doubles the delay (up to LIVE_MAX_INTERVAL); a
+        quick one restores the chosen interval. Each poll of a large table
+        whose time column has no range index is a full scan, so those are
+        polled every LIVE_MAX_INTERVAL. The series is kept to the newest
+        LIVE_MAX_POINTS buckets.
+        """
+        from .dashboard_state import DashboardState
+
+        async with self:
+            if not self.live_mode or self._live_polling:
+                return
+            if not self.series_data or not self._bucket_seconds:
+                self.live_status = "Live mode needs a time-series chart"
+                return
+            ds = await self.get_state(DashboardState)
+            table = await ds.selected_table_info
+            time_column = self._chart["x"] if self._chart else ""
+            if ds.data_source != "database" or not table or not time_column:
+                return
+            unindexed = (
+                table["row_estimate"] >= LARGE_TABLE_ROWS
+                and range_index(table, time_column) is None
+            )
+            time_filter = await ds._time_filter_plan()
+            numeric_columns = await ds.numeric_columns
+            db_state = await self.get_state(DatabaseState)
+            conn = await db_state._get_db_conn()
+            if not conn:
+                return
+            self._live_polling = True
+            series_id = self._series_id
+            seen = self._live_seen
+            bucket_start = datetime.datetime.fromisoformat(
+                str(self.series_data[-1]["timestamp"])
+            )
+            agg_func = self.agg_func
+            bucket_seconds = self._bucket_seconds
+            sample_percent = self._series_sample_percent
+            token = self.router.session.client_token
+        started = time.monotonic()
+        newest = None
+        rows: list[dict[str, Any]] = []
+        error = ""
+        try:
+            with inflight_queries.track(token, conn):
+                newest, rows = await db_state._run_blocking(
+                    tail_series,
+                    conn,
+                    table_identifier(table),
+                    time_column,
+                    bucket_seconds,
+                    seen,
+                    bucket_start,
+                    func=agg_func,
+                    numeric_columns=numeric_columns,
+                    where=time_filter.where,
+                    params=time_filter.params,
+                    sample_percent=sample_percent,
+                )
+        except Exception as e:
+            logging.exception(f"Error polling {table['name']}: {e}")
+            error = str(e).splitlines()[0] if str(e) else type(e).__name__
+        finally:
+            await db_state._release_db_conn(conn)
+        elapsed = time.monotonic() - started
+        async with self:
+            self._live_polling = False
+            if not self.live_mode:
+                return
+            if unindexed:
+                self.live_delay = LIVE_MAX_INTERVAL
+            elif error or elapsed > self.live_interval / 2:
+                self.live_delay = min(self.live_delay * 2, LIVE_MAX_INTERVAL)
+            else:
+                self.live_delay = self.live_interval
+            if series_id != self._series_id:
+                return
+            if rows:
+                start = rows[0]["timestamp"]
+                kept = [p for p in self.series_data if str(p["timestamp"]) < start]
+                self.series_data = (kept + rows)[-LIVE_MAX_POINTS:]
+            if newest is not None:
+                self._live_seen = newest
+            now = datetime.datetime.now().strftime("%H:%M:%S")
+            if error:
+                status = f"Live poll failed: {error}"
+            else:
+                status = f"Live, updated {now}"
+            if unindexed:
+                status += (
+                    f" ({time_column} is not indexed, "
+                    f"polling every {self.live_delay}s)"
+                )
+            elif self.live_delay > self.live_interval:
+                status += f" (database slow, polling every {self.live_delay}s)"
+            self.live_status = status
@@ -0,0 +1,73 @@
+"""Compare upload deduplication strategies on synthetic records.
+
+Usage: python -m scripts.bench_dedup [rows]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from app.data.dedup import Deduplicator
+
+
+def make_records(rows: int) -> list[dict]:
+    rng = random.Random(0)
+    records = [
+        {
+            "id": i,
+            "bot_id": f"bot-{i % 500}",
+            "timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+            "battery_soc": round(rng.random() * 100, 1),
+            "state": rng.choice(["idle", "moving", "charging"]),
+        }
+        for i in range(rows * 9 // 10)
+    ]
+    records += rng.sample(records, rows - len(records))
+    return records
+
+
+def sorted_tuple_set(records: list[dict]) -> list[dict]:
+    """The original approach: a set of sorted item tuples (order not kept)."""
+    return [dict(t) for t in {tuple(sorted(d.items())) for d in records}]
+
+
+def digest_filter(records: list[dict]) -> list[dict]:
+    return list(Deduplicator().filter(records))
+
+
+def key_filter(records: list[dict]) -> list[dict]:
+    return list(Deduplicator(["id"]).filter(records))
+
+
+def measure(name: str, func, records: list[dict]):
+    """Time one run, then repeat it under tracemalloc for the memory peak."""
+    start = time.perf_counter()
+    unique = func(records)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(records)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ordered = [r["id"] for r in unique] == sorted(r["id"] for r in unique)
+    print(
+        f"{name:<18} {elapsed:7.2f}s  peak {peak / 2**20:7.1f} MB  "
+        f"{len(unique):,} rows  order kept: {ordered}"
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    records = make_records(rows)
+    print(f"{rows:,} records, {rows - rows * 9 // 10:,} duplicates")
+    measure("sorted tuple set", sorted_tuple_set, records)
+    measure("digest (all cols)", digest_filter, records)
+    measure("digest (key col)", key_filter, records)
+    nested = [dict(r, tags=[r["state"]], meta={"soc": r["battery_soc"]}) for r in records]
+    try:
+        measure("sorted tuple set*", sorted_tuple_set, nested)
+    except TypeError as e:
+        print(f"{'sorted tuple set*':<18} fails on nested values: {e}")
+    measure("digest (nested)*", digest_filter, nested)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+from psycopg2 import sql
+
+
+def sql_text(query: sql.Composable) -> str:
+    """Render a query without a connection, quoting identifiers naively."""
+    if isinstance(query, sql.Composed):
+        return "".join(sql_text(part) for part in query)
+    if isinstance(query, sql.Identifier):
+        return ".".join(f'"{s}"' for s in query.strings)
+    if isinstance(query, sql.Placeholder):
+        return "%s"
+    if isinstance(query, sql.Literal):
+        return repr(query.wrapped)
+    return query.string
@@ -0,0 +1,98 @@
+from psycopg2 import sql
+from app.db import aggregation
+from app.db.aggregation import NULL_CATEGORY, OTHER_CATEGORY, category_breakdown
+from sql_text import sql_text
+
+
+class Conn:
+    server_version = 160000
+
+
+def _breakdown(monkeypatch, rows, **kwargs):
+    queries = []
+
+    def fetch(conn, scope, query, params=None):
+        queries.append(sql_text(query))
+        return (["grp", "grp_other", "category", "other", "n"], rows)
+
+    monkeypatch.setattr(aggregation.query_cache, "fetch", fetch)
+    table = sql.Identifier("public", "t")
+    result = category_breakdown(Conn(), table, "state", **kwargs)
+    return result, queries[0]
+
+
+def test_breakdown_reads_the_table_once(monkeypatch):
+    _, query = _breakdown(monkeypatch, [], by="kind", sample_percent=10)
+    assert query.count('FROM "public"."t"') == 1
+    assert query.count("count(*)") == 1
+    assert "round(sum(n)::bigint * 10.0)" in query
+
+
+def test_real_other_and_null_values_stay_separate(monkeypatch):
+    rows = [
+        (None, False, "Other", False, 5),
+        (None, False, None, False, 3),
+        (None, False, "NULL", False, 2),
+        (None, False, None, True, 4),
+    ]
+    (categories, data), _ = _breakdown(monkeypatch, rows)
+    assert [(c["label"], c["other"]) for c in categories] == [
+        ("Other", False),
+        (NULL_CATEGORY, False),
+        ("NULL", False),
+        (OTHER_CATEGORY, True),
+    ]
+    assert len({c["key"] for c in categories}) == 4
+    assert [data[0][c["key"]] for c in categories] == [5, 3, 2, 4]
+
+
+def test_cross_tab_groups_put_the_other_group_last(monkeypatch):
+    rows = [
+        ("a", False, "x", False, 1),
+        ("b", False, "x", False, 7),
+        (None, True, "x", False, 9),
+        ("Other", False, "x", False, 2),
+    ]
+    (categories, data), _ = _breakdown(monkeypatch, rows, by="kind")
+    key = categories[0]["key"]
+    assert [(r["group"], r[key]) for r in data] == [
+        ("b", 7),
+        ("Other", 2),
+        ("a", 1),
+        (OTHER_CATEGORY, 9),
+    ]
+
+
+class Cursor:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append(sql_text(query))
+
+    def fetchone(self):
+        return ("2026-01-01T01:30:00+00:00",)
+
+
+def test_tail_series_keeps_the_series_sample(monkeypatch):
+    queries = []
+    conn = Conn()
+    conn.cursor = lambda: Cursor(queries)
+
+    def fetch(conn, scope, query, params=None):
+        queries.append(sql_text(query))
+        return (["timestamp", "count"], [("2026-01-01T01:00:00+00:00", 10)])
+
+    monkeypatch.setattr(aggregation.query_cache, "fetch", fetch)
+    newest, rows = aggregation.tail_series(
+        conn, sql.Identifier("t"), "ts", 3600, None, "2026-01-01", sample_percent=10
+    )
+    assert newest and rows == [{"timestamp": "2026-01-01T01:00:00+00:00", "count": 10}]
+    assert all("TABLESAMPLE" in q for q in queries)
+    assert "round(count(*) * 10.0)" in queries[1]
@@ -0,0 +1,46 @@
+from pathlib import Path
+from app.data.charts import RAW, auto_spec, column_kinds, resolve_spec
+from app.data.coerce import coerce_result
+from app.data.results import ResultBuilder
+from app.data.upload import UploadReader
+
+ASSETS = Path(__file__).parents[1] / "assets"
+
+
+def _upload(path):
+    builder = ResultBuilder()
+    builder.extend(iter(UploadReader(path)), 10**6)
+    return coerce_result(builder.build())
+
+
+def test_uploaded_file_gets_its_spec():
+    result = _upload(ASSETS / "bots.json")
+    time_columns, numeric_columns = column_kinds(result)
+    spec = resolve_spec(
+        "Uploaded: bots.json",
+        result.columns,
+        time_columns,
+        numeric_columns,
+        can_aggregate=False,
+    )
+    assert spec is not None
+    assert (spec["type"], spec["x"], spec["y"]) == ("scatter", "x", ["y"])
+
+
+def test_uploads_skip_aggregated_specs():
+    spec = resolve_spec(
+        "Uploaded: faults.json",
+        ["ts", "code"],
+        ["ts"],
+        ["code"],
+        can_aggregate=False,
+    )
+    assert spec is not None
+    assert (spec["agg"], spec["x"], spec["y"]) == (RAW, "ts", ["code"])
+
+
+def test_auto_spec():
+    assert auto_spec("t", ["ts"], [])["agg"] != RAW
+    assert auto_spec("t", ["ts"], [], can_aggregate=False) is None
+    assert auto_spec("t", [], ["a", "b"])["type"] == "scatter"
+    assert auto_spec("t", [], ["a"]) is None
@@ -0,0 +1,45 @@
+from pathlib import Path
+from app.data.charts import column_kinds
+from app.data.coerce import coerce_result
+from app.data.results import ResultBuilder, ResultSet
+from app.data.upload import UploadReader
+
+ASSETS = Path(__file__).parents[1] / "assets"
+
+
+def _coerce(values):
+    result = coerce_result(ResultSet.from_records([{"v": v} for v in values]))
+    return result.column("v")
+
+
+def test_numbers():
+    column = _coerce(["1", " -2 ", "None", ""])
+    assert column.kind == "int"
+    assert column.mask.tolist() == [False, False, True, True]
+    assert column.values[:2].tolist() == [1, -2]
+    assert _coerce(["1", "2.5"]).kind == "float"
+    assert _coerce([str(2**60), "1"]).kind == "float"
+
+
+def test_booleans_and_timestamps():
+    assert _coerce(["true", "False", "null"]).kind == "bool"
+    assert _coerce(["2025-10-31", "2025-11-01"]).kind == "date"
+    column = _coerce(["2025-10-31 01:40:45+00:00", "2025-10-31T02:00:00Z"])
+    assert (column.kind, column.tz_aware) == ("datetime", True)
+    assert _coerce(["2025-10-31T01:40:45", "2025-10-31"]).tz_aware is False
+
+
+def test_mixed_and_non_text_columns_are_kept():
+    assert _coerce(["1", "a"]).kind == "object"
+    assert _coerce(["None", "null"]).mask.all()
+    assert _coerce([1, 2]).kind == "int"
+
+
+def test_uploaded_columns_are_typed_for_charts():
+    builder = ResultBuilder()
+    builder.extend(iter(UploadReader(ASSETS / "bots.json")), 10**6)
+    result = coerce_result(builder.build())
+    time_columns, numeric_columns = column_kinds(result)
+    assert time_columns == ["created_at", "updated_at"]
+    assert numeric_columns == ["id", "x", "y", "z", "battery_soc"]
+    assert result.column("carrying_tray_id").mask.all()
@@ -0,0 +1,11 @@
+import pytest
+from app.states.credentials_state import DEFAULT_STATEMENT_TIMEOUT, _statement_timeout
+
+
+def test_statement_timeout():
+    assert _statement_timeout("") == DEFAULT_STATEMENT_TIMEOUT
+    assert _statement_timeout(None) == DEFAULT_STATEMENT_TIMEOUT
+    assert _statement_timeout(" 30 ") == 30
+    assert _statement_timeout("0") == 0
+    with pytest.raises(ValueError):
+        _statement_timeout("6o")
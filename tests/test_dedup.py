@@ -0,0 +1,34 @@
+import json
+from app.data.dedup import Deduplicator
+from app.data.upload import UploadReader
+
+
+def test_distinct_values_are_not_duplicates():
+    dedup = Deduplicator()
+    records = [{"x": -1}, {"x": -2}, {"x": 1}, {"x": True}, {"x": 1.0}]
+    assert [dedup.is_new(r) for r in records] == [True] * 5
+    assert dedup.duplicates == 0
+
+
+def test_whole_record_duplicates_ignore_key_order():
+    dedup = Deduplicator()
+    assert dedup.is_new({"a": 1, "b": [1, {"c": 2}]})
+    assert not dedup.is_new({"b": [1, {"c": 2}], "a": 1})
+    assert dedup.duplicates == 1
+    assert len(dedup) == 1
+
+
+def test_key_columns():
+    dedup = Deduplicator(["id"])
+    records = [{"id": -1, "v": 1}, {"id": -2, "v": 1}, {"id": -1, "v": 2}]
+    assert list(dedup.filter(records)) == records[:2]
+    assert dedup.duplicates == 1
+
+
+def test_upload_reader_counts_duplicates_once(tmp_path):
+    path = tmp_path / "upload.json"
+    path.write_text(json.dumps([{"x": -1}, {"x": -2}, {"x": -1}]))
+    reader = UploadReader(path)
+    assert list(reader) == [{"x": -1}, {"x": -2}]
+    assert reader.records == 2
+    assert reader.duplicates == 1
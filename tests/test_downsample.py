@@ -0,0 +1,85 @@
+import numpy as np
+from app.data.downsample import downsample, lttb, minmax
+from app.data.results import ResultSet
+
+
+def _lttb_reference(x, y, n_out):
+    """Textbook LTTB over the same buckets, one point at a time."""
+    n = len(x)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out, prev = [0], 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = x[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        best, best_area = start, -1.0
+        for j in range(start, stop):
+            area = abs(
+                (x[prev] - cx) * (y[j] - y[prev]) - (x[prev] - x[j]) * (cy - y[prev])
+            )
+            if area > best_area:
+                best, best_area = j, area
+        out.append(best)
+        prev = best
+    return np.array(out + [n - 1])
+
+
+def test_lttb_matches_the_reference_and_keeps_spikes():
+    rng = np.random.default_rng(0)
+    x = np.arange(1000, dtype=float)
+    y = rng.normal(size=1000)
+    y[437] = 50
+    picked = lttb(x, y, 50)
+    assert len(picked) == 50
+    assert (picked[0], picked[-1]) == (0, 999)
+    assert (np.diff(picked) > 0).all()
+    assert 437 in picked
+    assert picked.tolist() == _lttb_reference(x, y, 50).tolist()
+    assert lttb(x[:10], y[:10], 50).tolist() == list(range(10))
+
+
+def test_minmax_keeps_each_buckets_extremes():
+    rng = np.random.default_rng(1)
+    x = np.sort(rng.uniform(0, 100, 2000))
+    y = rng.normal(size=2000)
+    picked = minmax(x, y, 20)
+    assert len(picked) <= 2 * 20 + 2
+    assert (picked[0], picked[-1]) == (0, 1999)
+    bucket = np.minimum(((x - x[0]) / (x[-1] - x[0]) * 20).astype(int), 19)
+    for b in range(20):
+        in_bucket = np.flatnonzero(bucket == b)
+        assert in_bucket[np.argmin(y[in_bucket])] in picked
+        assert in_bucket[np.argmax(y[in_bucket])] in picked
+    assert minmax(x[:10], y[:10], 20).tolist() == list(range(10))
+    assert sorted(minmax(np.zeros(50), np.arange(50.0), 5)) == [0, 49]
+
+
+def test_downsample_sorts_zooms_and_skips_missing_x():
+    records = [{"t": 99 - i, "v": float(i % 7), "s": "x"} for i in range(100)]
+    records[5]["t"] = None
+    records[6]["v"] = None
+    result = ResultSet.from_records(records)
+    shown, total = downsample(result, "t", ["v"], 10)
+    assert total == 99
+    ts = [r["t"] for r in shown.records()]
+    assert ts == sorted(ts) and ts[0] == 0 and ts[-1] == 99
+    assert len(ts) <= 10
+    shown, total = downsample(result, "t", ["v"], 10, "minmax", x_range=(0.5, 1.0))
+    assert total == 49
+    assert min(r["t"] for r in shown.records()) >= 49.5
+    shown, total = downsample(result, "s", ["v"], 10)
+    assert (len(shown), total) == (10, 100)
+
+
+def test_rows_without_numeric_y_are_thinned_over_the_whole_range():
+    result = ResultSet.from_records([{"t": i, "s": str(i)} for i in range(1000)])
+    shown, total = downsample(result, "t", ["s"], 10)
+    ts = [r["t"] for r in shown.records()]
+    assert total == 1000 and len(ts) == 10
+    assert (ts[0], ts[-1]) == (0, 999)
+    shown, _ = downsample(result, "s", ["t"], 10)
+    assert len(shown) == 10 and shown.records()[-1]["s"] == "999"
+
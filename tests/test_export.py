@@ -0,0 +1,42 @@
+import io
+from collections import namedtuple
+from decimal import Decimal
+import pytest
+from app.db import export
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+Column = namedtuple("Column", "name type_code precision scale")
+
+
+def _write(monkeypatch, description, rows):
+    monkeypatch.setattr(
+        export, "_stream_raw", lambda conn, table: iter([(description, rows)])
+    )
+    out = io.BytesIO()
+    export._write_parquet(None, {"columns": []}, out)
+    out.seek(0)
+    return pq.read_table(out)
+
+
+def test_numeric_keeps_exact_values(monkeypatch):
+    description = [
+        Column("price", 1700, 12, 2),
+        Column("ratio", 1700, None, None),
+        Column("wide", 1700, 50, 10),
+    ]
+    rows = [
+        (Decimal("0.10"), Decimal("12345678901234567890.123456789"), Decimal("1.5")),
+        (Decimal("NaN"), Decimal("NaN"), None),
+    ]
+    table = _write(monkeypatch, description, rows)
+    assert table.schema.field("price").type == pa.decimal128(12, 2)
+    assert table.schema.field("ratio").type == pa.string()
+    assert table.schema.field("wide").type == pa.decimal256(50, 10)
+    assert table.column("price").to_pylist() == [Decimal("0.10"), None]
+    assert table.column("ratio").to_pylist() == [
+        "12345678901234567890.123456789",
+        "NaN",
+    ]
+    assert table.column("wide").to_pylist() == [Decimal("1.5000000000"), None]
@@ -0,0 +1,59 @@
+import datetime
+from app.db.filters import (
+    LARGE_TABLE_ROWS,
+    NO_TIME_FILTER,
+    plan_time_filter,
+    range_index,
+)
+
+
+def _table(row_estimate, indexes=()):
+    return {
+        "name": "public.events",
+        "schema": "public",
+        "relname": "events",
+        "columns": [],
+        "primary_key": [],
+        "indexes": list(indexes),
+        "row_estimate": row_estimate,
+    }
+
+
+def _index(method, columns):
+    return {
+        "name": "i",
+        "method": method,
+        "columns": columns,
+        "unique": False,
+        "primary": False,
+    }
+
+
+def test_all_range_reads_the_table_exactly():
+    large = _table(10 * LARGE_TABLE_ROWS)
+    assert plan_time_filter(large, "ts", "all") == NO_TIME_FILTER
+    assert plan_time_filter(_table(10), "ts", "unknown") == NO_TIME_FILTER
+    assert plan_time_filter(_table(10), "", "24h") == NO_TIME_FILTER
+
+
+def test_range_filter_on_small_or_indexed_tables():
+    plan = plan_time_filter(_table(10), "ts", "24h")
+    assert plan.until - plan.since == datetime.timedelta(hours=24)
+    assert plan.params == [plan.since]
+    assert plan.until.second == plan.until.microsecond == 0
+    assert (plan.sample_percent, plan.warning) == (None, "")
+    indexed = _table(10 * LARGE_TABLE_ROWS, [_index("brin", ["ts"])])
+    assert plan_time_filter(indexed, "ts", "7d").sample_percent is None
+
+
+def test_unindexed_large_tables_are_sampled_with_a_warning():
+    plan = plan_time_filter(_table(10 * LARGE_TABLE_ROWS), "ts", "7d")
+    assert plan.sample_percent == 2.0
+    assert "CREATE INDEX ON public.events USING brin (ts);" in plan.warning
+
+
+def test_range_index():
+    table = _table(0, [_index("btree", ["id", "ts"]), _index("btree", ["ts", "id"])])
+    assert range_index(table, "ts") == table["indexes"][1]
+    assert range_index(_table(0, [_index("btree", ["id", "ts"])]), "ts") is None
+    assert range_index(_table(0, [_index("brin", ["id", "ts"])]), "ts")
@@ -0,0 +1,48 @@
+from psycopg2 import sql
+from app.db.paging import _page_query, order_columns
+from sql_text import sql_text
+
+
+def _table(primary_key, nullable=()):
+    columns = ["id", "ts", "name"]
+    return {
+        "name": "t",
+        "schema": "public",
+        "relname": "t",
+        "columns": [
+            {"name": c, "type": "text", "not_null": c not in nullable} for c in columns
+        ],
+        "primary_key": primary_key,
+        "indexes": [],
+        "row_estimate": 0,
+    }
+
+
+def test_keyset_needs_a_not_null_key_ending_in_the_primary_key():
+    assert order_columns(_table(["id"])) == (["id"], True)
+    assert order_columns(_table(["id"]), "ts") == (["ts", "id"], True)
+    assert order_columns(_table(["id"], ["ts"]), "ts") == (["ts", "id"], False)
+    assert order_columns(_table([]), "ts") == (["ts"], False)
+    assert order_columns(_table([])) == ([], False)
+
+
+def test_keyset_page():
+    query, params = _page_query(
+        sql.Identifier("t"), ["ts", "id"], 100, after=["2026-01-01", 7], offset=300
+    )
+    assert sql_text(query) == (
+        'SELECT * FROM "t" WHERE ("ts", "id") > (%s, %s) '
+        'ORDER BY "ts", "id" LIMIT %s'
+    )
+    assert params == ["2026-01-01", 7, 100]
+
+
+def test_offset_page_keeps_the_filter_and_order():
+    where = sql.SQL("{} >= %s").format(sql.Identifier("ts"))
+    query, params = _page_query(
+        sql.Identifier("t"), ["ts"], 100, offset=300, where=where, where_params=[1]
+    )
+    assert sql_text(query) == (
+        'SELECT * FROM "t" WHERE "ts" >= %s ORDER BY "ts" LIMIT %s OFFSET %s'
+    )
+    assert params == [1, 100, 300]
@@ -0,0 +1,16 @@
+from app.db import pool
+from app.states.credentials_state import Env
+
+
+def test_changed_password_replaces_and_closes_the_old_pool(monkeypatch):
+    monkeypatch.setattr(pool, "_pools", {})
+    env = Env(name="prod", database="app", password="old")
+    old = pool.get_pool(env)
+    assert pool.get_pool(env) is old
+    new = pool.get_pool(env.model_copy(update={"password": "new"}))
+    assert new is not old
+    assert old._closed and not new._closed
+    assert list(pool._pools.values()) == [new]
+    other = pool.get_pool(env.model_copy(update={"database": "other"}))
+    assert not new._closed
+    assert len(pool._pools) == 2 and other is not new
@@ -0,0 +1,31 @@
+import datetime
+import uuid
+from decimal import Decimal
+from app.data.results import ResultSet
+
+UTC = datetime.timezone.utc
+
+
+def test_key_values_come_back_as_the_database_returned_them():
+    row = (
+        2**62,
+        Decimal("12.34"),
+        datetime.datetime(2026, 1, 1, 1, 2, 3, 456789, tzinfo=UTC),
+        datetime.datetime(2026, 1, 1, 1, 2, 3),
+        datetime.date(2026, 1, 2),
+        uuid.UUID(int=7),
+    )
+    result = ResultSet.from_rows(list("abcdef"), [row, (None,) * 6])
+    # Numerics that floats hold exactly are kept, and returned, as floats.
+    expected = (row[0], 12.34, *row[2:])
+    assert tuple(result.column(c).value(0) for c in result.columns) == expected
+    assert [result.column(c).value(1) for c in result.columns] == [None] * 6
+
+
+def test_numerics_floats_would_round_stay_exact():
+    big = Decimal("12345678901234567890")
+    result = ResultSet.from_rows(["n", "m"], [(big, Decimal("0.5")), (None, None)])
+    assert result.column("n").kind == "object"
+    assert result.column("n").value(0) == big
+    assert result.records()[0]["n"] == "12345678901234567890"
+    assert result.column("m").kind == "float"
@@ -0,0 +1,99 @@
+import datetime
+import re
+from zoneinfo import ZoneInfo
+from app.db import rollups
+from app.db.aggregation import bucket_expr, bucket_floor
+from app.db.rollups import rollup_for, rollup_series
+from sql_text import sql_text
+
+UTC = datetime.timezone.utc
+HOUR = datetime.timedelta(hours=1)
+T0 = datetime.datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class Conn:
+    server_version = 160000
+
+
+def _series(monkeypatch, rollup_rows, since, rolled_to):
+    """Run rollup_series on hourly chart buckets, recording the queries made."""
+    calls = {"rollup": [], "table": []}
+
+    def fetch(conn, scope, query, params=None):
+        calls["rollup"].append(params)
+        return (["timestamp", "count"], [r for r in rollup_rows if params[0] > r[0]])
+
+    def aggregate_series(conn, table, column, seconds, where=None, params=None, **kw):
+        calls["table"].append(params)
+        return [{"timestamp": params[0].isoformat(), "count": 1}]
+
+    monkeypatch.setattr(rollups.query_cache, "fetch", fetch)
+    monkeypatch.setattr(rollups, "aggregate_series", aggregate_series)
+    rollup = {**rollup_for("public", "faults", "ts", 300, []), "rolled_to": rolled_to}
+    until = since + 100 * HOUR
+    result = rollup_series(Conn(), rollup, "avg", [], since, until, target_points=100)
+    return result, calls
+
+
+def _sql_floor(value, seconds, server_version):
+    """Evaluate the bucket_expr SQL for one value, as Postgres would."""
+    text = sql_text(bucket_expr("ts", seconds, server_version))
+    binned = re.fullmatch(
+        r"date_bin\('(\d+) seconds', \"ts\"::timestamptz, TIMESTAMPTZ '(.+)'\)", text
+    )
+    if binned:
+        origin = datetime.datetime.fromisoformat(binned[2])
+        # An origin without an offset would be read in the session's zone.
+        assert origin.utcoffset() is not None
+        step = datetime.timedelta(seconds=int(binned[1]))
+        return origin + (value - origin) // step * step
+    floored = re.fullmatch(
+        r"to_timestamp\(floor\(extract\(epoch FROM \"ts\"::timestamptz\) / (\d+)\)"
+        r" \* (\d+)\)",
+        text,
+    )
+    assert floored, text
+    epoch = value.timestamp() // int(floored[1]) * int(floored[2])
+    return datetime.datetime.fromtimestamp(epoch, UTC)
+
+
+def test_sql_buckets_match_bucket_floor_in_any_zone():
+    for zone in ("America/Los_Angeles", "Asia/Kolkata", "UTC"):
+        value = datetime.datetime(2026, 3, 8, 1, 47, 13, tzinfo=ZoneInfo(zone))
+        for seconds in (60, 3600, 3 * 3600, 86400, 7 * 86400):
+            for version in (160000, 130000):
+                expected = bucket_floor(value, seconds, version)
+                assert _sql_floor(value, seconds, version) == expected
+
+
+def test_bucket_floor():
+    value = T0 + 90 * datetime.timedelta(minutes=1)
+    assert bucket_floor(value, 3600, 160000) == T0 + HOUR
+    assert bucket_floor(value, 7 * 86400, 160000).weekday() == 5
+    assert bucket_floor(value, 7 * 86400, 130000).weekday() == 3
+
+
+def test_head_is_read_from_the_table_when_since_is_mid_bucket(monkeypatch):
+    since = T0 + HOUR / 2
+    rows = [(T0 + i * HOUR, 10) for i in range(1, 5)]
+    (seconds, series), calls = _series(monkeypatch, rows, since, T0 + 4.5 * HOUR)
+    assert seconds == 3600
+    assert calls["rollup"] == [[T0 + 4 * HOUR, T0 + HOUR]]
+    assert calls["table"] == [[since, T0 + HOUR], [T0 + 4 * HOUR]]
+    assert [r["count"] for r in series] == [1, 10, 10, 10, 1]
+
+
+def test_no_head_when_since_is_on_a_boundary(monkeypatch):
+    rows = [(T0 + i * HOUR, 10) for i in range(4)]
+    (_, series), calls = _series(monkeypatch, rows, T0, T0 + 3.5 * HOUR)
+    assert calls["rollup"] == [[T0 + 3 * HOUR, T0]]
+    assert calls["table"] == [[T0 + 3 * HOUR]]
+    assert [r["count"] for r in series] == [10, 10, 10, 1]
+
+
+def test_unbuilt_or_empty_rollups_are_not_used(monkeypatch):
+    result, _ = _series(monkeypatch, [], T0, None)
+    assert result is None
+    result, calls = _series(monkeypatch, [], T0, T0 + HOUR / 2)
+    assert result is None
+    assert calls["table"] == []